@@ -0,0 +1,16 @@
+"""
+Shared building blocks for the PlanScope scrapers (permits, taba, yeshivot).
+
+Scripts run from their own folder, so they add PlanScope_Scrapers/ to
+sys.path before importing from here, e.g.:
+
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+    from common import fetch_client
+
+The modules read their settings from the environment at import time, so the
+project's .env file is loaded here, before any of them (common/env.py).
+"""
+
+from common import env
+
+env.load()
@@ -0,0 +1,106 @@
+"""
+Append-only JSONL log for incremental outputs.
+
+Rewriting a whole sorted JSON file for every new item is quadratic in the
+number of items per run, and an interrupted rewrite can lose the file. Instead,
+new items are appended to a log, one JSON value per line, and flushed and
+fsynced per batch. The owner compacts the log into its snapshot file every now
+and then (and at the end of a run) and clears it afterwards:
+
+    permit_numbers.json          snapshot (sorted, rewritten on compaction only)
+    permit_numbers.log.jsonl     items found since the last compaction
+
+Readers take the snapshot plus the log. A crash between writing the snapshot and
+clearing the log only replays items that are already in the snapshot, so items
+must be idempotent (e.g. set members). A partial last line left by a crash is
+skipped.
+
+Usage:
+    log = AppendLog("permit_numbers.log.jsonl")
+    log.append(["20250417", "20250418"])
+    items = log.read()
+    if len(log) >= COMPACT_EVERY:
+        write_json_atomic("permit_numbers.json", sorted(snapshot | set(log.read())))
+        log.clear()
+"""
+
+import json
+import logging
+import os
+import threading
+from typing import Any, Iterable, List
+
+logger = logging.getLogger(__name__)
+
+
+def write_json_atomic(path: str, data: Any):
+    """Write `data` as JSON through a temporary file, fsynced before it replaces `path`."""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+class AppendLog:
+    """A JSONL file that is only ever appended to (until it is cleared after a compaction)."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._entries = None   # Line count, read lazily
+
+    def append(self, items: Iterable[Any]):
+        """Append `items` (one line each) and fsync them before returning."""
+        lines = [json.dumps(item, ensure_ascii=False) + "\n" for item in items]
+        if not lines:
+            return
+        with self._lock:
+            if self._ends_mid_line():
+                lines[0] = "\n" + lines[0]   # Keep a crash's partial line from swallowing the first new entry
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.writelines(lines)
+                f.flush()
+                os.fsync(f.fileno())
+            self._entries = self._count() if self._entries is None else self._entries + len(lines)
+
+    def read(self) -> List[Any]:
+        """Every complete entry, oldest first."""
+        items = []
+        if not os.path.exists(self.path):
+            return items
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    items.append(json.loads(line))
+                except ValueError:
+                    logger.warning(f"{self.path}: skipping a partial entry")
+        return items
+
+    def clear(self):
+        """Drop every entry (call once they are in the snapshot)."""
+        with self._lock:
+            if os.path.exists(self.path):
+                os.remove(self.path)
+            self._entries = 0
+
+    def _ends_mid_line(self) -> bool:
+        try:
+            with open(self.path, "rb") as f:
+                f.seek(-1, os.SEEK_END)
+                return f.read(1) != b"\n"
+        except OSError:
+            return False   # Missing or empty file
+
+    def _count(self) -> int:
+        if not os.path.exists(self.path):
+            return 0
+        with open(self.path, "r", encoding="utf-8") as f:
+            return sum(1 for _ in f)
+
+    def __len__(self) -> int:
+        with self._lock:
+            if self._entries is None:
+                self._entries = self._count()
+            return self._entries
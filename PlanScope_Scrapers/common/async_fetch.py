@@ -0,0 +1,191 @@
+"""
+Optional asyncio fetch engine for the complot detail pages (GetBakashaFile / GetTabaFile).
+
+The thread pools in the scripts block a whole OS thread per in-flight request and
+sleep inside it on 429/CAPTCHA. This engine keeps hundreds of requests in flight on
+a single event loop (httpx, HTTP/2 multiplexing when the proxy tunnel negotiates it)
+under a configurable concurrency cap. In-flight requests are governed by the same
+per-host AIMD controller and cross-process token bucket as the threaded path
+(common/concurrency.py, common/rate_limiter.py), so the cap is an upper bound and
+429/CAPTCHA responses shrink it for everyone. While the host's circuit breaker
+is open (common/circuit_breaker.py) no requests are sent.
+
+Usage (enabled in the scripts with FETCH_ENGINE=async):
+    engine = AsyncFetchEngine(headers=HEADERS, proxy_pool=PROXY_POOL, is_blocked=...)
+    pages = engine.fetch_pages({permit_id: url, ...})   # {permit_id: bytes or None}
+
+Pages that come back as None are left to the regular (threaded) fetch path.
+"""
+
+import asyncio
+import itertools
+import time
+from typing import Callable, Dict, Optional
+from urllib.parse import urlparse
+
+try:
+    import httpx
+    HAS_HTTPX = True
+except ImportError:
+    HAS_HTTPX = False
+
+try:
+    import h2  # noqa: F401  (httpx needs it for HTTP/2)
+    HAS_HTTP2 = True
+except ImportError:
+    HAS_HTTP2 = False
+
+from common import bandwidth
+from common.circuit_breaker import CircuitOpenError, get_breaker
+from common.concurrency import get_controller
+from common.fetch_client import rate_key
+from common.proxy_pool import ProxyPool
+from common.rate_limiter import get_limiter
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+
+DEFAULT_CONCURRENCY = 100      # Requests in flight at once
+STREAMS_PER_CLIENT = 20        # In-flight requests sharing one proxy session / connection
+DEFAULT_TIMEOUT = 30
+DEFAULT_MAX_RETRIES = 2
+ERROR_BACKOFF = 2              # Seconds before retrying after a connection error
+
+
+class AsyncFetchEngine:
+    """Fetch many pages concurrently; one call per batch of IDs."""
+
+    def __init__(
+        self,
+        headers: Dict[str, str],
+        proxy_pool: Optional[ProxyPool] = None,
+        is_blocked: Optional[Callable[[int, bytes], bool]] = None,
+        concurrency: int = DEFAULT_CONCURRENCY,
+        timeout: float = DEFAULT_TIMEOUT,
+        max_retries: int = DEFAULT_MAX_RETRIES,
+        verify: bool = False,
+        http2: bool = True,
+    ):
+        """
+        Args:
+            headers: Request headers (same as the threaded path)
+            proxy_pool: Proxy sessions to spread the clients over (None = direct)
+            is_blocked: (status_code, body) -> True if the page is a 429/CAPTCHA and should be retried
+            concurrency: Upper bound for requests in flight (AIMD max_limit)
+            http2: Negotiate HTTP/2 when the `h2` package is installed
+        """
+        if not HAS_HTTPX:
+            raise ImportError("FETCH_ENGINE=async requires httpx (pip install 'httpx[http2]')")
+
+        self.headers = headers
+        self.proxy_pool = proxy_pool
+        self.is_blocked = is_blocked or (lambda status, body: status == 429)
+        self.concurrency = max(1, int(concurrency))
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.verify = verify
+        self.http2 = http2 and HAS_HTTP2
+
+    def _new_client(self) -> "httpx.AsyncClient":
+        proxy_session = self.proxy_pool.pick() if self.proxy_pool is not None and self.proxy_pool.enabled else None
+        limits = httpx.Limits(max_connections=STREAMS_PER_CLIENT, max_keepalive_connections=STREAMS_PER_CLIENT)
+        client = httpx.AsyncClient(
+            headers=self.headers,
+            proxy=proxy_session.proxy_url if proxy_session else None,
+            http2=self.http2,
+            verify=self.verify,
+            timeout=self.timeout,
+            limits=limits,
+        )
+        # Outcomes are reported back to the pool for health scoring
+        client.proxy_session = proxy_session
+        return client
+
+    def _report(self, client, ok: bool, latency: Optional[float] = None, throttled: bool = False):
+        if client.proxy_session is not None:
+            self.proxy_pool.report(client.proxy_session, ok=ok, latency=latency, throttled=throttled)
+
+    async def _fetch_one(self, clients, retired, client_cycle, semaphore, url: str) -> Optional[bytes]:
+        host = urlparse(url).hostname
+        controller = get_controller(host, max_limit=self.concurrency)
+        breaker = get_breaker(host)
+        limiter = get_limiter()
+        client_idx = next(client_cycle)
+        for attempt in range(self.max_retries + 1):
+            client = clients[client_idx]
+            # The semaphore bounds how many coroutines poll the controller at once
+            async with semaphore:
+                try:
+                    probing = breaker.before_request()
+                except CircuitOpenError:
+                    # Upstream is down: leave this page to the threaded path, which reschedules it
+                    return None
+                try:
+                    await controller.acquire_async()
+                    try:
+                        await limiter.acquire_async(rate_key(host))
+                        start = time.monotonic()
+                        response = await client.get(url)
+                        body = response.content
+                        status = response.status_code
+                        bandwidth.record(url, response.num_bytes_downloaded)
+                    except httpx.HTTPError:
+                        status, body = None, b""
+                    finally:
+                        controller.release()
+                except BaseException:
+                    # Local error or cancellation: don't leave the half-open probe slot taken
+                    if probing:
+                        breaker.release_probe()
+                    raise
+
+            if status is None or status >= 500:
+                breaker.on_failure()
+            else:
+                breaker.on_success()
+
+            if status is not None and status < 400 and not self.is_blocked(status, body):
+                controller.on_success()
+                self._report(client, ok=True, latency=time.monotonic() - start)
+                return body
+
+            if status is not None and status < 500 and (status == 429 or self.is_blocked(status, body)):
+                # 429 / CAPTCHA: the controller pauses every request, including this retry
+                controller.on_throttle(f"async {status}")
+                self._report(client, ok=True, throttled=True)
+            else:
+                # 5xx / other errors / transport errors: left to the breaker and the retry
+                self._report(client, ok=False)
+
+            if attempt < self.max_retries:
+                # Move this slot to a different proxy session (other requests may still be
+                # using the old client, it is closed at the end)
+                if clients[client_idx] is client:
+                    retired.append(client)
+                    clients[client_idx] = self._new_client()
+                if status is None:
+                    await asyncio.sleep(ERROR_BACKOFF)
+        return None
+
+    async def _fetch_all(self, urls: Dict[str, str]) -> Dict[str, Optional[bytes]]:
+        num_clients = max(1, -(-self.concurrency // STREAMS_PER_CLIENT))
+        clients = [self._new_client() for _ in range(num_clients)]
+        retired = []
+        client_cycle = itertools.cycle(range(num_clients))
+        semaphore = asyncio.Semaphore(self.concurrency)
+        try:
+            ids = list(urls)
+            bodies = await asyncio.gather(*[
+                self._fetch_one(clients, retired, client_cycle, semaphore, urls[item_id])
+                for item_id in ids
+            ])
+            return dict(zip(ids, bodies))
+        finally:
+            await asyncio.gather(*[client.aclose() for client in clients + retired], return_exceptions=True)
+
+    def fetch_pages(self, urls: Dict[str, str]) -> Dict[str, Optional[bytes]]:
+        """Fetch {id: url} and return {id: body bytes, or None if it could not be fetched}."""
+        if not urls:
+            return {}
+        return asyncio.run(self._fetch_all(urls))
@@ -0,0 +1,117 @@
+"""
+Proxy bandwidth accounting.
+
+Every response body read by the fetch layer is recorded here with the number of
+bytes that crossed the wire (before gzip decoding). Totals are kept per stage
+(one stage = one script, e.g. "analyze_permits") and, at exit, appended to a
+JSONL log together with the run id, so an orchestrator can sum up a whole run.
+
+Configuration (.env):
+    PLANSCOPE_RUN_ID=...      # Set by main_permit.py / main_taba.py for their subprocesses
+    BANDWIDTH_LOG=...         # Override the log path
+
+Usage:
+    bandwidth.record(url, nbytes)           # done by fetch_client / async_fetch
+    bandwidth.summary()                     # this stage so far
+    bandwidth.run_totals(run_id)            # all stages of a run, from the log
+"""
+
+import atexit
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+
+LOG_PATH = Path(os.getenv("BANDWIDTH_LOG", str(Path(__file__).resolve().parent.parent / ".cache" / "bandwidth.jsonl")))
+RUN_ID = os.getenv("PLANSCOPE_RUN_ID") or f"{datetime.now().strftime('%Y%m%d-%H%M%S')}-{os.getpid()}"
+
+_lock = threading.Lock()
+_stage = Path(sys.argv[0]).stem or "interactive"
+_totals = {"requests": 0, "bytes": 0, "truncated": 0}
+_registered = False
+
+
+def new_run_id() -> str:
+    """Run id for an orchestrator to pass to its stages via PLANSCOPE_RUN_ID."""
+    return f"{datetime.now().strftime('%Y%m%d-%H%M%S')}-{os.getpid()}"
+
+
+def set_stage(name: str):
+    """Name the totals of this process (defaults to the script name)."""
+    global _stage
+    _stage = name
+
+
+def record(url: str, nbytes: int, truncated: bool = False):
+    """Account one response body of `nbytes` wire bytes."""
+    global _registered
+    with _lock:
+        _totals["requests"] += 1
+        _totals["bytes"] += nbytes
+        if truncated:
+            _totals["truncated"] += 1
+        if not _registered:
+            atexit.register(write_report)
+            _registered = True
+    logger.debug(f"{nbytes} bytes{' (stopped early)' if truncated else ''}: {url}")
+
+
+def summary() -> Dict[str, Any]:
+    with _lock:
+        return {"run_id": RUN_ID, "stage": _stage, **_totals}
+
+
+def format_bytes(nbytes: float) -> str:
+    for unit in ("B", "KB", "MB"):
+        if nbytes < 1024:
+            return f"{nbytes:.1f} {unit}"
+        nbytes /= 1024
+    return f"{nbytes:.2f} GB"
+
+
+def write_report(path: Optional[Path] = None):
+    """Append this stage's totals to the bandwidth log (registered at exit)."""
+    entry = summary()
+    if not entry["requests"]:
+        return
+    entry["finished_at"] = time.time()
+    path = path or LOG_PATH
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry) + "\n")
+    except OSError as e:
+        logger.warning(f"Could not write bandwidth log: {e}")
+    print(f"📶 Proxy bandwidth [{entry['stage']}]: {format_bytes(entry['bytes'])} "
+          f"in {entry['requests']} responses ({entry['truncated']} stopped early)")
+
+
+def run_totals(run_id: str, path: Optional[Path] = None) -> Dict[str, Dict[str, int]]:
+    """Per-stage totals of one run, read back from the bandwidth log."""
+    stages: Dict[str, Dict[str, int]] = {}
+    try:
+        with open(path or LOG_PATH, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                if entry.get("run_id") != run_id:
+                    continue
+                totals = stages.setdefault(entry["stage"], {"requests": 0, "bytes": 0, "truncated": 0})
+                for key in totals:
+                    totals[key] += entry.get(key, 0)
+    except FileNotFoundError:
+        pass
+    return stages
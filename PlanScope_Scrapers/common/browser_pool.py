@@ -0,0 +1,228 @@
+"""
+Shared headless Chrome pool for the Selenium stages.
+
+Starting a browser used to cost a ChromeDriverManager().install() (network
+lookups) plus a cold Chrome start in every script, and every page pulled images,
+fonts and stylesheets nobody reads. Here:
+
+- the chromedriver path is resolved once and cached on disk
+  (.cache/chromedriver.json, refreshed after DRIVER_CACHE_TTL_DAYS), so later
+  runs and other scripts skip webdriver_manager entirely;
+- browsers are kept warm: release() parks a driver on about:blank for the next
+  acquire() in the same process instead of quitting it (all are quit at exit);
+- non-essential resources are blocked through CDP (Network.setBlockedURLs).
+  PDFs are never blocked, so the protocol downloader can use pooled browsers.
+
+Configuration (.env):
+    CHROMEDRIVER_PATH=...            # Use this driver, skip resolution entirely
+    BROWSER_POOL_SIZE=2              # Idle browsers kept warm per process
+    BROWSER_BLOCK_RESOURCES=off      # Load images / fonts / CSS again
+
+Usage:
+    driver = browser_pool.acquire()
+    try:
+        driver.get(url)
+    finally:
+        browser_pool.release(driver)
+"""
+
+import atexit
+import json
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import List, Optional
+
+from selenium import webdriver
+from selenium.common.exceptions import WebDriverException
+from selenium.webdriver.chrome.options import Options
+from selenium.webdriver.chrome.service import Service
+
+logger = logging.getLogger(__name__)
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+
+DRIVER_CACHE_PATH = Path(__file__).resolve().parent.parent / ".cache" / "chromedriver.json"
+DRIVER_CACHE_TTL_DAYS = 7
+POOL_SIZE = int(os.getenv("BROWSER_POOL_SIZE", "2"))
+BLOCK_RESOURCES = os.getenv("BROWSER_BLOCK_RESOURCES", "on").lower() not in ("off", "0", "false")
+
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
+
+# URL patterns blocked while BLOCK_RESOURCES is on (never PDFs)
+BLOCKED_URL_PATTERNS = [
+    "*.png", "*.jpg", "*.jpeg", "*.gif", "*.svg", "*.webp", "*.ico", "*.bmp",
+    "*.woff", "*.woff2", "*.ttf", "*.otf", "*.eot",
+    "*.css", "*.mp4", "*.webm",
+    "*google-analytics.com*", "*googletagmanager.com*",
+]
+
+_lock = threading.Lock()
+_idle: List[webdriver.Chrome] = []
+_all: List[webdriver.Chrome] = []
+_driver_path: Optional[str] = None
+_driver_resolved = False
+_registered = False
+
+
+def _read_cached_driver_path() -> Optional[str]:
+    try:
+        with open(DRIVER_CACHE_PATH, "r", encoding="utf-8") as f:
+            cached = json.load(f)
+    except (OSError, ValueError):
+        return None
+    path = cached.get("path")
+    fresh = time.time() - cached.get("resolved_at", 0) < DRIVER_CACHE_TTL_DAYS * 86400
+    if path and fresh and os.path.exists(path):
+        return path
+    return None
+
+
+def _write_cached_driver_path(path: str):
+    try:
+        DRIVER_CACHE_PATH.parent.mkdir(parents=True, exist_ok=True)
+        with open(DRIVER_CACHE_PATH, "w", encoding="utf-8") as f:
+            json.dump({"path": path, "resolved_at": time.time()}, f)
+    except OSError as e:
+        logger.warning(f"Could not cache chromedriver path: {e}")
+
+
+def driver_path() -> Optional[str]:
+    """
+    chromedriver to use: CHROMEDRIVER_PATH, else the cached resolution, else
+    webdriver_manager (result cached). None lets Selenium find one itself.
+    """
+    global _driver_path, _driver_resolved
+    with _lock:
+        if _driver_resolved:
+            return _driver_path
+        _driver_path = os.getenv("CHROMEDRIVER_PATH") or _read_cached_driver_path()
+        if _driver_path is None:
+            try:
+                from webdriver_manager.chrome import ChromeDriverManager
+                _driver_path = ChromeDriverManager().install()
+                _write_cached_driver_path(_driver_path)
+            except Exception as e:
+                logger.warning(f"webdriver_manager unavailable ({e}), using the system chromedriver")
+        _driver_resolved = True
+        return _driver_path
+
+
+def _chrome_options() -> Options:
+    options = Options()
+    options.add_argument("--headless=new")
+    options.add_argument("--no-sandbox")
+    options.add_argument("--disable-dev-shm-usage")
+    options.add_argument("--disable-gpu")
+    options.add_argument("--window-size=1920,1080")
+    options.add_argument("--disable-blink-features=AutomationControlled")
+    options.add_argument(f"user-agent={USER_AGENT}")
+    options.add_experimental_option("prefs", {
+        "download.prompt_for_download": False,
+        "download.directory_upgrade": True,
+        "plugins.always_open_pdf_externally": True,
+    })
+    return options
+
+
+def _launch() -> webdriver.Chrome:
+    global _registered
+    path = driver_path()
+    if path:
+        driver = webdriver.Chrome(service=Service(path), options=_chrome_options())
+    else:
+        driver = webdriver.Chrome(options=_chrome_options())
+    driver.execute_cdp_cmd("Network.enable", {})
+    with _lock:
+        _all.append(driver)
+        if not _registered:
+            atexit.register(shutdown)
+            _registered = True
+    return driver
+
+
+def _alive(driver: webdriver.Chrome) -> bool:
+    try:
+        driver.current_url
+        return True
+    except WebDriverException:
+        return False
+
+
+def _quit(driver: webdriver.Chrome):
+    with _lock:
+        if driver in _all:
+            _all.remove(driver)
+    try:
+        driver.quit()
+    except WebDriverException:
+        pass
+
+
+def acquire(block_resources: bool = BLOCK_RESOURCES) -> webdriver.Chrome:
+    """A warm browser from the pool, or a new one."""
+    driver = None
+    while driver is None:
+        with _lock:
+            candidate = _idle.pop() if _idle else None
+        if candidate is None:
+            driver = _launch()
+        elif _alive(candidate):
+            driver = candidate
+        else:
+            _quit(candidate)
+
+    driver.execute_cdp_cmd("Network.setBlockedURLs",
+                           {"urls": BLOCKED_URL_PATTERNS if block_resources else []})
+    return driver
+
+
+def _clear_web_storage(driver: webdriver.Chrome):
+    """local/sessionStorage of the page the borrower left the browser on (best effort)."""
+    try:
+        driver.execute_script("window.localStorage.clear(); window.sessionStorage.clear();")
+    except WebDriverException:
+        pass   # about:blank, data: URLs etc. have no storage
+
+
+def release(driver: Optional[webdriver.Chrome]):
+    """
+    Give a browser back: kept warm (on about:blank) if the pool has room, else quit.
+    The next borrower gets no cookies or web storage from this one.
+    """
+    if driver is None:
+        return
+    try:
+        _clear_web_storage(driver)
+        driver.get("about:blank")
+        # delete_all_cookies() only covers the current document's domain (none on
+        # about:blank); the CDP call clears the complot session cookies too
+        driver.execute_cdp_cmd("Network.clearBrowserCookies", {})
+    except WebDriverException:
+        _quit(driver)
+        return
+    with _lock:
+        if len(_idle) < POOL_SIZE:
+            _idle.append(driver)
+            return
+    _quit(driver)
+
+
+def warm(count: int = 1):
+    """Start `count` browsers ahead of time (e.g. while the HTTP stages run)."""
+    drivers = [acquire() for _ in range(count)]
+    for driver in drivers:
+        release(driver)
+
+
+def shutdown():
+    """Quit every browser of this process (registered at exit)."""
+    with _lock:
+        drivers = list(_all)
+        _idle.clear()
+    for driver in drivers:
+        _quit(driver)
@@ -0,0 +1,143 @@
+"""
+Per-host circuit breaker for the fetch layer.
+
+When handasi.complot.co.il or the proxy goes down, every queued permit/plan would
+otherwise burn through its retries against a dead upstream. After
+FAILURE_THRESHOLD consecutive failures (connection errors, timeouts, 5xx) the
+breaker opens and requests are short-circuited with CircuitOpenError, a
+RetryLater that tells the scheduler when to come back and does not use up the
+item's attempts. After the reset timeout a single half-open probe is let through:
+success closes the breaker and the queue resumes, failure re-opens it with a
+longer timeout.
+
+429s and CAPTCHA pages are not outages; those are handled by the AIMD controller
+(common/concurrency.py).
+
+Usage:
+    breaker = get_breaker("handasi.complot.co.il")
+    probing = breaker.before_request()  # raises CircuitOpenError while open
+    ... breaker.on_success() / breaker.on_failure()
+    ... or, if the request failed before reaching upstream: if probing: breaker.release_probe()
+
+common.fetch_client does this automatically for every request.
+"""
+
+import logging
+import threading
+import time
+from typing import Dict
+
+from common.retry_queue import RetryLater
+
+logger = logging.getLogger(__name__)
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+
+FAILURE_THRESHOLD = 5          # Consecutive failures that open the breaker
+RESET_TIMEOUT = 30.0           # Seconds open before the first half-open probe
+MAX_RESET_TIMEOUT = 300.0      # Cap when probes keep failing (timeout doubles)
+PROBE_WAIT = 5.0               # Retry delay for requests queued behind a running probe
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half-open"
+
+
+class CircuitOpenError(RetryLater):
+    """Request short-circuited because the host's breaker is open."""
+
+    def __init__(self, name: str, delay: float):
+        super().__init__(f"circuit open for {name}", delay=delay, count_attempt=False)
+
+
+class CircuitBreaker:
+    """Closed -> open after repeated failures -> half-open probe -> closed."""
+
+    def __init__(self, name: str, failure_threshold: int = FAILURE_THRESHOLD,
+                 reset_timeout: float = RESET_TIMEOUT):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.base_reset_timeout = reset_timeout
+        self.reset_timeout = reset_timeout
+        self.state = CLOSED
+
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    def retry_in(self) -> float:
+        """Seconds until the next half-open probe (0 when requests may go through)."""
+        with self._lock:
+            if self.state == CLOSED:
+                return 0.0
+            if self.state == HALF_OPEN:
+                return PROBE_WAIT
+            return max(0.0, self._opened_at + self.reset_timeout - time.monotonic())
+
+    def before_request(self) -> bool:
+        """
+        Let the request through, or raise CircuitOpenError.
+        Returns True when the request is the half-open probe: it must end in
+        on_success(), on_failure() or release_probe().
+        """
+        with self._lock:
+            if self.state == CLOSED:
+                return False
+            if self.state == OPEN:
+                remaining = self._opened_at + self.reset_timeout - time.monotonic()
+                if remaining > 0:
+                    raise CircuitOpenError(self.name, remaining)
+                self.state = HALF_OPEN
+            # Half-open: exactly one probe at a time
+            if self._probe_in_flight:
+                raise CircuitOpenError(self.name, PROBE_WAIT)
+            self._probe_in_flight = True
+            logger.info(f"[{self.name}] circuit half-open, probing upstream")
+            return True
+
+    def release_probe(self):
+        """The probe failed before reaching upstream (local error): let the next request probe."""
+        with self._lock:
+            self._probe_in_flight = False
+
+    def on_success(self):
+        with self._lock:
+            self._failures = 0
+            if self.state != CLOSED:
+                logger.info(f"[{self.name}] probe succeeded, circuit closed")
+                self.state = CLOSED
+                self.reset_timeout = self.base_reset_timeout
+            self._probe_in_flight = False
+
+    def on_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self.state == HALF_OPEN:
+                self._probe_in_flight = False
+                self.reset_timeout = min(self.reset_timeout * 2, MAX_RESET_TIMEOUT)
+                self._open()
+            elif self.state == CLOSED and self._failures >= self.failure_threshold:
+                self._open()
+
+    def _open(self):
+        self.state = OPEN
+        self._opened_at = time.monotonic()
+        logger.warning(
+            f"[{self.name}] {self._failures} consecutive failures: circuit open, "
+            f"pausing requests for {self.reset_timeout:.0f}s"
+        )
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_registry_lock = threading.Lock()
+
+
+def get_breaker(host: str) -> CircuitBreaker:
+    """Return the process-wide breaker for `host`, creating it on first use."""
+    with _registry_lock:
+        breaker = _breakers.get(host)
+        if breaker is None:
+            breaker = CircuitBreaker(host)
+            _breakers[host] = breaker
+        return breaker
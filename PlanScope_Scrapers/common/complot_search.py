@@ -0,0 +1,122 @@
+"""
+Direct HTTP access to the complot search endpoints.
+
+The batyam.complot.co.il search pages (#search/GetBakashotByNumber&...,
+#search/GetTabaByNumber&..., #search/GetMeetingByDate&...) are a single-page app:
+the hash route is sent as-is to handasi.complot.co.il/magicscripts/mgrqispi.dll,
+which answers with the whole results table as an HTML fragment. DataTables only
+paginates that table in the browser, so one GET returns every row that the
+Selenium scrapers used to collect page by page.
+
+When a search is cut off at the site's row limit, the response carries the
+"search without limit" link (getUnlimitedSearch); search() then re-runs it with
+l=false, as that link does.
+
+Requests go through common/fetch_client.py (pooled session, AIMD slot, shared
+rate budget, circuit breaker).
+
+Incremental discovery: new_items() walks IDs newest-first and stops after
+STOP_AFTER_KNOWN consecutive IDs that are already in the store, so a daily run
+only processes what was added since the last one.
+
+Usage:
+    soup = complot_search.search("GetBakashotByNumber",
+                                 {"siteid": 81, "grp": 0, "t": 0, "b": "2026", "l": "true"})
+    for cells in complot_search.result_rows(soup):
+        ...
+    fresh, stopped = complot_search.new_items(sorted(ids, reverse=True), known_ids)
+"""
+
+import os
+from typing import Any, Callable, Dict, Iterable, List, Tuple
+from urllib.parse import urlencode
+
+from bs4 import BeautifulSoup
+
+from common import fetch_client, html_parser, sites
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+
+SEARCH_ENDPOINT = "https://handasi.complot.co.il/magicscripts/mgrqispi.dll"
+APP_NAME = "cixpa"
+REQUEST_TIMEOUT = 30
+
+# Consecutive already-known IDs after which discovery stops (0 = always read everything)
+STOP_AFTER_KNOWN = int(os.getenv("DISCOVERY_STOP_AFTER_KNOWN", "50"))
+
+# Link the UI shows when a search hit its row limit (it re-runs the search with l=false)
+UNLIMITED_SEARCH_MARKER = "getUnlimitedSearch"
+
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+    'Referer': sites.current().referer,
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
+    'Accept-Language': 'he-IL,he;q=0.9,en-US;q=0.8,en;q=0.7',
+}
+
+
+class SearchError(Exception):
+    """The endpoint did not return a results table (error page, CAPTCHA, changed markup)."""
+
+
+def search_url(program: str, params: Dict[str, Any]) -> str:
+    """mgrqispi.dll URL for `program`; `arguments` lists the parameter names in order."""
+    query = {"appname": APP_NAME, "prgname": program, **params, "arguments": ",".join(params)}
+    return f"{SEARCH_ENDPOINT}?{urlencode(query, safe=',/')}"
+
+
+def search(program: str, params: Dict[str, Any], proxy_pool=None,
+           timeout: float = REQUEST_TIMEOUT, table_id: str = "results-table") -> BeautifulSoup:
+    """
+    Run one search and return the parsed response.
+    Raises SearchError on a non-200 answer or when the `table_id` table is missing.
+    """
+    url = search_url(program, params)
+    response = fetch_client.get(url, headers=HEADERS, timeout=timeout, proxy_pool=proxy_pool)
+    if response.status_code != 200:
+        raise SearchError(f"{program}: HTTP {response.status_code}")
+
+    if UNLIMITED_SEARCH_MARKER in response.text and str(params.get("l")).lower() == "true":
+        # Limited result set: re-run it the way the "click here" link does
+        return search(program, {**params, "l": "false"}, proxy_pool, timeout, table_id)
+
+    soup = html_parser.make_soup(response.text)
+    if soup.find(id=table_id) is None:
+        raise SearchError(f"{program}: no #{table_id} in the response")
+    return soup
+
+
+def result_rows(soup: BeautifulSoup, table_id: str = "results-table") -> List[List[Any]]:
+    """The <td> cells of every body row of the results table."""
+    table = soup.find(id=table_id)
+    if table is None:
+        return []
+    body = table.find("tbody") or table
+    rows = []
+    for tr in body.find_all("tr", recursive=False):
+        cells = tr.find_all("td", recursive=False)
+        if cells:
+            rows.append(cells)
+    return rows
+
+
+
+def new_items(items: Iterable[Any], known, stop_after: int = STOP_AFTER_KNOWN,
+              key: Callable[[Any], Any] = lambda item: item) -> Tuple[List[Any], bool]:
+    """
+    Items (ordered newest-first) whose key is not in `known`. Stops after
+    `stop_after` consecutive known keys; returns (new items, stopped early).
+    """
+    fresh = []
+    known_run = 0
+    for item in items:
+        if key(item) in known:
+            known_run += 1
+            if stop_after and known_run >= stop_after:
+                return fresh, True
+        else:
+            known_run = 0
+            fresh.append(item)
+    return fresh, False
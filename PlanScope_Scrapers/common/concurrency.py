@@ -0,0 +1,156 @@
+"""
+Adaptive (AIMD) concurrency control for requests to one upstream host.
+
+Instead of a hardcoded worker count, every request takes a slot from the host's
+controller. While responses are healthy the number of slots grows by one per
+"window" of successes (additive increase); a 429, a proxy "exceeded" error or a
+CAPTCHA page halves it and pauses *all* workers for a cooldown (multiplicative
+decrease), so throughput converges to the highest rate the upstream tolerates.
+
+Usage:
+    controller = get_controller("handasi.complot.co.il", max_limit=MAX_WORKERS)
+    with controller.slot():
+        response = session.get(url)
+    controller.on_success()            # or controller.on_throttle("429")
+
+common.fetch_client does this automatically for every request; callers only
+report page-level signals (e.g. missing div#mahut) via on_throttle().
+"""
+
+import asyncio
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict
+
+logger = logging.getLogger(__name__)
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+
+INITIAL_LIMIT = int(os.getenv("AIMD_INITIAL_LIMIT", "4"))
+MIN_LIMIT = 1
+DEFAULT_MAX_LIMIT = int(os.getenv("AIMD_MAX_LIMIT", "16"))
+DECREASE_FACTOR = 0.5          # Multiplicative decrease on a throttle signal
+BASE_COOLDOWN = 30.0           # Seconds every worker pauses after a throttle signal
+MAX_COOLDOWN = 300.0           # Cap for repeated throttles (cooldown doubles each time)
+ASYNC_POLL_INTERVAL = 0.05
+
+
+class AIMDController:
+    """Shared in-flight limit for one host, adjusted from response signals."""
+
+    def __init__(self, name: str, initial: int = INITIAL_LIMIT, min_limit: int = MIN_LIMIT,
+                 max_limit: int = DEFAULT_MAX_LIMIT):
+        self.name = name
+        self.min_limit = max(1, min_limit)
+        self.max_limit = max(self.min_limit, max_limit)
+        self.limit = min(max(initial, self.min_limit), self.max_limit)
+
+        self._in_flight = 0
+        self._successes = 0
+        self._paused_until = 0.0
+        self._cooldown = BASE_COOLDOWN
+        self._cond = threading.Condition()
+
+    # ------------------------------------------------------------------ slots
+
+    def _can_start(self) -> bool:
+        return self._in_flight < self.limit and time.monotonic() >= self._paused_until
+
+    def try_acquire(self) -> bool:
+        """Take a slot if one is free right now (non-blocking)."""
+        with self._cond:
+            if self._can_start():
+                self._in_flight += 1
+                return True
+            return False
+
+    def acquire(self):
+        """Block until a slot is free and no cooldown is in effect."""
+        with self._cond:
+            while not self._can_start():
+                pause = self._paused_until - time.monotonic()
+                self._cond.wait(timeout=pause if pause > 0 else None)
+            self._in_flight += 1
+
+    async def acquire_async(self):
+        """acquire() for the asyncio engine (polls instead of blocking the loop)."""
+        while not self.try_acquire():
+            await asyncio.sleep(ASYNC_POLL_INTERVAL)
+
+    def release(self):
+        with self._cond:
+            self._in_flight = max(0, self._in_flight - 1)
+            self._cond.notify()
+
+    @contextmanager
+    def slot(self):
+        self.acquire()
+        try:
+            yield
+        finally:
+            self.release()
+
+    def raise_max_limit(self, max_limit: int):
+        """Let the limit grow up to `max_limit` if that is above the current cap."""
+        with self._cond:
+            self.max_limit = max(self.max_limit, max_limit)
+
+    # ---------------------------------------------------------------- signals
+
+    def on_success(self):
+        """Healthy response: grow the limit by one after `limit` successes."""
+        with self._cond:
+            self._successes += 1
+            if self._successes >= self.limit:
+                self._successes = 0
+                self._cooldown = BASE_COOLDOWN
+                if self.limit < self.max_limit:
+                    self.limit += 1
+                    self._cond.notify()
+
+    def on_throttle(self, reason: str = "throttled"):
+        """
+        429 / proxy limit / CAPTCHA: shrink the limit and pause everyone.
+        Signals arriving while a cooldown is already running are absorbed, so a
+        burst of concurrent 429s costs a single decrease.
+        """
+        with self._cond:
+            now = time.monotonic()
+            if now < self._paused_until:
+                return
+            old_limit = self.limit
+            self.limit = max(self.min_limit, int(self.limit * DECREASE_FACTOR))
+            self._successes = 0
+            self._paused_until = now + self._cooldown
+            logger.warning(
+                f"[{self.name}] {reason}: concurrency {old_limit} -> {self.limit}, "
+                f"all workers pausing {self._cooldown:.0f}s"
+            )
+            self._cooldown = min(self._cooldown * 2, MAX_COOLDOWN)
+
+
+_controllers: Dict[str, AIMDController] = {}
+_registry_lock = threading.Lock()
+
+
+def get_controller(host: str, **kwargs) -> AIMDController:
+    """
+    Return the process-wide controller for `host`, creating it on first use.
+    initial / min_limit only apply on creation. The cap is the largest max_limit
+    any caller asked for, so the threaded path (its pool size) and the async
+    engine (its concurrency) can share a host in either order; the threaded
+    path never runs more requests than it has threads anyway.
+    """
+    with _registry_lock:
+        controller = _controllers.get(host)
+        if controller is None:
+            controller = AIMDController(host, **kwargs)
+            _controllers[host] = controller
+        elif "max_limit" in kwargs:
+            controller.raise_max_limit(kwargs["max_limit"])
+        return controller
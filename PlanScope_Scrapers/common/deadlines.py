@@ -0,0 +1,111 @@
+"""
+Per-task and per-stage deadlines with cooperative cancellation.
+
+A stage (one script run) gets a deadline, either from the orchestrator
+(PLANSCOPE_STAGE_DEADLINE, an absolute epoch time derived from its subprocess
+timeout) or from STAGE_DEADLINE_MINUTES. run_with_retries gives every task its
+own deadline (never later than the stage's) and installs it as the worker
+thread's current deadline while the task runs. Blocking calls cooperate:
+fetch_client and the OpenAI calls clamp their timeouts to the time left and
+check() raises DeadlineExceeded once it is gone, so a hung connection costs at
+most one task deadline and the stage ends on schedule. Work that did not finish
+is reported as stragglers and stays unprocessed for the next run.
+
+Usage:
+    with deadlines.scope(Deadline.after(300)):
+        deadlines.check()                             # raises DeadlineExceeded
+        requests.get(url, timeout=deadlines.clamp(30))
+"""
+
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Optional
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+
+STAGE_DEADLINE_ENV = "PLANSCOPE_STAGE_DEADLINE"
+MIN_TIMEOUT = 1.0        # Never clamp a timeout below this (avoids instant failures)
+
+_local = threading.local()
+
+
+class DeadlineExceeded(Exception):
+    """The current task or stage ran out of time."""
+
+
+class Deadline:
+    """An absolute point in time (epoch seconds); None means no limit."""
+
+    def __init__(self, expires_at: Optional[float] = None):
+        self.expires_at = expires_at
+
+    @classmethod
+    def after(cls, seconds: Optional[float]) -> "Deadline":
+        return cls(time.time() + seconds if seconds else None)
+
+    def remaining(self) -> Optional[float]:
+        if self.expires_at is None:
+            return None
+        return self.expires_at - time.time()
+
+    @property
+    def expired(self) -> bool:
+        remaining = self.remaining()
+        return remaining is not None and remaining <= 0
+
+    def earliest(self, other: "Deadline") -> "Deadline":
+        candidates = [d for d in (self.expires_at, other.expires_at) if d is not None]
+        return Deadline(min(candidates) if candidates else None)
+
+
+def stage_deadline() -> Deadline:
+    """This process's stage deadline (orchestrator-set, else STAGE_DEADLINE_MINUTES, else none)."""
+    expires_at = os.getenv(STAGE_DEADLINE_ENV)
+    if expires_at:
+        return Deadline(float(expires_at))
+    minutes = os.getenv("STAGE_DEADLINE_MINUTES")
+    return Deadline.after(float(minutes) * 60) if minutes else Deadline()
+
+
+def current() -> Deadline:
+    """The calling thread's deadline (the task's inside run_with_retries)."""
+    return getattr(_local, "deadline", None) or Deadline()
+
+
+@contextmanager
+def scope(deadline: Deadline):
+    """Make `deadline` the calling thread's current deadline."""
+    previous = getattr(_local, "deadline", None)
+    _local.deadline = deadline
+    try:
+        yield deadline
+    finally:
+        _local.deadline = previous
+
+
+def check():
+    """Cancellation point: raise DeadlineExceeded if the current deadline has passed."""
+    if current().expired:
+        raise DeadlineExceeded("deadline exceeded")
+
+
+def clamp(timeout: Optional[float]) -> Optional[float]:
+    """`timeout` shortened to the time left on the current deadline."""
+    remaining = current().remaining()
+    if remaining is None:
+        return timeout
+    remaining = max(MIN_TIMEOUT, remaining)
+    return remaining if timeout is None else min(timeout, remaining)
+
+
+def sleep(seconds: float):
+    """time.sleep that wakes up (and raises) when the current deadline passes first."""
+    remaining = current().remaining()
+    if remaining is not None and remaining < seconds:
+        time.sleep(max(0.0, remaining))
+        raise DeadlineExceeded("deadline exceeded while waiting")
+    time.sleep(seconds)
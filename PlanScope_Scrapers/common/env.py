@@ -0,0 +1,56 @@
+"""
+.env loading for the shared modules.
+
+The common modules read their settings (PROXY_POOL_SIZE, AIMD_*, RATE_LIMIT_*,
+FETCH_*, RESPONSE_CACHE_*, ...) from the environment when they are imported, so
+the .env file has to be loaded before the first `from common import ...`. The
+package does it on import (common/__init__.py); the scripts' own load_dotenv
+calls run later and only add what is not set yet.
+
+Search order:
+    PLANSCOPE_ENV_FILE        # Explicit path, e.g. per deployment
+    PlanScope/.env
+    PlanScope/.env.example
+
+Variables already set in the process environment win over the file.
+"""
+
+import os
+from pathlib import Path
+from typing import Optional
+
+try:
+    from dotenv import load_dotenv
+    HAS_DOTENV = True
+except ImportError:
+    HAS_DOTENV = False
+
+ENV_FILE_ENV = "PLANSCOPE_ENV_FILE"
+PROJECT_DIR = Path(__file__).resolve().parent.parent.parent   # PlanScope/
+
+_loaded = False
+_env_file: Optional[Path] = None
+
+
+def env_file() -> Optional[Path]:
+    """The .env file to load, or None when there is none."""
+    explicit = os.getenv(ENV_FILE_ENV)
+    if explicit:
+        return Path(explicit)
+    for name in (".env", ".env.example"):
+        path = PROJECT_DIR / name
+        if path.exists():
+            return path
+    return None
+
+
+def load() -> Optional[Path]:
+    """Load the .env file once per process; returns the file loaded (None without one)."""
+    global _loaded, _env_file
+    if not _loaded:
+        _loaded = True
+        path = env_file()
+        if HAS_DOTENV and path is not None and path.exists():
+            load_dotenv(path)
+            _env_file = path
+    return _env_file
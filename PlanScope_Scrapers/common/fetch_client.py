@@ -0,0 +1,373 @@
+"""
+Shared HTTP client for the complot fetchers.
+
+Every worker thread keeps its own requests.Session (keep-alive connection pool)
+and sticks to one proxy session of the script's ProxyPool (common/proxy_pool.py),
+so consecutive permits/plans handled by the same thread reuse the already-open
+tunnel to handasi.complot.co.il instead of paying a fresh TCP+TLS handshake
+through the proxy for every page and every retry. Latency and outcome of every
+request are reported back to the pool for health scoring.
+
+Every request also takes a slot from the host's AIMD controller
+(common/concurrency.py): 429s and proxy "exceeded" errors are reported to it
+here, page-level signals (CAPTCHA pages) by the callers. It then takes a token
+from the host's cross-process token bucket (common/rate_limiter.py), so all
+pipelines running at once share one request budget per host. Connection errors,
+timeouts and 5xx feed the host's circuit breaker (common/circuit_breaker.py);
+while it is open, get() raises CircuitOpenError (a RetryLater) without sending.
+
+Optional hedging (FETCH_HEDGING=on in .env): when a request through the pool
+takes longer than the host's rolling p95 latency, one duplicate is sent through
+a different proxy session and whichever answers first wins; the other one stops
+reading its body (or is never sent, if it is still queued). Hedges are capped
+by a global budget (HEDGE_BUDGET, fraction of all requests) and go through the
+same AIMD slots and token bucket, so upstream load stays controlled.
+
+Bodies are streamed (common/streaming.py) and decoded with the declared charset
+instead of requests' apparent_encoding; the wire bytes of every body are recorded
+in common/bandwidth.py. With FETCH_STREAMING=on, callers passing stop_after_ids
+stop reading once those elements are closed, so the rest of the page is never
+downloaded (the body, and what gets cached, then ends after the last section).
+
+Usage:
+    fetch_client.configure(pool_size=MAX_WORKERS)
+    response = fetch_client.get(url, headers=HEADERS, timeout=30, proxy_pool=PROXY_POOL)
+    ...
+    PROXY_POOL.rotate()  # only when the current exit misbehaves
+"""
+
+import concurrent.futures
+import os
+import threading
+import time
+from collections import deque
+from typing import Dict, Iterable, Optional
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from common import bandwidth, deadlines
+from common.circuit_breaker import get_breaker
+from common.concurrency import get_controller
+from common.proxy_pool import ProxyPool
+from common.rate_limiter import get_limiter
+from common.streaming import ReadCancelled, declared_charset, read_body
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+
+DEFAULT_POOL_SIZE = 10  # Connections kept per host, per thread session
+
+STREAMING = os.getenv("FETCH_STREAMING", "off").lower() in ("on", "1", "true")
+HEDGING = os.getenv("FETCH_HEDGING", "off").lower() in ("on", "1", "true")
+HEDGE_BUDGET = float(os.getenv("HEDGE_BUDGET", "0.05"))   # Max hedges as a fraction of requests
+HEDGE_MIN_SAMPLES = 20         # Latency samples per host before hedging starts
+LATENCY_WINDOW = 200           # Recent successful requests used for the rolling p95
+
+_pool_size = DEFAULT_POOL_SIZE
+_rate_budget: Optional[str] = None
+_local = threading.local()
+
+_stats_lock = threading.Lock()
+_latencies: Dict[str, deque] = {}
+_requests_sent = 0
+_hedges_sent = 0
+_hedge_executor: Optional[concurrent.futures.ThreadPoolExecutor] = None
+
+
+def configure(pool_size: int = DEFAULT_POOL_SIZE, rate_budget: Optional[str] = None):
+    """
+    Size the connection pools of sessions created from now on, and the AIMD
+    concurrency cap this process asks for per host.
+    Call once at startup with the script's MAX_WORKERS.
+    With `rate_budget`, this process draws its tokens from a separate bucket per
+    host ("<host>#<rate_budget>", limits in rate_limiter.HOST_LIMITS) instead of
+    the budget shared by the daily pipelines.
+    """
+    global _pool_size, _rate_budget
+    _pool_size = max(1, int(pool_size))
+    _rate_budget = rate_budget
+
+
+def rate_key(host: str) -> str:
+    """Token bucket key of `host` for this process."""
+    return f"{host}#{_rate_budget}" if _rate_budget else host
+
+
+def _new_session() -> requests.Session:
+    session = requests.Session()
+    # Retries are handled by the callers (429 / CAPTCHA logic), not by urllib3
+    adapter = HTTPAdapter(pool_connections=_pool_size, pool_maxsize=_pool_size, max_retries=0)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def get_session() -> requests.Session:
+    """Return the calling thread's session, creating it on first use."""
+    session = getattr(_local, "session", None)
+    if session is None:
+        session = _new_session()
+        _local.session = session
+    return session
+
+
+def _drop_stale_proxy(session: requests.Session, proxy_url: Optional[str]):
+    """
+    When the thread moves to another proxy session, drop the connections that were
+    tunnelled through the old one (requests keeps one ProxyManager per proxy URL;
+    without this they pile up).
+    """
+    old_url = getattr(_local, "proxy_url", None)
+    if old_url and old_url != proxy_url:
+        for adapter in session.adapters.values():
+            manager = adapter.proxy_manager.pop(old_url, None)
+            if manager is not None:
+                manager.clear()
+    _local.proxy_url = proxy_url
+
+
+def is_proxy_limit_error(error: Exception) -> bool:
+    """True for proxy tunnel errors that mean "slow down" (tunnel 429 / limit exceeded)."""
+    error_str = str(error).lower()
+    return isinstance(error, requests.exceptions.ProxyError) and ("429" in error_str or "exceeded" in error_str)
+
+
+def _record_latency(host: str, elapsed: float):
+    with _stats_lock:
+        window = _latencies.get(host)
+        if window is None:
+            window = _latencies[host] = deque(maxlen=LATENCY_WINDOW)
+        window.append(elapsed)
+
+
+def hedge_delay(host: str) -> Optional[float]:
+    """Rolling p95 latency of `host`, or None until enough samples were seen."""
+    with _stats_lock:
+        window = _latencies.get(host)
+        if window is None or len(window) < HEDGE_MIN_SAMPLES:
+            return None
+        ordered = sorted(window)
+    return ordered[int(0.95 * (len(ordered) - 1))]
+
+
+def _hedge_budget_left() -> bool:
+    with _stats_lock:
+        return _hedges_sent + 1 <= HEDGE_BUDGET * _requests_sent
+
+
+def _take_hedge_budget() -> bool:
+    global _hedges_sent
+    with _stats_lock:
+        if _hedges_sent + 1 > HEDGE_BUDGET * _requests_sent:
+            return False
+        _hedges_sent += 1
+        return True
+
+
+def hedge_stats() -> Dict[str, int]:
+    with _stats_lock:
+        return {"requests": _requests_sent, "hedges": _hedges_sent}
+
+
+def _get_hedge_executor() -> concurrent.futures.ThreadPoolExecutor:
+    global _hedge_executor
+    with _stats_lock:
+        if _hedge_executor is None:
+            _hedge_executor = concurrent.futures.ThreadPoolExecutor(
+                max_workers=2 * _pool_size, thread_name_prefix="fetch-hedge")
+        return _hedge_executor
+
+
+def _read(url: str, response: requests.Response, stop_after_ids: Optional[Iterable[str]],
+          deadline: Optional[deadlines.Deadline] = None, cancel: Optional[threading.Event] = None):
+    """Stream the body into the response, set its declared charset and account the bytes."""
+    body, truncated = read_body(response, stop_after_ids if STREAMING else None, deadline, cancel)
+    response._content = body
+    response._content_consumed = True
+    response.encoding = declared_charset(response.headers.get("Content-Type"), body)
+    response.wire_bytes = response.raw.tell() or len(body)
+    response.truncated = truncated
+    bandwidth.record(url, response.wire_bytes, truncated)
+
+
+def _send(url: str, host: str, proxies: Optional[dict], proxy_pool: Optional[ProxyPool],
+          proxy_session, drop_stale: bool = True, stop_after_ids: Optional[Iterable[str]] = None,
+          deadline: Optional[deadlines.Deadline] = None, cancel: Optional[threading.Event] = None,
+          **kwargs) -> requests.Response:
+    """
+    One request inside an AIMD slot and a rate-limit token, with all signals reported.
+    Setting `cancel` abandons the body read with ReadCancelled (not an upstream failure).
+    """
+    global _requests_sent
+    breaker = get_breaker(host)
+    controller = get_controller(host, max_limit=_pool_size)
+    if proxy_session is not None:
+        proxies = proxy_session.proxies
+
+    session = get_session()
+    if proxy_session is not None and drop_stale:
+        _drop_stale_proxy(session, proxy_session.proxy_url)
+
+    with controller.slot():
+        get_limiter().acquire(rate_key(host))
+        with _stats_lock:
+            _requests_sent += 1
+        start = time.monotonic()
+        try:
+            response = session.get(url, proxies=proxies, stream=True, **kwargs)
+            _read(url, response, stop_after_ids, deadline, cancel)
+        except ReadCancelled:
+            raise
+        except (requests.exceptions.RequestException, deadlines.DeadlineExceeded) as e:
+            limited = is_proxy_limit_error(e)
+            if limited:
+                # The proxy answered, so this is throttling rather than an outage
+                controller.on_throttle("proxy limit")
+                breaker.on_success()
+            else:
+                breaker.on_failure()
+            if proxy_session is not None:
+                proxy_pool.report(proxy_session, ok=False, throttled=limited)
+            raise
+        elapsed = time.monotonic() - start
+
+    if response.status_code >= 500:
+        breaker.on_failure()
+    else:
+        breaker.on_success()
+
+    if response.status_code == 429:
+        controller.on_throttle("429")
+    elif response.ok:
+        controller.on_success()
+        _record_latency(host, elapsed)
+
+    if proxy_session is not None:
+        proxy_pool.report(
+            proxy_session,
+            ok=response.status_code < 500 and response.status_code != 429,
+            latency=elapsed,
+            throttled=response.status_code == 429,
+        )
+    return response
+
+
+def _hedge_leg(started: threading.Event, cancel: threading.Event, url: str, host: str,
+               proxy_pool: ProxyPool, proxy_session, **kwargs) -> requests.Response:
+    started.set()
+    if cancel.is_set():
+        raise ReadCancelled("the other leg already answered")
+    # Executor threads serve many callers' proxy sessions, so keep their tunnels
+    return _send(url, host, None, proxy_pool, proxy_session, drop_stale=False, cancel=cancel, **kwargs)
+
+
+def _hedged_send(url: str, host: str, delay: float, proxy_pool: ProxyPool, proxy_session,
+                 **kwargs) -> requests.Response:
+    """
+    Run the request on the hedge executor; if it has not answered `delay` seconds
+    after it started, race one duplicate through another proxy session. The first
+    good answer wins and the other leg is cancelled. Returns the last 5xx answer
+    when neither succeeds; raises only when neither answered.
+    """
+    if not _hedge_budget_left():
+        return _send(url, host, None, proxy_pool, proxy_session, **kwargs)
+
+    executor = _get_hedge_executor()
+    primary_started, primary_cancel = threading.Event(), threading.Event()
+    primary = executor.submit(_hedge_leg, primary_started, primary_cancel, url, host,
+                              proxy_pool, proxy_session, **kwargs)
+    # Time spent queued for an executor thread is not upstream latency
+    primary_started.wait()
+    try:
+        return primary.result(timeout=delay)
+    except concurrent.futures.TimeoutError:
+        pass
+
+    if not _take_hedge_budget():
+        return primary.result()
+
+    hedge_session = proxy_pool.pick(exclude=proxy_session)
+    hedge_cancel = threading.Event()
+    hedge = executor.submit(_hedge_leg, threading.Event(), hedge_cancel, url, host,
+                            proxy_pool, hedge_session, **kwargs)
+    cancels = {primary: primary_cancel, hedge: hedge_cancel}
+    pending = set(cancels)
+    error = None
+    last_response = None   # A 5xx answer, returned if the other request fails too
+    try:
+        while pending:
+            done, pending = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in done:
+                try:
+                    response = future.result()
+                except (requests.exceptions.RequestException, deadlines.DeadlineExceeded) as e:
+                    error = error or e
+                    continue
+                if response.status_code < 500:
+                    return response
+                last_response = response
+    finally:
+        # The loser stops reading its body, so its executor thread frees up
+        for future in pending:
+            cancels[future].set()
+    if last_response is not None:
+        return last_response
+    raise error
+
+
+def get(url: str, proxies: Optional[dict] = None, proxy_pool: Optional[ProxyPool] = None,
+        stop_after_ids: Optional[Iterable[str]] = None, **kwargs) -> requests.Response:
+    """
+    GET through the calling thread's pooled session, inside a concurrency slot
+    of the target host's AIMD controller and within the host's shared rate budget.
+    With `proxy_pool`, the thread's pinned proxy session is used and scored, and
+    the request is hedged when FETCH_HEDGING is on. With FETCH_STREAMING on, the
+    body ends once the elements with `stop_after_ids` are closed.
+    Raises CircuitOpenError while the host's circuit breaker is open, and
+    DeadlineExceeded once the calling task's deadline (common/deadlines.py) has
+    passed; the timeout is clamped to the time left.
+    """
+    deadlines.check()
+    deadline = deadlines.current()
+    kwargs["timeout"] = deadlines.clamp(kwargs.get("timeout"))
+    host = urlparse(url).hostname
+    breaker = get_breaker(host)
+    probing = breaker.before_request()
+    try:
+        proxy_session = proxy_pool.current() if proxy_pool is not None and proxy_pool.enabled else None
+
+        if HEDGING and proxy_session is not None:
+            delay = hedge_delay(host)
+            if delay is not None:
+                return _hedged_send(url, host, delay, proxy_pool, proxy_session,
+                                    stop_after_ids=stop_after_ids, deadline=deadline, **kwargs)
+
+        return _send(url, host, proxies, proxy_pool, proxy_session,
+                     stop_after_ids=stop_after_ids, deadline=deadline, **kwargs)
+    except BaseException:
+        # Upstream errors were already reported by _send; a local error (rate limiter
+        # lock, proxy pool, ...) must not leave the half-open probe slot taken
+        if probing:
+            breaker.release_probe()
+        raise
+
+
+def report_throttle(url: str, reason: str, proxy_pool: Optional[ProxyPool] = None):
+    """
+    Page-level throttle signal, e.g. a CAPTCHA page served with status 200.
+    With `proxy_pool`, the calling thread's proxy session is penalised as well.
+    """
+    get_controller(urlparse(url).hostname, max_limit=_pool_size).on_throttle(reason)
+    if proxy_pool is not None and proxy_pool.enabled:
+        proxy_pool.mark_throttled(proxy_pool.current())
+
+
+def close():
+    """Close the calling thread's session (e.g. at the end of a worker)."""
+    session = getattr(_local, "session", None)
+    if session is not None:
+        session.close()
+        _local.session = None
@@ -0,0 +1,56 @@
+"""
+HTML parser backend for the permit / plan / search pages.
+
+Every page is parsed into a BeautifulSoup tree and read by the _parse_* helpers
+through the bs4 API (find / find_all / select / get_text). Only the tree builder
+is swapped:
+
+    html.parser   pure Python (default, what the records were built with so far)
+    lxml          C-backed libxml2 builder, several times faster per page
+
+Both builders must give the same records before a switch: compare_parsers.py
+re-parses cached pages with both and reports every page whose record differs.
+
+Configuration (.env):
+    HTML_PARSER_BACKEND=lxml         # Per run; falls back to html.parser if lxml is missing
+
+Usage:
+    soup = html_parser.make_soup(response.content)
+"""
+
+import logging
+import os
+from typing import Optional, Union
+
+from bs4 import BeautifulSoup, FeatureNotFound, SoupStrainer
+
+logger = logging.getLogger(__name__)
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+
+BACKENDS = ("html.parser", "lxml")
+DEFAULT_BACKEND = "html.parser"
+PARSER_BACKEND = os.getenv("HTML_PARSER_BACKEND", DEFAULT_BACKEND)
+
+_warned = False
+
+
+def make_soup(markup: Union[str, bytes], backend: Optional[str] = None,
+              parse_only: Optional[SoupStrainer] = None) -> BeautifulSoup:
+    """
+    Parse `markup` with `backend` (default: PARSER_BACKEND).
+    `parse_only` builds a partial tree (see common/html_sections.py).
+    """
+    global _warned
+    backend = backend or PARSER_BACKEND
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown HTML_PARSER_BACKEND '{backend}' (known: {', '.join(BACKENDS)})")
+    try:
+        return BeautifulSoup(markup, backend, parse_only=parse_only)
+    except FeatureNotFound:
+        if not _warned:
+            logger.warning(f"HTML parser backend '{backend}' is not installed, using {DEFAULT_BACKEND}")
+            _warned = True
+        return BeautifulSoup(markup, DEFAULT_BACKEND, parse_only=parse_only)
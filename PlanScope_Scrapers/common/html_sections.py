@@ -0,0 +1,50 @@
+"""
+Partial trees for the detail pages.
+
+The extractors read a handful of regions of each page, but the whole document
+(scripts, styles, menus, footers) used to be built into a tree and kept alive
+until the worker moved on. Strainers let the tree builder keep only what the
+extractors read:
+
+- by_id(ids): only the elements with these ids and their subtrees. For pages
+  whose extractors all start from an id (permit pages, PERMIT_SECTION_IDS).
+- without_boilerplate(): everything except head / script / style / ... at top
+  level. For pages read by labels and table contents rather than ids (plan pages).
+
+The document is still tokenized, but no tree is built for the skipped parts.
+release() frees a tree as soon as its records are extracted (extractors return
+plain str values, never tree nodes).
+
+Usage:
+    soup = html_parser.make_soup(content, parse_only=html_sections.by_id(PERMIT_SECTION_IDS))
+    try:
+        record = parse_permit_page(soup)
+    finally:
+        html_sections.release(soup)
+"""
+
+from typing import Iterable, Optional
+
+from bs4 import BeautifulSoup, SoupStrainer
+
+# Elements that never hold extracted content
+BOILERPLATE_TAGS = frozenset({
+    "html", "head", "body", "title", "meta", "link", "script", "style", "noscript", "svg", "iframe",
+})
+
+
+def by_id(ids: Iterable[str]) -> SoupStrainer:
+    """Keep only the elements with `ids` (and everything inside them)."""
+    return SoupStrainer(id=list(ids))
+
+
+def without_boilerplate() -> SoupStrainer:
+    """Keep the page's content elements, drop head / scripts / styles outside them."""
+    # html and body are dropped too, so their children are tested one by one
+    return SoupStrainer(name=lambda name: name not in BOILERPLATE_TAGS)
+
+
+def release(soup: Optional[BeautifulSoup]):
+    """Free a parsed tree right away instead of waiting for the garbage collector."""
+    if soup is not None:
+        soup.decompose()
@@ -0,0 +1,227 @@
+"""
+Proxy session pool for the Bright Data (brd-customer) proxy.
+
+Replaces the get_proxy_dict / test_proxy_connection copies in the scrapers. The pool
+keeps a set of proxy sessions (a session id pins one exit IP), tracks latency,
+error rate and 429s per session, retires sessions that misbehave and mints fresh
+ones in their place. Each worker thread sticks to one session (so fetch_client's
+keep-alive tunnel is reused) until it is retired or the worker asks to rotate.
+
+Health checks are lazy: nothing is probed at startup; a daemon thread starts on
+first use and only probes sessions that recently failed, so a flaky exit is either
+cleared or retired without a worker having to find out the hard way.
+
+Usage:
+    PROXY_POOL = ProxyPool(PROXY_HOST, PROXY_PORT, PROXY_USER, PROXY_PASS, enabled=USE_PROXY)
+    response = fetch_client.get(url, proxy_pool=PROXY_POOL, ...)   # picks, times and reports
+    PROXY_POOL.rotate()                                           # move this thread to another exit
+"""
+
+import logging
+import os
+import random
+import string
+import threading
+import time
+from typing import Dict, List, Optional
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+
+DEFAULT_POOL_SIZE = int(os.getenv("PROXY_POOL_SIZE", "10"))   # Warm sessions kept per pool
+LATENCY_ALPHA = 0.3            # EWMA weight of the newest latency sample
+MIN_SAMPLES = 4                # Requests before the error rate is trusted
+MAX_ERROR_RATE = 0.5           # Retire above this error rate
+MAX_THROTTLES = 3              # Retire after this many 429 / limit hits
+HEALTH_CHECK_URL = "https://httpbin.org/ip"
+HEALTH_CHECK_INTERVAL = 60     # Seconds between background sweeps
+HEALTH_CHECK_TIMEOUT = 20
+
+
+def _random_session_id() -> str:
+    return ''.join(random.choices(string.ascii_lowercase + string.digits, k=8))
+
+
+def build_proxy_url(host: str, port: str, user: Optional[str], password: Optional[str],
+                    session_id: Optional[str] = None) -> Optional[str]:
+    """Proxy URL with Bright Data Israel targeting and session pinning."""
+    if not user or not password:
+        return None
+    if 'brd-customer' in user:
+        # Force Israel targeting if not already in username
+        if '-country-' not in user:
+            user = f"{user}-country-il"
+        # IP Rotation Logic
+        if session_id:
+            user = f"{user}-session-{session_id}"
+    return f"http://{user}:{password}@{host}:{port}"
+
+
+class ProxySession:
+    """One pinned proxy exit and its health statistics."""
+
+    def __init__(self, proxy_url: Optional[str], session_id: str):
+        self.session_id = session_id
+        self.proxy_url = proxy_url
+        self.proxies = {"http": proxy_url, "https": proxy_url} if proxy_url else None
+        self.requests = 0
+        self.errors = 0
+        self.throttles = 0
+        self.latency = None            # EWMA seconds
+        self.users = 0                 # Threads currently pinned to it
+        self.retired = False
+        self.needs_check = False
+
+    @property
+    def error_rate(self) -> float:
+        return self.errors / self.requests if self.requests else 0.0
+
+    def score(self) -> float:
+        """Lower is better: expected latency inflated by errors and throttles."""
+        latency = self.latency if self.latency is not None else 1.0
+        return latency * (1 + 4 * self.error_rate) * (1 + self.throttles) * (1 + self.users)
+
+    def is_unhealthy(self) -> bool:
+        if self.throttles >= MAX_THROTTLES:
+            return True
+        return self.requests >= MIN_SAMPLES and self.error_rate > MAX_ERROR_RATE
+
+
+class ProxyPool:
+    """Set of warm proxy sessions with health scoring; thread-safe."""
+
+    def __init__(self, host: str, port: str, user: Optional[str], password: Optional[str],
+                 enabled: bool = True, size: int = DEFAULT_POOL_SIZE, verify: bool = False):
+        self.host = host
+        self.port = port
+        self.user = user
+        self.password = password
+        self.enabled = enabled and bool(user and password)
+        self.size = max(1, size)
+        self.verify = verify
+
+        if enabled and not self.enabled:
+            print("⚠️  Error: Proxy is enabled but PROXY_USER or PROXY_PASS are missing from .env!")
+
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._sessions: List[ProxySession] = [self._mint() for _ in range(self.size)]
+        self._checker: Optional[threading.Thread] = None
+
+    # --------------------------------------------------------------- sessions
+
+    def _mint(self) -> ProxySession:
+        session_id = _random_session_id()
+        proxy_url = build_proxy_url(self.host, self.port, self.user, self.password, session_id) if self.enabled else None
+        return ProxySession(proxy_url, session_id)
+
+    def _retire(self, session: ProxySession, reason: str):
+        """Replace a session in the pool with a fresh one (caller holds the lock)."""
+        if session.retired:
+            return
+        session.retired = True
+        if session in self._sessions:
+            self._sessions[self._sessions.index(session)] = self._mint()
+        logger.info(f"Proxy session {session.session_id} retired ({reason})")
+
+    def pick(self, exclude: Optional[ProxySession] = None) -> ProxySession:
+        """
+        Best-scoring live session (no thread affinity, e.g. for the async engine);
+        `exclude` skips a session, e.g. the one a hedged request is racing.
+        """
+        self._ensure_checker()
+        with self._lock:
+            candidates = [s for s in self._sessions if s is not exclude]
+            return min(candidates or self._sessions, key=ProxySession.score)
+
+    def current(self) -> ProxySession:
+        """The calling thread's pinned session, re-pinned if it was retired."""
+        session = getattr(self._local, "session", None)
+        if session is None or session.retired:
+            session = self._pin(self.pick())
+        return session
+
+    def _pin(self, session: ProxySession) -> ProxySession:
+        with self._lock:
+            old = getattr(self._local, "session", None)
+            if old is not None:
+                old.users = max(0, old.users - 1)
+            session.users += 1
+        self._local.session = session
+        return session
+
+    def rotate(self) -> ProxySession:
+        """Move the calling thread to a different (best) session, e.g. after an error."""
+        return self._pin(self.pick(exclude=getattr(self._local, "session", None)))
+
+    def proxies(self) -> Optional[Dict[str, str]]:
+        """requests-style proxies dict for the calling thread's session (None = direct)."""
+        return self.current().proxies if self.enabled else None
+
+    # ---------------------------------------------------------------- reports
+
+    def report(self, session: ProxySession, ok: bool, latency: Optional[float] = None, throttled: bool = False):
+        """Record the outcome of one request made through `session`."""
+        with self._lock:
+            session.requests += 1
+            if latency is not None:
+                session.latency = latency if session.latency is None else (
+                    LATENCY_ALPHA * latency + (1 - LATENCY_ALPHA) * session.latency)
+            if throttled:
+                session.throttles += 1
+            if not ok:
+                session.errors += 1
+                session.needs_check = True
+            if session.is_unhealthy():
+                self._retire(session, f"error rate {session.error_rate:.0%}, {session.throttles} throttles")
+
+    def mark_throttled(self, session: ProxySession):
+        """Page-level block (e.g. CAPTCHA served with 200) seen through `session`."""
+        with self._lock:
+            session.throttles += 1
+            session.needs_check = True
+            if session.is_unhealthy():
+                self._retire(session, f"{session.throttles} throttles")
+
+    # ---------------------------------------------------------- health checks
+
+    def _ensure_checker(self):
+        """Start the background health checker on first use (never blocks startup)."""
+        if not self.enabled or self._checker is not None:
+            return
+        with self._lock:
+            if self._checker is None:
+                self._checker = threading.Thread(target=self._check_loop, name="proxy-health", daemon=True)
+                self._checker.start()
+
+    def _check_loop(self):
+        while True:
+            time.sleep(HEALTH_CHECK_INTERVAL)
+            with self._lock:
+                suspects = [s for s in self._sessions if s.needs_check and not s.retired]
+            for session in suspects:
+                self.check(session)
+
+    def check(self, session: ProxySession) -> bool:
+        """Probe one session through the proxy; retire it if the exit is dead."""
+        start = time.monotonic()
+        try:
+            response = requests.get(HEALTH_CHECK_URL, proxies=session.proxies,
+                                    timeout=HEALTH_CHECK_TIMEOUT, verify=self.verify)
+            ok = response.status_code == 200
+        except requests.exceptions.RequestException as e:
+            logger.warning(f"Proxy session {session.session_id} health check failed: {e}")
+            ok = False
+
+        with self._lock:
+            session.needs_check = False
+            if ok:
+                session.latency = time.monotonic() - start
+            else:
+                self._retire(session, "health check failed")
+        return ok
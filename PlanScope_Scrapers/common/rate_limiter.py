@@ -0,0 +1,137 @@
+"""
+Per-host token-bucket rate limiter shared across threads *and* processes.
+
+The permits and taba orchestrators can run at the same time against the same
+handasi.complot.co.il host. The bucket state lives in a small SQLite file next to
+the pipelines (PlanScope_Scrapers/.rate_limits.sqlite), and every take is done
+inside a `BEGIN IMMEDIATE` transaction, so all running pipelines draw from one
+aggregate budget per host.
+
+Configuration (.env):
+    RATE_LIMIT_PER_SEC=2.0    # Sustained requests per second, per host, all pipelines together
+    RATE_LIMIT_BURST=5        # Bucket size (requests allowed back-to-back after idling)
+    RATE_LIMIT_DB=...         # Override the SQLite path
+
+Usage:
+    limiter = get_limiter()
+    limiter.acquire("handasi.complot.co.il")        # blocks until a token is available
+"""
+
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+
+DB_PATH = os.getenv("RATE_LIMIT_DB", str(Path(__file__).resolve().parent.parent / ".rate_limits.sqlite"))
+DEFAULT_RATE = float(os.getenv("RATE_LIMIT_PER_SEC", "2.0"))
+DEFAULT_BURST = float(os.getenv("RATE_LIMIT_BURST", "5"))
+
+# Per-host overrides: host -> (requests per second, burst)
+HOST_LIMITS: Dict[str, Tuple[float, float]] = {}
+
+MAX_SLEEP = 1.0   # Re-check the shared bucket at least this often while waiting
+
+
+def limits_for(key: str) -> Tuple[float, float]:
+    return HOST_LIMITS.get(key, (DEFAULT_RATE, DEFAULT_BURST))
+
+
+class TokenBucketLimiter:
+    """Token buckets keyed by host, persisted in SQLite so processes share them."""
+
+    def __init__(self, db_path: str = DB_PATH):
+        self.db_path = db_path
+        self._local = threading.local()
+        self._init_db()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # isolation_level=None: we issue BEGIN IMMEDIATE ourselves
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def _init_db(self):
+        self._connect().execute(
+            "CREATE TABLE IF NOT EXISTS buckets ("
+            "key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated_at REAL NOT NULL)"
+        )
+
+    def try_take(self, key: str, tokens: float = 1.0, rate: Optional[float] = None,
+                 burst: Optional[float] = None) -> float:
+        """
+        Take `tokens` from the bucket if available.
+        Returns 0 on success, otherwise the seconds until enough tokens accumulate.
+        """
+        default_rate, default_burst = limits_for(key)
+        rate = rate or default_rate
+        burst = burst or default_burst
+
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            now = time.time()
+            row = conn.execute("SELECT tokens, updated_at FROM buckets WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                available = burst
+            else:
+                available = min(burst, row[0] + max(0.0, now - row[1]) * rate)
+
+            if available >= tokens:
+                available -= tokens
+                wait = 0.0
+            else:
+                wait = (tokens - available) / rate
+
+            conn.execute(
+                "INSERT OR REPLACE INTO buckets (key, tokens, updated_at) VALUES (?, ?, ?)",
+                (key, available, now),
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return wait
+
+    def acquire(self, key: str, tokens: float = 1.0) -> float:
+        """Block until `tokens` are taken from `key`'s bucket. Returns seconds waited."""
+        waited = 0.0
+        while True:
+            wait = self.try_take(key, tokens)
+            if wait <= 0:
+                return waited
+            # Other processes draw from the same bucket, so re-check rather than sleep it all
+            pause = min(wait, MAX_SLEEP)
+            time.sleep(pause)
+            waited += pause
+
+    async def acquire_async(self, key: str, tokens: float = 1.0):
+        """acquire() for the asyncio engine (the SQLite take runs off the event loop)."""
+        while True:
+            # BEGIN IMMEDIATE can wait up to 30s on another process's lock
+            wait = await asyncio.to_thread(self.try_take, key, tokens)
+            if wait <= 0:
+                return
+            await asyncio.sleep(min(wait, MAX_SLEEP))
+
+
+_limiter: Optional[TokenBucketLimiter] = None
+_limiter_lock = threading.Lock()
+
+
+def get_limiter() -> TokenBucketLimiter:
+    """Process-wide limiter instance."""
+    global _limiter
+    with _limiter_lock:
+        if _limiter is None:
+            _limiter = TokenBucketLimiter()
+        return _limiter
@@ -0,0 +1,117 @@
+"""
+On-disk cache of raw complot responses (GetBakashaFile / GetTabaFile / GetMeetingDocs).
+
+Layout (PlanScope_Scrapers/.cache/responses by default):
+    index/<sha256(url)>.json       {"url", "fetched_at", "content_sha256", "content_type"}
+    blobs/<ab>/<content_sha256>.gz  gzip-compressed raw body
+
+Bodies are content-addressed, so a page that did not change between runs (or is
+shared by several URLs) is stored once. Entries are looked up by URL with a TTL:
+the scrapers reuse a page fetched hours earlier instead of paying the proxy again,
+and the "re-parse from cache" modes read entries of any age to rebuild outputs
+offline after a parser change.
+
+Configuration (.env):
+    RESPONSE_CACHE_DIR=...            # Override the cache location
+    RESPONSE_CACHE_TTL_HOURS=12       # Default freshness for network-avoiding lookups
+    RESPONSE_CACHE=off                # Disable reads and writes
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import tempfile
+import time
+from pathlib import Path
+from typing import List, NamedTuple, Optional
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+
+CACHE_DIR = Path(os.getenv("RESPONSE_CACHE_DIR", str(Path(__file__).resolve().parent.parent / ".cache" / "responses")))
+DEFAULT_TTL = float(os.getenv("RESPONSE_CACHE_TTL_HOURS", "12")) * 3600
+ENABLED = os.getenv("RESPONSE_CACHE", "on").lower() not in ("off", "0", "false")
+
+
+class CachedResponse(NamedTuple):
+    url: str
+    content: bytes
+    fetched_at: float
+    content_type: Optional[str]
+
+
+def _url_key(url: str) -> str:
+    return hashlib.sha256(url.encode("utf-8")).hexdigest()
+
+
+def _index_path(url: str) -> Path:
+    return CACHE_DIR / "index" / f"{_url_key(url)}.json"
+
+
+def _blob_path(content_sha256: str) -> Path:
+    return CACHE_DIR / "blobs" / content_sha256[:2] / f"{content_sha256}.gz"
+
+
+def _atomic_write(path: Path, data: bytes):
+    """Write via a temp file + rename so concurrent readers never see a partial file."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def put(url: str, content: bytes, content_type: Optional[str] = None):
+    """Store a raw response body for `url` (only cache pages that parsed successfully)."""
+    if not ENABLED or not content:
+        return
+    content_sha256 = hashlib.sha256(content).hexdigest()
+    blob_path = _blob_path(content_sha256)
+    if not blob_path.exists():
+        _atomic_write(blob_path, gzip.compress(content))
+
+    entry = {
+        "url": url,
+        "fetched_at": time.time(),
+        "content_sha256": content_sha256,
+        "content_type": content_type,
+    }
+    _atomic_write(_index_path(url), json.dumps(entry).encode("utf-8"))
+
+
+def get(url: str, ttl: Optional[float] = DEFAULT_TTL) -> Optional[CachedResponse]:
+    """
+    Return the cached body for `url`, or None if missing / older than `ttl` seconds.
+    ttl=None accepts any age (offline re-parse).
+    """
+    if not ENABLED:
+        return None
+    index_path = _index_path(url)
+    try:
+        entry = json.loads(index_path.read_text(encoding="utf-8"))
+        if ttl is not None and time.time() - entry["fetched_at"] > ttl:
+            return None
+        content = gzip.decompress(_blob_path(entry["content_sha256"]).read_bytes())
+    except (OSError, ValueError, KeyError):
+        return None
+    return CachedResponse(url, content, entry["fetched_at"], entry.get("content_type"))
+
+
+def urls(contains: Optional[str] = None) -> List[str]:
+    """URLs of every cached entry (optionally only those containing `contains`), e.g. for offline tools."""
+    found = []
+    for index_path in sorted((CACHE_DIR / "index").glob("*.json")):
+        try:
+            url = json.loads(index_path.read_text(encoding="utf-8"))["url"]
+        except (OSError, ValueError, KeyError):
+            continue
+        if contains is None or contains in url:
+            found.append(url)
+    return found
@@ -0,0 +1,168 @@
+"""
+Delayed-retry scheduling for the worker pools.
+
+Workers used to sleep inside their thread when a page came back as 429 / CAPTCHA /
+proxy error, idling a whole slot of the pool. Now a worker raises RetryLater and
+moves on; the scheduler parks the item in a delay queue (per-item next-eligible
+time, exponential backoff with jitter) and resubmits it once it is due, while the
+pool keeps working on other items.
+
+Usage:
+    def worker(permit_id):
+        ...
+        raise RetryLater("CAPTCHA")          # instead of time.sleep(...) + retry
+
+    report = run_with_retries(worker, permit_ids, max_workers=MAX_WORKERS,
+                              on_give_up=lambda permit_id, reason: ...,
+                              task_timeout=300, deadline=deadlines.stage_deadline())
+    report.stragglers                        # IDs left unfinished at the stage deadline
+"""
+
+import concurrent.futures
+import heapq
+import itertools
+import logging
+import random
+import time
+from collections import deque
+from typing import Any, Callable, Iterable, List, NamedTuple, Optional
+
+from common import deadlines
+from common.deadlines import Deadline, DeadlineExceeded
+
+logger = logging.getLogger(__name__)
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+
+DEFAULT_MAX_ATTEMPTS = 4
+BASE_DELAY = 15.0       # Seconds before the first retry of an item
+MAX_DELAY = 300.0       # Cap for the per-item backoff
+STRAGGLER_GRACE = 30.0  # Seconds running tasks get to stop after the stage deadline
+
+
+class RetryLater(Exception):
+    """
+    Raised by a worker to hand its item back to the scheduler instead of sleeping.
+    count_attempt=False reschedules without using up one of the item's attempts
+    (e.g. the request was never sent because the host's circuit is open).
+    """
+
+    def __init__(self, reason: str = "retry", delay: Optional[float] = None, count_attempt: bool = True):
+        super().__init__(reason)
+        self.reason = reason
+        self.delay = delay
+        self.count_attempt = count_attempt
+
+
+def backoff_delay(attempt: int, base: float = BASE_DELAY, cap: float = MAX_DELAY) -> float:
+    """Delay before retry number `attempt + 1` (exponential, jittered to spread retries out)."""
+    delay = min(cap, base * (2 ** attempt))
+    return delay * random.uniform(0.5, 1.0)
+
+
+class RunReport(NamedTuple):
+    retries: int              # Retries scheduled
+    stragglers: List[Any]     # Items left unfinished when the stage deadline hit
+
+
+def _run_task(worker: Callable[[Any], Any], item: Any, deadline: Deadline):
+    with deadlines.scope(deadline):
+        return worker(item)
+
+
+def run_with_retries(
+    worker: Callable[[Any], Any],
+    items: Iterable[Any],
+    max_workers: int,
+    max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+    on_give_up: Optional[Callable[[Any, str], None]] = None,
+    task_timeout: Optional[float] = None,
+    deadline: Optional[Deadline] = None,
+) -> RunReport:
+    """
+    Run `worker(item)` for every item on a thread pool, rescheduling items whose
+    worker raised RetryLater. After `max_attempts` the item is handed to
+    `on_give_up(item, reason)`. Other exceptions are logged (workers are expected
+    to handle their own errors).
+
+    Each task runs under its own deadline (`task_timeout` seconds, never past the
+    stage `deadline`; see common/deadlines.py). When the stage deadline passes,
+    nothing new is started, queued tasks are cancelled and running ones get
+    STRAGGLER_GRACE seconds to hit a cancellation point; everything unfinished is
+    returned as stragglers (not given up, so it is picked up by the next run).
+    """
+    deadline = deadline or Deadline()
+    ready = deque((item, 0) for item in items)
+    delayed = []                      # heap of (eligible_at, seq, item, attempt)
+    seq = itertools.count()
+    pending = {}
+    retries = 0
+    stragglers = []
+
+    executor = concurrent.futures.ThreadPoolExecutor(max_workers=max_workers)
+    try:
+        while ready or delayed or pending:
+            if deadline.expired:
+                break
+
+            now = time.monotonic()
+            while delayed and delayed[0][0] <= now:
+                _, _, item, attempt = heapq.heappop(delayed)
+                # Due retries go ahead of fresh items so they are not starved
+                ready.appendleft((item, attempt))
+
+            # Keep the queue inside the executor short, so due retries are picked up promptly
+            while ready and len(pending) < max_workers:
+                item, attempt = ready.popleft()
+                task_deadline = Deadline.after(task_timeout).earliest(deadline)
+                pending[executor.submit(_run_task, worker, item, task_deadline)] = (item, attempt)
+
+            waits = [delayed[0][0] - time.monotonic()] if delayed else []
+            if deadline.remaining() is not None:
+                waits.append(deadline.remaining())
+            timeout = max(0.0, min(waits)) if waits else None
+
+            if not pending:
+                time.sleep(timeout or 0.0)
+                continue
+
+            done, _ = concurrent.futures.wait(pending, timeout=timeout,
+                                              return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in done:
+                item, attempt = pending.pop(future)
+                error = future.exception()
+                if error is None:
+                    continue
+                if isinstance(error, DeadlineExceeded):
+                    stragglers.append(item)
+                    continue
+                if not isinstance(error, RetryLater):
+                    logger.error(f"Worker failed for {item}: {error}")
+                    continue
+                next_attempt = attempt + 1 if error.count_attempt else attempt
+                if next_attempt >= max_attempts:
+                    logger.warning(f"Giving up on {item} after {next_attempt} attempts ({error.reason})")
+                    if on_give_up:
+                        on_give_up(item, error.reason)
+                    continue
+                delay = error.delay if error.delay is not None else backoff_delay(attempt)
+                heapq.heappush(delayed, (time.monotonic() + delay, next(seq), item, next_attempt))
+                retries += 1
+
+        if pending or ready or delayed:
+            logger.warning(f"Stage deadline reached with {len(pending)} running and "
+                           f"{len(ready) + len(delayed)} queued tasks, cancelling")
+            stragglers.extend(item for item, _ in ready)
+            stragglers.extend(entry[2] for entry in delayed)
+            # Running tasks see the expired deadline at their next cancellation point
+            done, not_done = concurrent.futures.wait(pending, timeout=STRAGGLER_GRACE)
+            stragglers.extend(pending[future][0] for future in not_done)
+            stragglers.extend(pending[future][0] for future in done
+                              if isinstance(future.exception(), (DeadlineExceeded, RetryLater)))
+    finally:
+        # Never block on a hung worker: queued tasks are dropped, running ones are abandoned
+        executor.shutdown(wait=not (pending or stragglers), cancel_futures=True)
+
+    return RunReport(retries, stragglers)
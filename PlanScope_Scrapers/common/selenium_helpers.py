@@ -0,0 +1,143 @@
+"""
+Helpers for the Selenium fallbacks of the complot scrapers.
+
+Reading a results table cell by cell costs one WebDriver round trip per
+find_element / get_attribute call (hundreds per page). extract_table() pulls the
+whole table in a single execute_script call instead. When the table is a
+DataTables instance, it reads the rows through the DataTables API, which holds
+the rows of every page (in the current sort order, see sort_table()), so
+pagination is not needed at all.
+
+Waits are event-driven: table_marker() records the table's DataTables draw
+counter and its first row before an action (click "Next", change page length,
+"Show All"), and wait_for_redraw() returns as soon as the table was redrawn (draw
+counter moved on, or the old first row left the DOM) instead of sleeping for a
+worst-case delay.
+
+Usage:
+    snapshot = selenium_helpers.extract_table(driver)
+    for cells in snapshot.rows:
+        cells[1]["link_text"], cells[0]["href"]
+    if not snapshot.complete:
+        marker = selenium_helpers.table_marker(driver)
+        driver.execute_script("arguments[0].click();", next_button)
+        selenium_helpers.wait_for_redraw(driver, marker)
+"""
+
+from typing import Any, Dict, List, NamedTuple, Optional
+
+from selenium.common.exceptions import StaleElementReferenceException, TimeoutException
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import WebDriverWait
+
+REDRAW_TIMEOUT = 15   # Seconds to wait for a table redraw
+
+# Returns {complete, rows}; each row is a list of {text, link_text, href} cells
+_EXTRACT_TABLE_JS = """
+var table = document.getElementById(arguments[0]);
+if (!table) { return null; }
+var nodes = null;
+var $ = window.jQuery;
+if ($ && $.fn && $.fn.dataTable && $.fn.dataTable.isDataTable(table)) {
+    nodes = $(table).DataTable().rows({order: 'applied'}).nodes().toArray();
+}
+var complete = nodes !== null;
+if (!complete) {
+    nodes = table.tBodies.length ? Array.prototype.slice.call(table.tBodies[0].rows) : [];
+}
+var rows = [];
+nodes.forEach(function (tr) {
+    var cells = [];
+    Array.prototype.forEach.call(tr.cells, function (td) {
+        var link = td.querySelector('a');
+        cells.push({
+            text: (td.textContent || '').trim(),
+            link_text: link ? (link.textContent || '').trim() : null,
+            href: link ? link.getAttribute('href') : null
+        });
+    });
+    rows.push(cells);
+});
+return {complete: complete, rows: rows};
+"""
+
+
+class TableSnapshot(NamedTuple):
+    rows: List[List[Dict[str, Any]]]   # Per row, per cell: {"text", "link_text", "href"}
+    complete: bool                     # True when read through DataTables (all pages)
+
+
+def extract_table(driver, table_id: str = "results-table") -> TableSnapshot:
+    """All rows of the table in one script call; empty if the table is missing."""
+    result = driver.execute_script(_EXTRACT_TABLE_JS, table_id)
+    if not result:
+        return TableSnapshot([], False)
+    return TableSnapshot(result["rows"], bool(result["complete"]))
+
+
+# DataTables' internal draw counter (incremented on every redraw), null if not a DataTable
+_DRAW_COUNT_JS = """
+var table = document.getElementById(arguments[0]);
+var $ = window.jQuery;
+if (!table || !$ || !$.fn || !$.fn.dataTable || !$.fn.dataTable.isDataTable(table)) { return null; }
+return $(table).DataTable().settings()[0].iDraw;
+"""
+
+
+class TableMarker(NamedTuple):
+    table_id: str
+    draw_count: Optional[int]
+    first_row: Any                     # WebElement of the first body row, or None
+
+
+def _rows(driver, table_id: str):
+    return driver.find_elements(By.CSS_SELECTOR, f"#{table_id} tbody tr")
+
+
+def table_marker(driver, table_id: str = "results-table") -> TableMarker:
+    """State of the table before an action that redraws it."""
+    rows = _rows(driver, table_id)
+    return TableMarker(table_id, driver.execute_script(_DRAW_COUNT_JS, table_id), rows[0] if rows else None)
+
+
+def _redrawn(driver, marker: TableMarker) -> bool:
+    if marker.first_row is not None:
+        try:
+            marker.first_row.is_enabled()
+        except StaleElementReferenceException:
+            return True
+    if marker.draw_count is not None:
+        draw_count = driver.execute_script(_DRAW_COUNT_JS, marker.table_id)
+        if draw_count is not None and draw_count != marker.draw_count:
+            return True
+    if marker.first_row is None and marker.draw_count is None:
+        # There was no table yet: wait for its rows
+        return bool(_rows(driver, marker.table_id))
+    return False
+
+
+def wait_for_redraw(driver, marker: TableMarker, timeout: float = REDRAW_TIMEOUT) -> bool:
+    """Block until the table changed since `marker`; False on timeout."""
+    try:
+        WebDriverWait(driver, timeout, poll_frequency=0.1).until(lambda d: _redrawn(d, marker))
+        return True
+    except TimeoutException:
+        return False
+
+
+_SORT_TABLE_JS = """
+var table = document.getElementById(arguments[0]);
+var $ = window.jQuery;
+if (!table || !$ || !$.fn || !$.fn.dataTable || !$.fn.dataTable.isDataTable(table)) { return false; }
+$(table).DataTable().order([arguments[1], arguments[2]]).draw();
+return true;
+"""
+
+
+def sort_table(driver, column: int, direction: str = "desc", table_id: str = "results-table") -> bool:
+    """Sort a DataTables table by `column` and wait for the redraw; False if it is not a DataTable."""
+    marker = table_marker(driver, table_id)
+    if not driver.execute_script(_SORT_TABLE_JS, table_id, column, direction):
+        return False
+    wait_for_redraw(driver, marker)
+    return True
@@ -0,0 +1,96 @@
+"""
+Registry of complot-hosted municipalities.
+
+Every complot site is served by the same backend (handasi.complot.co.il
+mgrqispi.dll) and differs only by its siteid, its portal subdomain (used as the
+Referer and for the #search / #meeting links) and its plan number prefix. The
+pipelines take the site from PLANSCOPE_SITE (default bat_yam) and write their
+files into a per-site working directory:
+
+    permits/                    bat_yam (legacy layout, files stay where they were)
+    permits/sites/<site>/       any other site
+
+Output files are named after the site key (e.g. <site>_permits_data_<date>.json),
+which for bat_yam is the historical bat_yam_... name.
+
+More sites are configured in sites.json next to this package (or the file in
+PLANSCOPE_SITES_FILE), without touching the scripts:
+
+    [{"key": "<site>", "name": "<City>", "site_id": <siteid>, "subdomain": "<subdomain>", "taba_prefix": "<prefix>"}]
+
+Usage:
+    SITE = sites.current()
+    url = f"...&siteid={SITE.site_id}&..."
+    headers = {"Referer": SITE.referer}
+    work_dir = sites.work_dir(PERMITS_DIR, SITE)
+"""
+
+import json
+import os
+from pathlib import Path
+from typing import Dict, NamedTuple, Optional
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+
+SITE_ENV = "PLANSCOPE_SITE"
+DEFAULT_SITE = "bat_yam"
+LEGACY_SITE = "bat_yam"     # Keeps the original, un-namespaced file layout
+SITES_FILE = Path(os.getenv("PLANSCOPE_SITES_FILE", str(Path(__file__).resolve().parent.parent / "sites.json")))
+
+
+class Site(NamedTuple):
+    key: str              # Namespace for files and directories, e.g. "bat_yam"
+    name: str             # Display name
+    site_id: int          # complot siteid
+    subdomain: str        # <subdomain>.complot.co.il portal
+    taba_prefix: str = "" # Plan number prefix searched by the taba pipeline
+
+    @property
+    def portal(self) -> str:
+        return f"https://{self.subdomain}.complot.co.il"
+
+    @property
+    def referer(self) -> str:
+        return f"{self.portal}/"
+
+
+SITES: Dict[str, Site] = {
+    "bat_yam": Site("bat_yam", "Bat Yam", 81, "batyam", "502"),
+}
+
+
+def _load_sites_file():
+    if not SITES_FILE.exists():
+        return
+    with open(SITES_FILE, "r", encoding="utf-8") as f:
+        for entry in json.load(f):
+            site = Site(entry["key"], entry.get("name", entry["key"]), int(entry["site_id"]),
+                        entry["subdomain"], str(entry.get("taba_prefix", "")))
+            SITES[site.key] = site
+
+
+_load_sites_file()
+
+
+def get(key: str) -> Site:
+    try:
+        return SITES[key]
+    except KeyError:
+        raise ValueError(f"Unknown site '{key}' (known: {', '.join(sorted(SITES))}; add it to {SITES_FILE})")
+
+
+def current() -> Site:
+    """The site this process works on (PLANSCOPE_SITE, default bat_yam)."""
+    return get(os.getenv(SITE_ENV, DEFAULT_SITE))
+
+
+def work_dir(pipeline_dir: str, site: Optional[Site] = None) -> str:
+    """Directory holding `site`'s files for the pipeline in `pipeline_dir` (created if needed)."""
+    site = site or current()
+    if site.key == LEGACY_SITE:
+        return pipeline_dir
+    path = os.path.join(pipeline_dir, "sites", site.key)
+    os.makedirs(path, exist_ok=True)
+    return path
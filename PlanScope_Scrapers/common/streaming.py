@@ -0,0 +1,112 @@
+"""
+Streaming body reads for the fetch layer.
+
+read_body() pulls a response in chunks and can stop as soon as every element we
+extract from the page has been closed (SectionTracker follows the element nesting
+at the byte level, no parsing), so the rest of a long page never crosses the proxy.
+declared_charset() replaces requests' apparent_encoding, which runs charset
+detection over the whole body: the charset comes from the Content-Type header,
+then a <meta> declaration in the first bytes, then UTF-8.
+"""
+
+import re
+import threading
+from typing import Iterable, Optional, Tuple
+
+from common.deadlines import DeadlineExceeded
+
+CHUNK_SIZE = 16 * 1024
+META_SNIFF_BYTES = 4096
+
+_TAG_RE = re.compile(rb'<(/?)([a-zA-Z][a-zA-Z0-9]*)\b([^>]*)>')
+_ID_RE = re.compile(rb'''\bid\s*=\s*["']?([^"'\s>]+)''')
+_HEADER_CHARSET_RE = re.compile(r'charset\s*=\s*["\']?([\w-]+)', re.I)
+_META_CHARSET_RE = re.compile(rb'''<meta[^>]+charset\s*=\s*["']?([\w-]+)''', re.I)
+
+
+class ReadCancelled(Exception):
+    """The body is no longer wanted (e.g. the other leg of a hedged request won)."""
+
+
+def declared_charset(content_type: Optional[str], head: bytes = b"") -> str:
+    """Charset from the Content-Type header, else a <meta> tag in `head`, else utf-8."""
+    if content_type:
+        match = _HEADER_CHARSET_RE.search(content_type)
+        if match:
+            return match.group(1).lower()
+    match = _META_CHARSET_RE.search(head[:META_SNIFF_BYTES])
+    if match:
+        return match.group(1).decode("ascii").lower()
+    return "utf-8"
+
+
+class SectionTracker:
+    """
+    Tracks when the elements with the given ids have all been opened and closed.
+    Works on raw (ASCII-compatible) bytes fed in arbitrary chunks.
+    """
+
+    def __init__(self, ids: Iterable[str]):
+        self.pending = {i.encode("ascii") for i in ids}
+        self._open = []            # [tag_name, depth] for target elements not closed yet
+        self._tail = b""           # Unfinished tag carried over to the next chunk
+
+    @property
+    def done(self) -> bool:
+        return not self.pending and not self._open
+
+    def feed(self, chunk: bytes) -> bool:
+        """Consume the next chunk; returns True once all sections are closed."""
+        data = self._tail + chunk
+        last_lt = data.rfind(b"<")
+        if last_lt != -1 and data.find(b">", last_lt) == -1:
+            data, self._tail = data[:last_lt], data[last_lt:]
+        else:
+            self._tail = b""
+
+        for match in _TAG_RE.finditer(data):
+            closing, name, attrs = match.group(1), match.group(2).lower(), match.group(3)
+            if closing:
+                for section in self._open:
+                    if section[0] == name:
+                        section[1] -= 1
+                self._open = [s for s in self._open if s[1] > 0]
+            elif not attrs.rstrip().endswith(b"/"):
+                for section in self._open:
+                    if section[0] == name:
+                        section[1] += 1
+                id_match = _ID_RE.search(attrs)
+                if id_match and id_match.group(1) in self.pending:
+                    self.pending.discard(id_match.group(1))
+                    self._open.append([name, 1])
+        return self.done
+
+
+def read_body(response, stop_after_ids: Optional[Iterable[str]] = None,
+              deadline=None, cancel: Optional[threading.Event] = None) -> Tuple[bytes, bool]:
+    """
+    Read a `stream=True` requests response.
+    With `stop_after_ids`, reading stops once those elements are all closed and
+    the connection is dropped. A slow-dripping body is abandoned with
+    DeadlineExceeded once `deadline` (common/deadlines.Deadline) passes, and with
+    ReadCancelled once `cancel` is set.
+    Returns (body, truncated).
+    """
+    tracker = SectionTracker(stop_after_ids) if stop_after_ids else None
+    chunks = []
+    truncated = False
+    for chunk in response.iter_content(CHUNK_SIZE):
+        if deadline is not None and deadline.expired:
+            response.close()
+            raise DeadlineExceeded("deadline exceeded while reading the body")
+        if cancel is not None and cancel.is_set():
+            response.close()
+            raise ReadCancelled("read cancelled")
+        chunks.append(chunk)
+        if tracker is not None and tracker.feed(chunk):
+            truncated = True
+            break
+    if truncated:
+        # Closing mid-body discards the connection instead of reading the rest
+        response.close()
+    return b"".join(chunks), truncated
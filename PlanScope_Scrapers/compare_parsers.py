@@ -0,0 +1,89 @@
+"""
+Compare the HTML parser backends (common/html_parser.py) on cached pages.
+
+Re-parses every cached GetBakashaFile and GetTabaFile page (common/response_cache.py)
+with each backend, reports the pages whose records differ from the html.parser
+ones and the parse time per backend. Switch HTML_PARSER_BACKEND only after a
+run without differences. Offline: no network, no OpenAI.
+
+Usage:
+    python compare_parsers.py
+    python compare_parsers.py --limit 500 --show-diffs
+"""
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+BASE_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(BASE_DIR))
+sys.path.insert(0, str(BASE_DIR / "permits"))
+sys.path.insert(0, str(BASE_DIR / "taba"))
+from common import html_parser, response_cache
+
+from analyze_permits import parse_permit_markup
+from get_information_taba import parse_plan_page
+
+
+def _permit_record(content: bytes, backend: str) -> Any:
+    return parse_permit_markup(content, backend)
+
+
+def _plan_record(content: bytes, backend: str) -> Any:
+    html_parser.PARSER_BACKEND = backend   # parse_plan_page builds its own soup
+    return parse_plan_page(content, None)
+
+
+PAGE_TYPES: Dict[str, Callable[[bytes, str], Any]] = {
+    "GetBakashaFile": _permit_record,
+    "GetTabaFile": _plan_record,
+}
+
+
+def compare(program: str, limit: int, show_diffs: bool) -> int:
+    """Compare one page type; returns the number of pages that differ."""
+    parse = PAGE_TYPES[program]
+    urls = response_cache.urls(contains=f"prgname={program}&")[:limit or None]
+    timings = {backend: 0.0 for backend in html_parser.BACKENDS}
+    differing: List[str] = []
+
+    for url in urls:
+        cached = response_cache.get(url, ttl=None)
+        if not cached:
+            continue
+        records = {}
+        for backend in html_parser.BACKENDS:
+            start = time.perf_counter()
+            records[backend] = json.dumps(parse(cached.content, backend), ensure_ascii=False, sort_keys=True)
+            timings[backend] += time.perf_counter() - start
+        reference = records[html_parser.DEFAULT_BACKEND]
+        for backend, record in records.items():
+            if record != reference:
+                differing.append(url)
+                if show_diffs:
+                    print(f"  {backend} differs on {url}\n    {html_parser.DEFAULT_BACKEND}: {reference}\n    {backend}: {record}")
+                break
+
+    html_parser.PARSER_BACKEND = html_parser.DEFAULT_BACKEND
+    print(f"{program}: {len(urls)} cached pages, {len(differing)} differ")
+    for backend, seconds in timings.items():
+        per_page = seconds / len(urls) * 1000 if urls else 0.0
+        print(f"  {backend:12} {seconds:7.2f}s total, {per_page:6.1f} ms/page")
+    return len(differing)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare HTML parser backends on cached pages")
+    parser.add_argument("--limit", type=int, default=0, help="Pages per type (default: all)")
+    parser.add_argument("--show-diffs", action="store_true", help="Print the differing records")
+    args = parser.parse_args()
+
+    differing = sum(compare(program, args.limit, args.show_diffs) for program in PAGE_TYPES)
+    sys.exit(1 if differing else 0)
+
+
+if __name__ == "__main__":
+    main()
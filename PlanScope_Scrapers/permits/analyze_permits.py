@@ -12,12 +12,11 @@ Usage:
 """
 
 import os
+import sys
 import json
 import time
-import random
 import re
 import logging
-import string
 import threading
 import concurrent.futures
 from datetime import datetime
@@ -30,6 +29,14 @@ from openai import OpenAI
 from dotenv import load_dotenv
 import urllib3
 
+# Shared fetch layer lives in PlanScope_Scrapers/common
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from common import deadlines, fetch_client, html_parser, html_sections, response_cache, sites
+from common.async_fetch import AsyncFetchEngine
+from common.proxy_pool import ProxyPool
+from common.deadlines import DeadlineExceeded
+from common.retry_queue import RetryLater, run_with_retries
+
 # Suppress SSL warnings since verify=False is often needed for proxies
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
@@ -71,33 +78,59 @@ PROXY_PASS = os.getenv("PROXY_PASS")
 # SSL Verification setting
 VERIFY_SSL = False
 
+# Warm proxy sessions, scored per request and health-checked lazily in the background
+# (common/proxy_pool.py - PROXY_POOL_SIZE in .env)
+PROXY_POOL = ProxyPool(PROXY_HOST, PROXY_PORT, PROXY_USER, PROXY_PASS, enabled=USE_PROXY, verify=VERIFY_SSL)
+
 # ============================================================================
 # END OF PROXY CONFIGURATION
 # ============================================================================
 
 # API endpoint template
+SITE = sites.current()
 API_URL_TEMPLATE = (
     "https://handasi.complot.co.il/magicscripts/mgrqispi.dll"
-    "?appname=cixpa&prgname=GetBakashaFile&siteid=81&b={permit_id}&arguments=siteid,b"
+    f"?appname=cixpa&prgname=GetBakashaFile&siteid={SITE.site_id}&b={{permit_id}}&arguments=siteid,b"
+)
+
+# Elements parse_permit_page reads; with FETCH_STREAMING=on the download stops once all are closed,
+# and only these subtrees are built (common/html_sections.py)
+PERMIT_SECTION_IDS = (
+    "mahut", "info-main", "navbar-titles-id", "table-baaley-inyan",
+    "table-gushim-helkot", "table-events", "btn-meetings", "table-meetings",
 )
 
 # Request headers to mimic browser
 HEADERS = {
     'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-    'Referer': 'https://batyam.complot.co.il/',
+    'Referer': SITE.referer,
     'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
     'Accept-Language': 'he-IL,he;q=0.9,en-US;q=0.8,en;q=0.7',
 }
 
-# Rate limiting configuration
-REQUEST_DELAY_MIN = 2.0  # Minimum delay between requests (seconds)
-REQUEST_DELAY_MAX = 5.0  # Maximum delay between requests (seconds)
-BATCH_SIZE = 10          # Number of requests before cooldown
-BATCH_COOLDOWN = 20      # Cooldown duration after batch (seconds)
+# Rate limiting: every request draws from a per-host token bucket shared with the
+# other pipelines (common/rate_limiter.py - RATE_LIMIT_PER_SEC / RATE_LIMIT_BURST in .env)
+BATCH_SIZE = 10          # old_main only: number of requests between progress breaks
+BATCH_COOLDOWN = 20      # old_main only (cooldown is skipped)
 
 # Request timeout (seconds)
 REQUEST_TIMEOUT = 30
 
+# Fetch attempts per permit; throttled permits are rescheduled with backoff (common/retry_queue.py)
+MAX_FETCH_ATTEMPTS = 3
+
+# Deadlines (common/deadlines.py): a permit (fetch + AI) is abandoned after TASK_TIMEOUT seconds;
+# the stage deadline comes from the orchestrator or STAGE_DEADLINE_MINUTES in .env
+TASK_TIMEOUT = int(os.getenv("TASK_TIMEOUT", "300"))
+OPENAI_TIMEOUT = 60      # Seconds per OpenAI request
+
+# Parallel workers: upper bound for the adaptive (AIMD) concurrency, also sizes the pooled HTTP sessions
+MAX_WORKERS = int(os.getenv("MAX_WORKERS", "16"))
+
+# Fetch engine: "threads" (requests in the worker pool) or "async" (httpx prefetch, see common/async_fetch.py)
+FETCH_ENGINE = os.getenv("FETCH_ENGINE", "threads")
+ASYNC_CONCURRENCY = int(os.getenv("ASYNC_CONCURRENCY", "100"))
+
 # Files
 PERMIT_FILE = "permit_numbers.json"
 OUTPUT_FILE = "opportunities.json"
@@ -190,82 +223,6 @@ logger = logging.getLogger(__name__)
 # FUNCTIONS
 # ============================================================================
 
-def get_proxy_dict(session_id=None):
-    """
-    Builds the proxy dictionary for requests.
-    """
-    if not USE_PROXY:
-        return None
-    
-    current_user = PROXY_USER
-    
-    # בדיקה שהמשתמש הזין פרטים
-    if not current_user or not PROXY_PASS:
-        print("⚠️  Error: Proxy is enabled but PROXY_USER or PROXY_PASS are missing from .env!")
-        return None
-    
-    # Bright Data Logic: Force Israel targeting and Session rotation
-    if 'brd-customer' in current_user:
-        # Force Israel targeting if not already in username
-        if '-country-' not in current_user:
-             current_user = f"{current_user}-country-il"
-        
-        # IP Rotation Logic
-        if session_id:
-            current_user = f"{current_user}-session-{session_id}"
-
-    # Construct the URL with authentication
-    proxy_url = f"http://{current_user}:{PROXY_PASS}@{PROXY_HOST}:{PROXY_PORT}"
-    
-    return {
-        "http": proxy_url,
-        "https": proxy_url,
-    }
-
-
-def test_proxy_connection():
-    """Test if proxy is working."""
-    if not USE_PROXY:
-        return True
-    
-    # Use a random session for the test to ensure we get a fresh IP
-    rand_session = ''.join(random.choices(string.ascii_lowercase + string.digits, k=8))
-    proxies = get_proxy_dict(session_id=rand_session)
-    
-    if not proxies:
-        return False
-
-    print(f"   Testing connection to {PROXY_HOST}...")
-    
-    try:
-        # Test with a simple request to check IP
-        test_response = requests.get(
-            "https://httpbin.org/ip",
-            proxies=proxies,
-            timeout=20,
-            verify=VERIFY_SSL
-        )
-        if test_response.status_code == 200:
-            ip_info = test_response.json()
-            origin_ip = ip_info.get('origin')
-            print(f"   ✅ Proxy Connected! External IP: {origin_ip}")
-            return True
-        else:
-            print(f"   ⚠️  Proxy test returned status {test_response.status_code}")
-            return False
-
-    except requests.exceptions.ProxyError as e:
-        print(f"   ❌ Proxy Error: Failed to connect. Check Host/Port/User/Pass.")
-        print(f"      Details: {e}")
-        return False
-    except requests.exceptions.SSLError as e:
-        print(f"   ❌ SSL Error. Try setting VERIFY_SSL = False.")
-        return False
-    except Exception as e:
-        print(f"   ❌ Connection failed: {e}")
-        return False
-
-
 def flip_text(text: str) -> str:
     """
     Reverses text if it contains Hebrew characters (for correct console display).
@@ -344,7 +301,7 @@ def _parse_meetings(soup: BeautifulSoup) -> List[Dict[str, Any]]:
                 if match:
                     meeting_type = match.group(1)
                     meeting_num = match.group(2)
-                    meeting_url = f"https://handasi.complot.co.il/magicscripts/mgrqispi.dll?appname=cixpa&prgname=GetVaadaFile&siteid=81&t={meeting_type}&v={meeting_num}&arguments=siteid,t,v"
+                    meeting_url = f"https://handasi.complot.co.il/magicscripts/mgrqispi.dll?appname=cixpa&prgname=GetVaadaFile&siteid={SITE.site_id}&t={meeting_type}&v={meeting_num}&arguments=siteid,t,v"
             
             # Method 2: Fallback - find meeting number in tds
             if not meeting_id:
@@ -497,126 +454,140 @@ def _parse_history(soup: BeautifulSoup) -> List[Dict[str, Optional[str]]]:
     return history
 
 
-def fetch_permit_data(permit_id: str, max_retries: int = 2) -> Tuple[Optional[str], Dict[str, Any]]:
+def parse_permit_page(soup: BeautifulSoup) -> Optional[Tuple[Optional[str], Dict[str, Any]]]:
+    """
+    Extract (mahut_text, metadata_dict) from a parsed GetBakashaFile page.
+    Returns None when div#mahut is missing (CAPTCHA / block page).
+    """
+    # Find the div#mahut element containing "מהות הבקשה"
+    mahut_div = soup.find('div', id='mahut')
+    if not mahut_div:
+        return None
+
+    # Get the text content, cleaned up
+    text = mahut_div.get_text(separator=' ', strip=True)
+    # Remove the header "מהות הבקשה" from the beginning if present
+    text = text.replace('מהות הבקשה', '', 1).strip()
+    # Clean up invisible Unicode control characters (RLM, LRM, etc.)
+    text = text.replace('\u200f', '').replace('\u200e', '').strip()
+    mahut_text = text if text else None
+
+    # Parse additional metadata
+    request_info = _parse_request_info(soup)
+    address = _parse_address(soup)
+    applicants = _parse_applicants(soup)
+    parcels = _parse_parcels(soup)
+    history = _parse_history(soup)
+    
+    # Parse meeting history
+    meeting_history = []
+    if _has_meetings(soup):
+        meeting_history = _parse_meetings(soup)
+
+    metadata = {
+        "request_type": request_info.get("request_type"),
+        "main_use": request_info.get("main_use"),
+        "request_description": request_info.get("request_description"),
+        "address": address,
+        "applicants": applicants,
+        "parcels": parcels,
+        "history": history,
+        "meeting_history": meeting_history,
+    }
+
+    return mahut_text, metadata
+
+
+def parse_permit_markup(markup, backend: Optional[str] = None) -> Optional[Tuple[Optional[str], Dict[str, Any]]]:
+    """parse_permit_page on a raw page, building only the PERMIT_SECTION_IDS subtrees (freed afterwards)."""
+    soup = html_parser.make_soup(markup, backend, parse_only=html_sections.by_id(PERMIT_SECTION_IDS))
+    try:
+        return parse_permit_page(soup)
+    finally:
+        html_sections.release(soup)
+
+
+def fetch_permit_data(permit_id: str, page: Optional[bytes] = None) -> Tuple[Optional[str], Dict[str, Any]]:
     """
     Fetch HTML from API and extract data.
-    Strict Proxy Mode: Retries with proxy on failure, does NOT fall back to direct connection.
+    Strict Proxy Mode: never falls back to a direct connection.
+
+    Makes a single request: on 429 / CAPTCHA / proxy or server errors / timeouts it
+    raises RetryLater, so the worker moves on and the scheduler retries the permit
+    later (common/retry_queue.py) instead of sleeping in the thread. A request cut
+    off by the task's deadline raises DeadlineExceeded (a straggler).
     
     Args:
         permit_id: The permit number to fetch
-        max_retries: Maximum number of retry attempts for CAPTCHA/Proxy errors (default: 2)
+        page: Raw page already fetched by the async engine; used instead of a request when valid
         
     Returns:
-        (mahut_text, metadata_dict)
+        (mahut_text, metadata_dict), or (None, {}) on a permanent failure
     """
     url = API_URL_TEMPLATE.format(permit_id=permit_id)
-    
-    # Generate a random session ID for proxy rotation
-    session_id = ''.join(random.choices(string.ascii_lowercase + string.digits, k=8))
-    proxies = get_proxy_dict(session_id=session_id)
-    
-    for attempt in range(max_retries + 1):
-        try:
-            response = requests.get(url, headers=HEADERS, timeout=REQUEST_TIMEOUT, proxies=proxies, verify=VERIFY_SSL)
-            
-            # Special handling for 429 from Server
-            if response.status_code == 429:
-                wait_time = 40 * (attempt + 1)
-                logger.warning(f"Permit {permit_id}: Server Rate Limit (429). Waiting {wait_time}s...")
-                print(f"   ⚠️ Server Rate Limit (429). Cooling down {wait_time}s...")
-                time.sleep(wait_time)
-                continue
 
-            response.raise_for_status()
-            
-            # Ensure proper encoding for Hebrew text
-            response.encoding = response.apparent_encoding or 'utf-8'
-            
-            # Parse HTML with BeautifulSoup
-            soup = BeautifulSoup(response.text, 'html.parser')
-            
-            # Find the div#mahut element containing "מהות הבקשה"
-            mahut_div = soup.find('div', id='mahut')
-            
-            if mahut_div:
-                # Get the text content, cleaned up
-                text = mahut_div.get_text(separator=' ', strip=True)
-                # Remove the header "מהות הבקשה" from the beginning if present
-                text = text.replace('מהות הבקשה', '', 1).strip()
-                # Clean up invisible Unicode control characters (RLM, LRM, etc.)
-                text = text.replace('\u200f', '').replace('\u200e', '').strip()
-                mahut_text = text if text else None
-            else:
-                # CAPTCHA detected - div#mahut not found
-                if attempt < max_retries:
-                    logger.warning(f"Permit {permit_id}: CAPTCHA detected (div#mahut not found), waiting 40s before retry {attempt + 1}/{max_retries}...")
-                    print(f"\n🤖 CAPTCHA detected! Waiting 40 seconds before retry ({attempt + 1}/{max_retries})...")
-                    time.sleep(40)
-                    continue
-                else:
-                    logger.error(f"Permit {permit_id}: div#mahut not found after {max_retries + 1} attempts (likely CAPTCHA)")
-                    return None, {}
-
-            # Parse additional metadata
-            request_info = _parse_request_info(soup)
-            address = _parse_address(soup)
-            applicants = _parse_applicants(soup)
-            parcels = _parse_parcels(soup)
-            history = _parse_history(soup)
-            
-            # Parse meeting history
-            meeting_history = []
-            if _has_meetings(soup):
-                meeting_history = _parse_meetings(soup)
-
-            metadata = {
-                "request_type": request_info.get("request_type"),
-                "main_use": request_info.get("main_use"),
-                "request_description": request_info.get("request_description"),
-                "address": address,
-                "applicants": applicants,
-                "parcels": parcels,
-                "history": history,
-                "meeting_history": meeting_history,
-            }
-
-            return mahut_text, metadata
-
-        except requests.exceptions.ProxyError as e:
-            # Handle Proxy Rate Limits specifically (tunnel 429)
-            error_str = str(e).lower()
-            if "429" in error_str or "exceeded" in error_str:
-                wait_time = 30 * (attempt + 1)
-                logger.warning(f"Permit {permit_id}: Proxy Limit (429) hit. Waiting {wait_time}s...")
-                print(f"   ⚠️ Proxy Limit Reached (429). Cooling down {wait_time}s...")
-                time.sleep(wait_time)
-                
-                # Rotate session ID to try getting a fresh IP/Session
-                session_id = ''.join(random.choices(string.ascii_lowercase + string.digits, k=8))
-                proxies = get_proxy_dict(session_id=session_id)
-                continue
-            else:
-                # Other proxy errors (connection refused, etc)
-                logger.error(f"Permit {permit_id}: Proxy connection failed - {e}")
-                time.sleep(5)
-                continue
-                
-        except requests.exceptions.Timeout:
-            logger.error(f"Permit {permit_id}: Request timeout after {REQUEST_TIMEOUT}s")
-            return None, {}
-        except requests.exceptions.RequestException as e:
-            logger.error(f"Permit {permit_id}: Request failed - {e}")
-            # If it's a 502/503 from proxy, wait a bit
-            time.sleep(5)
-            continue
-        except Exception as e:
-            logger.error(f"Permit {permit_id}: Unexpected error - {e}")
-            return None, {}
+    if page is not None:
+        parsed = parse_permit_markup(page)
+        if parsed:
+            response_cache.put(url, page)
+            return parsed
+        logger.warning(f"Permit {permit_id}: Prefetched page has no div#mahut, fetching again...")
+
+    # Reuse a page fetched recently (e.g. by an earlier stage of today's run)
+    cached = response_cache.get(url)
+    if cached:
+        parsed = parse_permit_markup(cached.content)
+        if parsed:
+            return parsed
     
-    return None, {}  # Shouldn't reach here, but just in case
+    try:
+        response = fetch_client.get(url, headers=HEADERS, timeout=REQUEST_TIMEOUT, proxy_pool=PROXY_POOL,
+                                    stop_after_ids=PERMIT_SECTION_IDS, verify=VERIFY_SSL)
+        
+        # Special handling for 429 from Server: fetch_client already reported it to the
+        # host's AIMD controller
+        if response.status_code == 429:
+            logger.warning(f"Permit {permit_id}: Server Rate Limit (429). Rescheduling...")
+            raise RetryLater("429")
 
+        response.raise_for_status()
+        
+        # response.encoding is the page's declared charset (set by fetch_client)
+        # Parse HTML with BeautifulSoup
+        parsed = parse_permit_markup(response.text)
+        
+        if not parsed:
+            # CAPTCHA detected - div#mahut not found
+            fetch_client.report_throttle(url, "CAPTCHA", proxy_pool=PROXY_POOL)
+            logger.warning(f"Permit {permit_id}: CAPTCHA detected (div#mahut not found). Rescheduling...")
+            raise RetryLater("CAPTCHA")
 
+        # A streamed page stops after PERMIT_SECTION_IDS; daily_permit_scraper reads the whole page from the cache
+        if not response.truncated:
+            response_cache.put(url, response.content, response.headers.get('Content-Type'))
+        return parsed
 
+    except requests.exceptions.ProxyError as e:
+        # Move to another pooled session to get a fresh IP
+        PROXY_POOL.rotate()
+        if fetch_client.is_proxy_limit_error(e):
+            # Tunnel 429 - already reported to the AIMD controller
+            logger.warning(f"Permit {permit_id}: Proxy Limit (429) hit. Rescheduling...")
+            raise RetryLater("proxy limit")
+        # Other proxy errors (connection refused, etc)
+        logger.error(f"Permit {permit_id}: Proxy connection failed - {e}")
+        raise RetryLater("proxy error")
+            
+    except requests.exceptions.Timeout:
+        # The timeout is clamped to the task's deadline: a cut-off request is a straggler, not a failure
+        if deadlines.current().expired:
+            raise DeadlineExceeded("deadline exceeded during the request")
+        logger.error(f"Permit {permit_id}: Request timeout after {REQUEST_TIMEOUT}s")
+        raise RetryLater("timeout")
+    except requests.exceptions.RequestException as e:
+        # 502/503 from the proxy or the server: try again later
+        logger.error(f"Permit {permit_id}: Request failed - {e}")
+        raise RetryLater("request failed")
 
 
 def analyze_with_ai(mahut_text: str, permit_id: str, client: OpenAI, max_retries: int = 3) -> Optional[dict]:
@@ -634,6 +605,8 @@ def analyze_with_ai(mahut_text: str, permit_id: str, client: OpenAI, max_retries
         Parsed JSON response from LLM, or None if analysis fails after all retries
     """
     for attempt in range(max_retries):
+        # Cancellation point: stop retrying once the task's deadline has passed
+        deadlines.check()
         try:
             user_content = f"Permit ID: {permit_id}\n\nמהות הבקשה:\n{mahut_text}"
             
@@ -646,7 +619,8 @@ def analyze_with_ai(mahut_text: str, permit_id: str, client: OpenAI, max_retries
                     {"role": "system", "content": SYSTEM_PROMPT},
                     {"role": "user", "content": user_content}
                 ],
-                response_format={"type": "json_object"}
+                response_format={"type": "json_object"},
+                timeout=deadlines.clamp(OPENAI_TIMEOUT),
             )
             
             # Extract the response text
@@ -655,7 +629,7 @@ def analyze_with_ai(mahut_text: str, permit_id: str, client: OpenAI, max_retries
                 if attempt < max_retries - 1:
                     wait_time = 2 ** attempt  # Exponential backoff: 1s, 2s, 4s
                     logger.warning(f"Permit {permit_id}: Empty response (attempt {attempt + 1}/{max_retries}), retrying in {wait_time}s...")
-                    time.sleep(wait_time)
+                    deadlines.sleep(wait_time)
                     continue
                 else:
                     logger.error(f"Permit {permit_id}: AI returned empty response after {max_retries} attempts")
@@ -679,7 +653,7 @@ def analyze_with_ai(mahut_text: str, permit_id: str, client: OpenAI, max_retries
             if attempt < max_retries - 1:
                 wait_time = 2 ** attempt
                 logger.warning(f"Permit {permit_id}: JSON parse error (attempt {attempt + 1}/{max_retries}), retrying in {wait_time}s...")
-                time.sleep(wait_time)
+                deadlines.sleep(wait_time)
                 continue
             else:
                 logger.error(f"Permit {permit_id}: Failed to parse AI response as JSON after {max_retries} attempts - {e}")
@@ -689,7 +663,7 @@ def analyze_with_ai(mahut_text: str, permit_id: str, client: OpenAI, max_retries
             if attempt < max_retries - 1:
                 wait_time = 2 ** attempt
                 logger.warning(f"Permit {permit_id}: AI call failed (attempt {attempt + 1}/{max_retries}), retrying in {wait_time}s... Error: {e}")
-                time.sleep(wait_time)
+                deadlines.sleep(wait_time)
                 continue
             else:
                 logger.error(f"Permit {permit_id}: AI analysis failed after {max_retries} attempts - {e}")
@@ -835,18 +809,13 @@ def old_main():
         return
     
     # Initialize OpenAI client
-    client = OpenAI(api_key=api_key)
+    client = OpenAI(api_key=api_key, timeout=OPENAI_TIMEOUT)
     print("OK: OpenAI client initialized")
     
-    # Test proxy connection
+    # Proxy sessions are health-checked lazily in the background, no startup probe
     print(f"Proxy Configured: {USE_PROXY}")
-    if USE_PROXY:
-        if not test_proxy_connection():
-            print("\n❌ Proxy Connection FAILED.")
-            print("   Please check your .env file credentials.")
-            print("   Continuing without proxy might result in blocking...\n")
-            # uncomment next line to stop on error
-            # return
+    if PROXY_POOL.enabled:
+        print(f"OK: Proxy pool ready ({PROXY_POOL.size} sessions via {PROXY_HOST})")
     
     # Initialize debug requests file (clear previous content)
     script_dir = os.path.dirname(os.path.abspath(__file__))
@@ -897,8 +866,11 @@ def old_main():
     for i, permit_id in enumerate(permit_ids, 1):
         print(f"[{i}/{len(permit_ids)}] Processing permit {permit_id}...", end=" ")
         
-        # Fetch data from API
-        mahut_text, metadata = fetch_permit_data(permit_id)
+        # Fetch data from API (old_main does not reschedule throttled permits)
+        try:
+            mahut_text, metadata = fetch_permit_data(permit_id)
+        except RetryLater:
+            mahut_text, metadata = None, {}
         
         if not mahut_text:
             print("ERROR: Failed to fetch")
@@ -907,9 +879,7 @@ def old_main():
                 'error': 'Failed to fetch or extract מהות הבקשה'
             })
             mark_permit_processed(permit_id)  # Mark as processed even if failed
-            # Smart throttle: random delay (REMOVED)
-            # delay = random.uniform(REQUEST_DELAY_MIN, REQUEST_DELAY_MAX)
-            # time.sleep(delay)
+            # Throttling is done by the shared per-host rate limiter in fetch_client
             requests_in_batch += 1
             continue
         
@@ -953,9 +923,7 @@ def old_main():
         processed += 1
         requests_in_batch += 1
         
-        # Smart throttle: random delay between requests (REMOVED)
-        # delay = random.uniform(REQUEST_DELAY_MIN, REQUEST_DELAY_MAX)
-        # time.sleep(delay)
+        # Throttling is done by the shared per-host rate limiter in fetch_client
         
         # Batch cooldown: every 10 requests, take a longer break
         if requests_in_batch >= BATCH_SIZE and i < len(permit_ids):
@@ -1104,13 +1072,36 @@ def sort_opportunities_by_date(output_file: str = "opportunities.json"):
         print(f"   ❌ Failed to sort opportunities: {e}")
 
 
-def process_permit(permit_id: str, client: OpenAI, results: Dict[str, int]) -> None:
+def prefetch_permit_pages(permit_ids: List[str]) -> Dict[str, Optional[bytes]]:
+    """
+    Fetch all permit pages up front with the async engine (FETCH_ENGINE=async).
+    Permits that fail here are fetched again by the regular worker path.
+    """
+    engine = AsyncFetchEngine(
+        headers=HEADERS,
+        proxy_pool=PROXY_POOL,
+        is_blocked=lambda status, body: status == 429 or b'id="mahut"' not in body,
+        concurrency=ASYNC_CONCURRENCY,
+        timeout=REQUEST_TIMEOUT,
+        verify=VERIFY_SSL,
+    )
+    urls = {pid: API_URL_TEMPLATE.format(permit_id=pid) for pid in permit_ids}
+    # Pages still fresh in the response cache are served from there by fetch_permit_data
+    urls = {pid: url for pid, url in urls.items() if not response_cache.get(url)}
+    print(f"Prefetching {len(urls)} permit pages (async, {ASYNC_CONCURRENCY} in flight)...")
+    pages = engine.fetch_pages(urls)
+    fetched = sum(1 for body in pages.values() if body)
+    print(f"OK: Prefetched {fetched}/{len(urls)} pages")
+    return pages
+
+
+def process_permit(permit_id: str, client: OpenAI, results: Dict[str, int], page: Optional[bytes] = None) -> None:
     """
     Worker function to process a single permit.
     """
     try:
-        # Fetch data from API
-        mahut_text, metadata = fetch_permit_data(permit_id)
+        # Fetch data from API (or use the page prefetched by the async engine)
+        mahut_text, metadata = fetch_permit_data(permit_id, page=page)
         
         if not mahut_text:
             logger.warning(f"Permit {permit_id}: Failed to fetch or extract text")
@@ -1163,12 +1154,23 @@ def process_permit(permit_id: str, client: OpenAI, results: Dict[str, int]) -> N
             if current % 10 == 0 or current == total:
                 print(f"Progress: {current}/{total}...")
 
+    except (RetryLater, DeadlineExceeded):
+        # Not marked processed: the scheduler retries it later or reports it as a straggler
+        raise
     except Exception as e:
         logger.error(f"Error processing permit {permit_id}: {e}")
         with results['lock']:
             results['errors'] += 1
 
 
+def give_up_permit(permit_id: str, results: Dict[str, int]):
+    """Final failure after all scheduled retries (429 / CAPTCHA / proxy errors)."""
+    logger.error(f"Permit {permit_id}: Failed to fetch after {MAX_FETCH_ATTEMPTS} attempts")
+    mark_permit_processed(permit_id)
+    with results['lock']:
+        results['errors'] += 1
+
+
 def main():
     """
     Main workflow: read permits, fetch data, analyze with AI, save results.
@@ -1185,14 +1187,13 @@ def main():
         return
     
     # Initialize OpenAI client
-    client = OpenAI(api_key=api_key)
+    client = OpenAI(api_key=api_key, timeout=OPENAI_TIMEOUT)
     print("OK: OpenAI client initialized")
     
-    # Test proxy connection
+    # Proxy sessions are health-checked lazily in the background, no startup probe
     print(f"Proxy Configured: {USE_PROXY}")
-    if USE_PROXY:
-        if not test_proxy_connection():
-            print("\n❌ Proxy Connection FAILED. Check credentials.")
+    if PROXY_POOL.enabled:
+        print(f"OK: Proxy pool ready ({PROXY_POOL.size} sessions via {PROXY_HOST})")
     
 
     
@@ -1233,20 +1234,35 @@ def main():
         'lock': threading.Lock()
     }
     
-    print(f"\nStarting parallel execution with 7 workers for {len(permit_ids)} permits...")
+    print(f"\nStarting parallel execution with {MAX_WORKERS} workers for {len(permit_ids)} permits...")
     
     start_time = time.time()
+    fetch_client.configure(pool_size=MAX_WORKERS)
     
-    # Parallel Execution
-    with concurrent.futures.ThreadPoolExecutor(max_workers=7) as executor:
-        futures = [
-            executor.submit(process_permit, pid, client, results_tracker)
-            for pid in permit_ids
-        ]
-        concurrent.futures.wait(futures)
+    pages = prefetch_permit_pages(permit_ids) if FETCH_ENGINE == "async" else {}
+    
+    # Parallel Execution: throttled permits are rescheduled instead of sleeping in a worker
+    report = run_with_retries(
+        lambda pid: process_permit(pid, client, results_tracker, pages.pop(pid, None)),
+        permit_ids,
+        max_workers=MAX_WORKERS,
+        max_attempts=MAX_FETCH_ATTEMPTS,
+        on_give_up=lambda pid, reason: give_up_permit(pid, results_tracker),
+        task_timeout=TASK_TIMEOUT,
+        deadline=deadlines.stage_deadline(),
+    )
+    if report.retries:
+        print(f"Rescheduled {report.retries} throttled fetches")
+    if report.stragglers:
+        # Left unprocessed, so the next run picks them up
+        print(f"⏱️  {len(report.stragglers)} permits unfinished at the deadline: {', '.join(report.stragglers[:20])}")
+        logger.warning(f"Stragglers (deadline): {report.stragglers}")
         
     duration = time.time() - start_time
     print(f"\nProcessing completed in {duration:.2f} seconds.")
+    if fetch_client.HEDGING:
+        stats = fetch_client.hedge_stats()
+        print(f"Hedged requests: {stats['hedges']}/{stats['requests']}")
     
     # Convert JSONL to JSON
     convert_jsonl_to_json(OUTPUT_FILE_JSONL, OUTPUT_FILE)
@@ -1261,5 +1277,56 @@ def main():
     print(f"  - Errors: {results_tracker['errors']}")
 
 
+def _reparse_cached_permit(opportunity: Dict[str, Any]) -> Dict[str, Any]:
+    """Refresh the scraped fields of one opportunity from its cached page (runs in a worker process)."""
+    cached = response_cache.get(API_URL_TEMPLATE.format(permit_id=opportunity.get('permit_id')), ttl=None)
+    if not cached:
+        return opportunity
+    parsed = parse_permit_markup(cached.content)
+    if not parsed:
+        return opportunity
+    _, metadata = parsed
+    # AI fields (project_type, description, ...) are kept; only parser output is rebuilt
+    return {**opportunity, **metadata}
+
+
+def reparse_from_cache(output_file: str = OUTPUT_FILE):
+    """
+    Rebuild opportunities.json from cached GetBakashaFile pages after a parser change.
+    Offline: no proxy, no OpenAI. Permits without a cached page keep their current record.
+    """
+    print("=" * 60)
+    print("Re-parsing opportunities from the response cache (offline)")
+    print("=" * 60)
+
+    try:
+        with open(output_file, 'r', encoding='utf-8') as f:
+            opportunities = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError) as e:
+        print(f"ERROR: Could not read {output_file}: {e}")
+        return
+
+    start_time = time.time()
+    with concurrent.futures.ProcessPoolExecutor() as executor:
+        rebuilt = list(executor.map(_reparse_cached_permit, opportunities, chunksize=16))
+
+    refreshed = sum(1 for old, new in zip(opportunities, rebuilt) if old != new)
+    with open(output_file, 'w', encoding='utf-8') as f:
+        json.dump(rebuilt, f, ensure_ascii=False, indent=2)
+    sort_opportunities_by_date(output_file)
+
+    print(f"OK: Re-parsed {len(rebuilt)} opportunities ({refreshed} changed) in {time.time() - start_time:.2f} seconds.")
+
+
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Bat Yam permit analyzer (Stage 2 & 3)")
+    parser.add_argument("--reparse-from-cache", action="store_true",
+                        help="Rebuild opportunities.json from cached pages without touching the network")
+    args = parser.parse_args()
+
+    if args.reparse_from_cache:
+        reparse_from_cache()
+    else:
+        main()
\ No newline at end of file
@@ -0,0 +1,217 @@
+"""
+Multi-year permit backfill.
+
+Daily discovery (get_bakasha_numbers.py) only looks at the current years. This
+script loads historical permits for a range of years in one bounded run:
+
+- every year is a shard: its permit numbers are discovered with one
+  GetBakashotByNumber search (b=<year>), then every permit page is fetched and
+  parsed (fetch_permit_data from analyze_permits.py, no AI step);
+- shards run in parallel (--shards), each with its own worker pool (--workers);
+- all requests draw from a separate "backfill" rate budget per host
+  (BACKFILL_RATE_PER_SEC / BACKFILL_BURST in .env), so a backfill never eats
+  into the budget of the daily pipelines;
+- every shard checkpoints under backfill/<year>/: the discovered IDs
+  (permit_ids.json), one JSONL line per fetched permit (permits.jsonl) and its
+  status (checkpoint.json). A rerun resumes where the last one stopped.
+
+Usage:
+    python backfill_permits.py --from-year 2018 --to-year 2024
+    python backfill_permits.py --from-year 2020 --to-year 2020 --max-minutes 60
+"""
+
+import argparse
+import concurrent.futures
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Set
+
+# Shared fetch layer lives in PlanScope_Scrapers/common
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from common import complot_search, deadlines, fetch_client, rate_limiter, sites
+from common.deadlines import Deadline, DeadlineExceeded
+from common.retry_queue import RetryLater, run_with_retries
+
+# Page fetching and parsing are shared with the daily analyzer (no AI step here)
+from analyze_permits import MAX_FETCH_ATTEMPTS, PROXY_POOL, TASK_TIMEOUT, fetch_permit_data
+
+logger = logging.getLogger("backfill_permits")
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+
+SITE = sites.current()
+BACKFILL_DIR = Path("backfill")
+RATE_BUDGET = "backfill"
+BACKFILL_RATE = float(os.getenv("BACKFILL_RATE_PER_SEC", "1.0"))
+BACKFILL_BURST = float(os.getenv("BACKFILL_BURST", "3"))
+API_HOST = "handasi.complot.co.il"
+
+DEFAULT_SHARDS = 2       # Years processed in parallel
+DEFAULT_WORKERS = 4      # Fetch workers per year
+
+
+class YearShard:
+    """One year of the backfill, with its files under backfill/<year>/."""
+
+    def __init__(self, year: int):
+        self.year = year
+        self.dir = BACKFILL_DIR / str(year)
+        self.ids_file = self.dir / "permit_ids.json"
+        self.data_file = self.dir / "permits.jsonl"
+        self.checkpoint_file = self.dir / "checkpoint.json"
+        self._lock = threading.Lock()
+
+    def discover(self) -> List[str]:
+        """Permit numbers of the year (from the checkpoint if discovery already ran)."""
+        if self.ids_file.exists():
+            with open(self.ids_file, "r", encoding="utf-8") as f:
+                return json.load(f)
+
+        soup = complot_search.search(
+            "GetBakashotByNumber", {"siteid": SITE.site_id, "grp": 0, "t": 0, "b": str(self.year), "l": "true"}
+        )
+        permit_ids = set()
+        for cells in complot_search.result_rows(soup):
+            link = cells[1].find("a") if len(cells) > 1 else None
+            permit_id = link.get_text(strip=True) if link is not None else ""
+            if len(permit_id) == 8 and permit_id.startswith(str(self.year)):
+                permit_ids.add(permit_id)
+
+        permit_ids = sorted(permit_ids)
+        self.dir.mkdir(parents=True, exist_ok=True)
+        with open(self.ids_file, "w", encoding="utf-8") as f:
+            json.dump(permit_ids, f, ensure_ascii=False, indent=2)
+        return permit_ids
+
+    def fetched_ids(self) -> Set[str]:
+        """Permits already saved by earlier runs."""
+        done = set()
+        if not self.data_file.exists():
+            return done
+        with open(self.data_file, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    done.add(json.loads(line)["permit_id"])
+                except (ValueError, KeyError):
+                    continue  # Partial last line of an interrupted run
+        return done
+
+    def save_permit(self, record: Dict[str, Any]):
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        with self._lock:
+            with open(self.data_file, "a", encoding="utf-8") as f:
+                f.write(line)
+
+    def write_checkpoint(self, status: Dict[str, Any]):
+        tmp_path = self.checkpoint_file.with_suffix(".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"year": self.year, "updated_at": datetime.now().isoformat(), **status},
+                      f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.checkpoint_file)
+
+
+def fetch_permit(shard: YearShard, permit_id: str, failed: List[str]):
+    try:
+        mahut_text, metadata = fetch_permit_data(permit_id)
+    except (RetryLater, DeadlineExceeded):
+        raise
+    except Exception as e:
+        logger.error(f"[{shard.year}] Permit {permit_id}: {e}")
+        failed.append(permit_id)
+        return
+    if not metadata:
+        failed.append(permit_id)
+        return
+    shard.save_permit({"permit_id": permit_id, "mahut": mahut_text, **metadata,
+                       "fetched_at": datetime.now().isoformat()})
+
+
+def run_shard(year: int, workers: int, deadline: Deadline) -> Dict[str, Any]:
+    """Discover and fetch one year; returns the shard's checkpoint status."""
+    shard = YearShard(year)
+    try:
+        permit_ids = shard.discover()
+    except Exception as e:
+        logger.error(f"[{year}] Discovery failed: {e}")
+        status = {"complete": False, "error": f"discovery failed: {e}"}
+        shard.dir.mkdir(parents=True, exist_ok=True)
+        shard.write_checkpoint(status)
+        return status
+
+    done = shard.fetched_ids()
+    todo = [pid for pid in permit_ids if pid not in done]
+    print(f"[{year}] {len(permit_ids)} permits, {len(done)} already fetched, {len(todo)} to go")
+
+    failed: List[str] = []
+    report = run_with_retries(
+        lambda pid: fetch_permit(shard, pid, failed),
+        todo,
+        max_workers=workers,
+        max_attempts=MAX_FETCH_ATTEMPTS,
+        on_give_up=lambda pid, reason: failed.append(pid),
+        task_timeout=TASK_TIMEOUT,
+        deadline=deadline,
+    )
+
+    fetched = len(shard.fetched_ids())
+    status = {
+        "discovered": len(permit_ids),
+        "fetched": fetched,
+        "failed": sorted(failed),
+        "unfinished": sorted(report.stragglers),
+        "complete": not report.stragglers and fetched + len(failed) >= len(permit_ids),
+    }
+    shard.write_checkpoint(status)
+    print(f"[{year}] fetched {fetched}/{len(permit_ids)}, {len(failed)} failed, "
+          f"{len(report.stragglers)} left for the next run")
+    return status
+
+
+def main():
+    parser = argparse.ArgumentParser(description=f"{SITE.name} multi-year permit backfill")
+    parser.add_argument("--from-year", type=int, required=True, help="First year to load")
+    parser.add_argument("--to-year", type=int, required=True, help="Last year to load (inclusive)")
+    parser.add_argument("--shards", type=int, default=DEFAULT_SHARDS, help="Years processed in parallel")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="Fetch workers per year")
+    parser.add_argument("--max-minutes", type=float, default=None,
+                        help="Stop fetching after this long (unfinished permits are resumed next run)")
+    args = parser.parse_args()
+
+    years = list(range(args.to_year, args.from_year - 1, -1))   # Newest year first
+    if not years:
+        parser.error("--from-year must not be after --to-year")
+
+    # Own token bucket per host, separate from the daily pipelines' budget
+    rate_limiter.HOST_LIMITS[f"{API_HOST}#{RATE_BUDGET}"] = (BACKFILL_RATE, BACKFILL_BURST)
+    fetch_client.configure(pool_size=args.shards * args.workers, rate_budget=RATE_BUDGET)
+
+    deadline = deadlines.stage_deadline()
+    if args.max_minutes:
+        deadline = deadline.earliest(Deadline.after(args.max_minutes * 60))
+
+    print(f"Backfilling {len(years)} years ({args.from_year}-{args.to_year}), {args.shards} in parallel, "
+          f"{BACKFILL_RATE:g} req/s budget")
+    if PROXY_POOL.enabled:
+        print(f"Proxy pool: {PROXY_POOL.size} sessions")
+
+    start_time = time.time()
+    with concurrent.futures.ThreadPoolExecutor(max_workers=args.shards) as executor:
+        statuses = dict(zip(years, executor.map(lambda year: run_shard(year, args.workers, deadline), years)))
+
+    print(f"\nBackfill finished in {time.time() - start_time:.0f}s")
+    for year in years:
+        status = statuses[year]
+        state = "complete" if status.get("complete") else "incomplete"
+        print(f"  {year}: {status.get('fetched', 0)}/{status.get('discovered', 0)} ({state})")
+
+
+if __name__ == "__main__":
+    main()
@@ -5,19 +5,21 @@ import logging
 import glob
 import sys
 import threading
-import random
-import string
-import time
 from datetime import datetime
 from threading import Lock
-import concurrent.futures
 from pathlib import Path
 
 import requests
-from bs4 import BeautifulSoup
 from dotenv import load_dotenv
 import urllib3
 
+# Shared fetch layer lives in PlanScope_Scrapers/common
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from common import deadlines, fetch_client, html_parser, html_sections, response_cache, sites
+from common.deadlines import DeadlineExceeded
+from common.proxy_pool import ProxyPool
+from common.retry_queue import RetryLater, run_with_retries
+
 # Suppress SSL warnings
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
@@ -45,22 +47,26 @@ PROXY_PORT = os.getenv("PROXY_PORT", "33335")
 PROXY_USER = os.getenv("PROXY_USER")
 PROXY_PASS = os.getenv("PROXY_PASS")
 VERIFY_SSL = False
+PROXY_POOL = ProxyPool(PROXY_HOST, PROXY_PORT, PROXY_USER, PROXY_PASS, enabled=USE_PROXY, verify=VERIFY_SSL)
 
 # API
+SITE = sites.current()
 API_URL_TEMPLATE = (
     "https://handasi.complot.co.il/magicscripts/mgrqispi.dll"
-    "?appname=cixpa&prgname=GetBakashaFile&siteid=81&b={permit_id}&arguments=siteid,b"
+    f"?appname=cixpa&prgname=GetBakashaFile&siteid={SITE.site_id}&b={{permit_id}}&arguments=siteid,b"
 )
 
 HEADERS = {
     'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-    'Referer': 'https://batyam.complot.co.il/',
+    'Referer': SITE.referer,
     'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
     'Accept-Language': 'he-IL,he;q=0.9,en-US;q=0.8,en;q=0.7',
 }
 
 REQUEST_TIMEOUT = 30
 MAX_WORKERS = 5 
+MAX_FETCH_ATTEMPTS = 3
+TASK_TIMEOUT = 120       # Seconds per permit refresh, see common/deadlines.py
 
 # Files
 RELEVANT_PERMITS_FILE = "relevant_permits.json"
@@ -85,47 +91,36 @@ logger = logging.getLogger(__name__)
 # SCRAPING HELPERS (With Local Proxy Logic)
 # ============================================================================
 
-def get_proxy_dict(session_id=None):
-    if not USE_PROXY:
-        return None
-    current_user = PROXY_USER
-    if not current_user or not PROXY_PASS:
-        return None
-    if 'brd-customer' in current_user:
-        if '-country-' not in current_user:
-             current_user = f"{current_user}-country-il"
-        if session_id:
-            current_user = f"{current_user}-session-{session_id}"
-    proxy_url = f"http://{current_user}:{PROXY_PASS}@{PROXY_HOST}:{PROXY_PORT}"
-    return {"http": proxy_url, "https": proxy_url}
-
-def get_soup(permit_id: str, max_retries: int = 2):
+def get_soup(permit_id: str):
     """
     Fetches the URL and returns BeautifulSoup object using robust proxy logic.
+    Single request: 429 / connection errors raise RetryLater so the permit is
+    rescheduled (common/retry_queue.py) instead of the worker sleeping.
     """
     url = API_URL_TEMPLATE.format(permit_id=permit_id)
-    session_id = ''.join(random.choices(string.ascii_lowercase + string.digits, k=8))
-    proxies = get_proxy_dict(session_id=session_id)
+
+    # analyze_permits usually fetched this page earlier in the same daily run
+    cached = response_cache.get(url)
+    if cached:
+        return html_parser.make_soup(cached.content)
     
-    for attempt in range(max_retries + 1):
-        try:
-            response = requests.get(url, headers=HEADERS, timeout=REQUEST_TIMEOUT, proxies=proxies, verify=VERIFY_SSL)
-            if response.status_code == 429:
-                wait = 30 * (attempt + 1)
-                logger.warning(f"Permit {permit_id}: 429 Limit. Cooling down {wait}s...")
-                time.sleep(wait)
-                continue
-            response.raise_for_status()
-            response.encoding = response.apparent_encoding or 'utf-8'
-            return BeautifulSoup(response.text, 'html.parser')
-        except Exception as e:
-            logger.error(f"Error fetching {permit_id} (Attempt {attempt+1}): {e}")
-            time.sleep(2)
-            # Rotate proxy on error
-            session_id = ''.join(random.choices(string.ascii_lowercase + string.digits, k=8))
-            proxies = get_proxy_dict(session_id=session_id)
-            
-    return None
+    try:
+        response = fetch_client.get(url, headers=HEADERS, timeout=REQUEST_TIMEOUT, proxy_pool=PROXY_POOL, verify=VERIFY_SSL)
+        if response.status_code == 429:
+            # Reported to the host's AIMD controller
+            logger.warning(f"Permit {permit_id}: 429 Limit. Rescheduling...")
+            raise RetryLater("429")
+        response.raise_for_status()
+    except requests.exceptions.RequestException as e:
+        logger.error(f"Error fetching {permit_id}: {e}")
+        # Rotate proxy on error
+        PROXY_POOL.rotate()
+        raise RetryLater("request failed")
+
+    soup = html_parser.make_soup(response.text)
+    if soup.find('div', id='mahut'):
+        response_cache.put(url, response.content, response.headers.get('Content-Type'))
+    return soup
 
 # Import parsing logic purely for extraction, NOT fetching
 # To avoid double-fetching, we'll import functions or implement simple extractors.
@@ -146,8 +141,8 @@ except ImportError as e:
 # ============================================================================
 
 def find_latest_json() -> str:
-    """Finds the most recent bat_yam_permits_data JSON file."""
-    files = glob.glob("bat_yam_permits_data_*.json")
+    """Finds the most recent <site>_permits_data JSON file."""
+    files = glob.glob(f"{SITE.key}_permits_data_*.json")
     if not files:
         return None
     files.sort()
@@ -207,6 +202,7 @@ def scrape_and_save(permit_data: dict):
         
         # 3. Requirements Level
         req_level = parse_requirements_level(soup)
+        html_sections.release(soup)
         
         updates = {
             "history": history,
@@ -219,11 +215,19 @@ def scrape_and_save(permit_data: dict):
         save_incremental(permit_data)
         return True
         
+    except (RetryLater, DeadlineExceeded):
+        # Rescheduled by run_with_retries; old data is kept if it never succeeds
+        raise
     except Exception as e:
         logger.error(f"❌ Error scraping {permit_id}: {e}")
         save_incremental(permit_data)
         return False
 
+def keep_old_data(permit_data: dict, reason: str):
+    """Give-up handler: the permit could not be refreshed, keep its old data."""
+    logger.warning(f"Using old data for {permit_data.get('permit_id')} ({reason})")
+    save_incremental(permit_data)
+
 def convert_jsonl_to_json(jsonl_file: str, output_file: str):
     logger.info(f"Converting {jsonl_file} to {output_file}...")
     if not os.path.exists(jsonl_file):
@@ -296,44 +300,53 @@ def main():
          logger.warning(f"Found existing {TEMP_JSONL} - appending new results to it.")
 
     today_str = datetime.now().strftime("%Y_%m_%d")
-    output_filename = f"bat_yam_permits_data_{today_str}.json"
+    output_filename = f"{SITE.key}_permits_data_{today_str}.json"
     
     processed_ids = set()
 
     # Worker Pool
-    logger.info(f"Starting ThreadPoolExecutor with {MAX_WORKERS} workers...")
-    with concurrent.futures.ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
-        futures = []
+    logger.info(f"Starting worker pool with {MAX_WORKERS} workers...")
+    fetch_client.configure(pool_size=MAX_WORKERS)
+    to_scrape = []
+    
+    # 1. Process Base Data
+    for item in base_data:
+        if not isinstance(item, dict): continue
+        pid = str(item.get('permit_id'))
+        processed_ids.add(pid)
         
-        # 1. Process Base Data
-        for item in base_data:
+        if pid in relevant_ids:
+            to_scrape.append(item)
+        else:
+            save_incremental(item)
+            
+    # 2. Process New Opportunities
+    if os.path.exists(OPPORTUNITIES_FILE):
+        ops = load_json(OPPORTUNITIES_FILE)
+        for item in ops:
             if not isinstance(item, dict): continue
             pid = str(item.get('permit_id'))
-            processed_ids.add(pid)
-            
-            if pid in relevant_ids:
-                futures.append(executor.submit(scrape_and_save, item))
-            else:
-                futures.append(executor.submit(save_incremental, item))
-                
-        # 2. Process New Opportunities
-        if os.path.exists(OPPORTUNITIES_FILE):
-            ops = load_json(OPPORTUNITIES_FILE)
-            for item in ops:
-                if not isinstance(item, dict): continue
-                pid = str(item.get('permit_id'))
-                if pid not in processed_ids:
-                    logger.info(f"Found NEW opportunity {pid}")
-                    futures.append(executor.submit(save_incremental, item))
-                    processed_ids.add(pid)
-        
-        # Wait for completion
-        completed = 0
-        total = len(futures)
-        for future in concurrent.futures.as_completed(futures):
-            completed += 1
-            if completed % 10 == 0:
-                logger.info(f"Progress: {completed}/{total}")
+            if pid not in processed_ids:
+                logger.info(f"Found NEW opportunity {pid}")
+                save_incremental(item)
+                processed_ids.add(pid)
+    
+    # 3. Refresh relevant permits; throttled ones are rescheduled instead of sleeping in a worker
+    logger.info(f"Refreshing {len(to_scrape)} relevant permits...")
+    report = run_with_retries(
+        scrape_and_save,
+        to_scrape,
+        max_workers=MAX_WORKERS,
+        max_attempts=MAX_FETCH_ATTEMPTS,
+        on_give_up=keep_old_data,
+        task_timeout=TASK_TIMEOUT,
+        deadline=deadlines.stage_deadline(),
+    )
+    logger.info(f"Rescheduled {report.retries} throttled fetches")
+    if report.stragglers:
+        logger.warning(f"⏱️ {len(report.stragglers)} permits unfinished at the deadline, keeping their old data")
+        for item in report.stragglers:
+            keep_old_data(item, "deadline")
 
     logger.info("All tasks completed.")
     convert_jsonl_to_json(TEMP_JSONL, output_filename)
@@ -3,11 +3,16 @@ import glob
 import os
 import sys
 from datetime import datetime
+from pathlib import Path
 from typing import Dict, List, Any, Optional
 
-PERMITS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from common import sites
+
+SITE = sites.current()
+PERMITS_DIR = sites.work_dir(os.path.dirname(os.path.abspath(__file__)), SITE)
 REPORT_PREFIX = "permit_daily_report_"
-DATA_PREFIX = "bat_yam_permits_data_"
+DATA_PREFIX = f"{SITE.key}_permits_data_"
 
 def load_json(filepath: str) -> Dict[str, Any]:
     with open(filepath, 'r', encoding='utf-8') as f:
@@ -22,7 +27,7 @@ def get_latest_two_files(directory: str, prefix: str) -> List[str]:
     return files[:2]
 
 def extract_date_from_filename(filename: str) -> str:
-    # Expected format: bat_yam_permits_data_2026_01_06.json
+    # Expected format: <site>_permits_data_2026_01_06.json (bat_yam_permits_data_2026_01_06.json)
     basename = os.path.basename(filename)
     # Remove prefix and extension
     date_part = basename.replace(DATA_PREFIX, "").replace(".json", "")
@@ -1,17 +1,37 @@
-import time
 import os
+import sys
 import json
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
+from datetime import datetime
+from pathlib import Path
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import TimeoutException, NoSuchElementException
+from selenium.common.exceptions import TimeoutException
+
+# Shared fetch layer lives in PlanScope_Scrapers/common
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from common import browser_pool, complot_search, deadlines, selenium_helpers, sites
+from common.append_log import AppendLog, write_json_atomic
+
+SITE = sites.current()
 
 PERMIT_JSON = "permit_numbers.json"
 
+# New permit numbers are appended here and compacted into PERMIT_JSON every COMPACT_EVERY
+# entries and at the end of the run (common/append_log.py)
+PERMIT_LOG = AppendLog("permit_numbers.log.jsonl")
+COMPACT_EVERY = 1000
+
+# "http": call the GetBakashotByNumber endpoint directly (no browser, falls back to Selenium on failure)
+# "selenium": page through the search UI in headless Chrome
+DISCOVERY_MODE = os.getenv("PERMIT_DISCOVERY_MODE", "http")
+
+# Permit numbers are 8 digits starting with the year; each prefix is one search.
+# Daily discovery covers last year and this year; older years: backfill_permits.py
+PERMIT_PREFIXES = tuple(str(year) for year in (datetime.now().year - 1, datetime.now().year))
+
 def load_existing_permits():
-    """Load existing permit numbers from JSON file."""
+    """Load existing permit numbers from the JSON file plus the not yet compacted log."""
     existing = set()
     if os.path.exists(PERMIT_JSON):
         try:
@@ -22,42 +42,113 @@ def load_existing_permits():
                         existing.add(str(permit).strip())
         except Exception as e:
             print(f"Warning: Could not read existing permits from {PERMIT_JSON}: {e}")
+    existing.update(str(permit).strip() for permit in PERMIT_LOG.read())
     return existing
 
 def save_permits_to_json(permit_set):
-    """Save all permits to JSON file."""
+    """Save all permits to JSON file (atomic replace)."""
     try:
         # Sort for consistency
-        sorted_permits = sorted(list(permit_set))
-        with open(PERMIT_JSON, "w", encoding="utf-8") as f:
-            json.dump(sorted_permits, f, ensure_ascii=False, indent=2)
+        write_json_atomic(PERMIT_JSON, sorted(permit_set))
     except Exception as e:
         print(f"Error saving to JSON: {e}")
+        return False
+    return True
+
+def record_new_permits(permit_numbers):
+    """Append newly found permits to the log; compacts once the log has COMPACT_EVERY entries."""
+    PERMIT_LOG.append(permit_numbers)
+    if len(PERMIT_LOG) >= COMPACT_EVERY:
+        compact_permits()
+
+def compact_permits():
+    """Fold the log into the sorted JSON file and clear it."""
+    if len(PERMIT_LOG) == 0:
+        return
+    if save_permits_to_json(load_existing_permits()):
+        PERMIT_LOG.clear()
+
+def is_valid_permit_number(permit_number):
+    return len(permit_number) == 8 and permit_number.startswith(PERMIT_PREFIXES)
+
+def fetch_permit_numbers_http(prefix):
+    """Permit numbers starting with `prefix` from the GetBakashotByNumber endpoint (all rows in one GET)."""
+    soup = complot_search.search(
+        "GetBakashotByNumber", {"siteid": SITE.site_id, "grp": 0, "t": 0, "b": prefix, "l": "true"}
+    )
+    rows = complot_search.result_rows(soup)
+    print(f"Search '{prefix}': {len(rows)} rows")
+    permit_numbers = []
+    for cells in rows:
+        link = cells[1].find("a") if len(cells) > 1 else None
+        if link is not None:
+            permit_numbers.append(link.get_text(strip=True))
+    return permit_numbers
+
+def scrape_permit_numbers_http(existing_permits, new_permits):
+    """
+    HTTP discovery, newest prefix first. Within a prefix, numbers are walked
+    newest-first and the run stops after STOP_AFTER_KNOWN consecutive known ones.
+    Returns False when the endpoint could not be used.
+    """
+    try:
+        for prefix in sorted(PERMIT_PREFIXES, reverse=True):
+            if deadlines.current().expired:
+                print("Stage deadline reached, keeping the permits found so far.")
+                break
+            permit_numbers = []
+            for permit_number in fetch_permit_numbers_http(prefix):
+                if permit_number and is_valid_permit_number(permit_number):
+                    permit_numbers.append(permit_number)
+                elif permit_number:
+                    print(f"Skipped (wrong format): {permit_number}")
+
+            fresh, stopped = complot_search.new_items(sorted(set(permit_numbers), reverse=True), existing_permits)
+            for permit_number in fresh:
+                new_permits.append(permit_number)
+                existing_permits.add(permit_number)
+                print(f"Found NEW: {permit_number}")
+            record_new_permits(fresh)
+            if stopped:
+                print(f"Reached {complot_search.STOP_AFTER_KNOWN} known permits in a row, stopping.")
+                break
+    except Exception as e:
+        print(f"HTTP discovery failed: {e}")
+        return False
+
+    return True
 
 def scrape_permit_numbers():
     # Load existing permit numbers
     existing_permits = load_existing_permits()
     initial_count = len(existing_permits)
     print(f"Loaded {initial_count} existing permit numbers from {PERMIT_JSON}")
-    
-    # Chrome Headless Settings
-    chrome_options = Options()
-    chrome_options.add_argument("--headless") 
-    chrome_options.add_argument("--no-sandbox")
-    chrome_options.add_argument("--disable-dev-shm-usage")
-    chrome_options.add_argument("--window-size=1920,1080")
-    
-    # User-Agent to avoid blocking
-    chrome_options.add_argument("user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36")
 
-    driver = webdriver.Chrome(options=chrome_options)
-    
     # List to keep track of new permits found in this session
     new_permits = []
+
+    if DISCOVERY_MODE == "http" and scrape_permit_numbers_http(existing_permits, new_permits):
+        print("Permit list fetched over HTTP.")
+    else:
+        if DISCOVERY_MODE == "http":
+            print("Falling back to Selenium discovery...")
+        scrape_permit_numbers_selenium(existing_permits, new_permits)
+
+    # One sorted rewrite per run, for analyze_permits.py
+    compact_permits()
+
+    # Final summary
+    total_count = len(existing_permits)
+    print(f"\nDone! Found {len(new_permits)} new permits.")
+    print(f"Total permits in JSON: {total_count} (started with {initial_count})")
+
+def scrape_permit_numbers_selenium(existing_permits, new_permits):
+    # Warm headless Chrome from the shared pool (common/browser_pool.py)
+    driver = browser_pool.acquire()
     
     try:
         # 1. Search URL
-        url = "https://batyam.complot.co.il/iturbakashot/#search/GetBakashotByNumber&siteid=81&grp=0&t=0&b=2026&l=true&arguments=siteId,grp,t,b,l"
+        url = f"{SITE.portal}/iturbakashot/#search/GetBakashotByNumber&siteid={SITE.site_id}&grp=0&t=0&b={PERMIT_PREFIXES[-1]}&l=true&arguments=siteId,grp,t,b,l"
         print(f"Connecting to {url}...")
         driver.get(url)
 
@@ -67,46 +158,69 @@ def scrape_permit_numbers():
             show_all_btn = WebDriverWait(driver, 10).until(
                 EC.presence_of_element_located((By.XPATH, show_all_xpath))
             )
+            marker = selenium_helpers.table_marker(driver)
             driver.execute_script("arguments[0].click();", show_all_btn)
             print("Clicked 'Show All' via JS. Waiting for table update...")
-            time.sleep(5) 
+            if not selenium_helpers.wait_for_redraw(driver, marker):
+                print("Table did not redraw after 'Show All'. Continuing with current view.")
             
         except TimeoutException:
             print("'Show All' button not found. Assuming list is already full or empty.")
         except Exception as e:
             print(f"Error clicking 'Show All': {e}")
 
+        # Newest first, so the walk can stop once it reaches permits we already have
+        # (without DataTables the order is unknown, so every page is read)
+        newest_first = selenium_helpers.sort_table(driver, column=1, direction="desc")
+        known_run = 0
+        stop_after = complot_search.STOP_AFTER_KNOWN if newest_first else 0
+
         # 3. Pagination Loop
         page_num = 1
         while True:
+            # Stop before the orchestrator's hard kill; every page read so far is already in the log
+            if deadlines.current().expired:
+                print(f"Stage deadline reached before page {page_num}, keeping the permits found so far.")
+                break
+
             print(f"Scraping page {page_num}...")
             
             WebDriverWait(driver, 10).until(
                 EC.presence_of_element_located((By.XPATH, '//*[@id="results-table"]/tbody/tr'))
             )
             
-            rows = driver.find_elements(By.XPATH, '//*[@id="results-table"]/tbody/tr')
+            # One script call for the whole table (all pages when DataTables exposes them)
+            snapshot = selenium_helpers.extract_table(driver)
+            page_new = []
             
-            for row in rows:
-                try:
-                    link_element = row.find_element(By.XPATH, './td[2]/a')
-                    permit_number = link_element.text.strip()
-                    
-                    if permit_number and len(permit_number) == 8 and (permit_number.startswith('2025') or permit_number.startswith('2026')):
-                        if permit_number not in existing_permits:
-                            new_permits.append(permit_number)
-                            existing_permits.add(permit_number)
-                            
-                            # Save immediately to JSON (rewrite file with full set)
-                            save_permits_to_json(existing_permits)
-                            
-                            print(f"Found NEW: {permit_number} (saved to JSON)")
-                        else:
-                            print(f"Found (already exists): {permit_number}")
-                    elif permit_number:
-                        print(f"Skipped (wrong format): {permit_number}")
-                except NoSuchElementException:
-                    continue
+            for cells in snapshot.rows:
+                permit_number = (cells[1]["link_text"] or "") if len(cells) > 1 else ""
+                
+                if permit_number and is_valid_permit_number(permit_number):
+                    if permit_number not in existing_permits:
+                        new_permits.append(permit_number)
+                        page_new.append(permit_number)
+                        existing_permits.add(permit_number)
+                        known_run = 0
+                        print(f"Found NEW: {permit_number}")
+                    else:
+                        known_run += 1
+                        print(f"Found (already exists): {permit_number}")
+                        if stop_after and known_run >= stop_after:
+                            break
+                elif permit_number:
+                    print(f"Skipped (wrong format): {permit_number}")
+
+            # Append the page's new permits to the log (compacted at the end of the run)
+            record_new_permits(page_new)
+
+            if stop_after and known_run >= stop_after:
+                print(f"Reached {stop_after} known permits in a row. Done.")
+                break
+
+            if snapshot.complete:
+                print(f"Read all {len(snapshot.rows)} rows through DataTables. Done.")
+                break
 
             # 4. Next Button
             try:
@@ -120,10 +234,13 @@ def scrape_permit_numbers():
                     print("Reached last page (Next button disabled). Done.")
                     break
                 
+                marker = selenium_helpers.table_marker(driver)
                 driver.execute_script("arguments[0].click();", next_button)
                 print(f"Clicked 'Next' (Page {page_num} done). Loading next page...")
                 page_num += 1
-                time.sleep(3) 
+                if not selenium_helpers.wait_for_redraw(driver, marker):
+                    print("Table did not redraw after 'Next'. Ending scrape.")
+                    break
                 
             except TimeoutException:
                 print("Next button not found via XPath. Ending scrape.")
@@ -136,12 +253,9 @@ def scrape_permit_numbers():
         print(f"Critical Error: {e}")
         
     finally:
-        driver.quit()
-        
-        # Final summary
-        total_count = len(existing_permits)
-        print(f"\nDone! Found {len(new_permits)} new permits.")
-        print(f"Total permits in JSON: {total_count} (started with {initial_count})")
+        browser_pool.release(driver)
 
 if __name__ == "__main__":
-    scrape_permit_numbers()
\ No newline at end of file
+    # Deadline set by the orchestrator (PLANSCOPE_STAGE_DEADLINE, see common/deadlines.py)
+    with deadlines.scope(deadlines.stage_deadline()):
+        scrape_permit_numbers()
\ No newline at end of file
@@ -1,11 +1,17 @@
 import os
 import shutil
 import subprocess
+import time
 import logging
 import sys
 from datetime import datetime
 import glob
 from typing import List
+from pathlib import Path
+
+# Shared fetch layer lives in PlanScope_Scrapers/common
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from common import bandwidth, sites
 
 # Setup Logging
 logging.basicConfig(
@@ -19,25 +25,43 @@ logging.basicConfig(
 logger = logging.getLogger("Orchestrator")
 
 PERMITS_DIR = os.path.dirname(os.path.abspath(__file__))
-BACKUP_DIR = os.path.join(PERMITS_DIR, ".backup")
 
-# Critical Status Files to Backup/Restore
+# Site of this run (PLANSCOPE_SITE, see common/sites.py) and the directory holding its files
+SITE = sites.current()
+WORK_DIR = sites.work_dir(PERMITS_DIR, SITE)
+BACKUP_DIR = os.path.join(WORK_DIR, ".backup")
+
+# Critical Status Files to Backup/Restore.
+# Discovery output (permit_numbers.json + permit_numbers.log.jsonl, permit_id_space.json) is
+# only appended to or replaced atomically, so it stays valid when a stage stops midway and is
+# never rolled back: a failed or timed-out day keeps the permits it found.
 CRITICAL_FILES = [
-    "permit_numbers.json",
     "processed_permits.json",
     "relevant_permits.json",
     "skipped_permits.json",
-    "opportunities.json"
+    "opportunities.json",
 ]
 
 # Scripts to Run Sequence
 SCRIPTS = [
     "get_bakasha_numbers.py",
+    "scan_permit_ids.py",
     "analyze_permits.py",
     "daily_permit_scraper.py",
     "daily_report_permit.py"
 ]
 
+# Hard timeout per script (minutes). The script itself is told to wrap up
+# STAGE_DEADLINE_MARGIN earlier (PLANSCOPE_STAGE_DEADLINE, see common/deadlines.py)
+SCRIPT_TIMEOUTS = {
+    "get_bakasha_numbers.py": 30,
+    "scan_permit_ids.py": 20,
+    "analyze_permits.py": 180,
+    "daily_permit_scraper.py": 60,
+    "daily_report_permit.py": 10,
+}
+STAGE_DEADLINE_MARGIN = 5   # Minutes between the stage deadline and the hard kill
+
 class BackupManager:
     """Handles backup and restoration of critical files."""
     
@@ -62,7 +86,7 @@ class BackupManager:
             os.makedirs(BACKUP_DIR)
         
         for filename in CRITICAL_FILES:
-            src = os.path.join(PERMITS_DIR, filename)
+            src = os.path.join(WORK_DIR, filename)
             if os.path.exists(src):
                 dst = os.path.join(BACKUP_DIR, filename)
                 shutil.copy2(src, dst)
@@ -76,24 +100,23 @@ class BackupManager:
         logger.warning("⚠️ Restoring system state from backup...")
         for filename in self.backed_up_files:
             src = os.path.join(BACKUP_DIR, filename)
-            dst = os.path.join(PERMITS_DIR, filename)
+            dst = os.path.join(WORK_DIR, filename)
             shutil.copy2(src, dst)
             logger.info(f"Restored: {filename}")
         
         self.cleanup_new_files()
 
     def cleanup_new_files(self):
-        """Deletes files created during the failed run to keep directory clean."""
+        """Deletes the report of the failed run; the scraped data is kept for the next run to resume from."""
         today_date = datetime.now().strftime("%Y_%m_%d")
         
+        # {site}_permits_data_<date>.json and daily_update_temp.jsonl are appended per permit
         patterns = [
-            f"bat_yam_permits_data_{today_date}.json",
             f"permit_daily_report_{today_date}.json",
-            "daily_update_temp.jsonl"
         ]
         
         for pattern in patterns:
-            file_path = os.path.join(PERMITS_DIR, pattern)
+            file_path = os.path.join(WORK_DIR, pattern)
             if os.path.exists(file_path):
                 os.remove(file_path)
                 logger.info(f"🗑️ Deleted partial/failed output: {pattern}")
@@ -107,7 +130,11 @@ class BackupManager:
 
 def run_pipeline():
     start_time = datetime.now()
-    logger.info(f"🚀 Starting Main Permit Orchestrator at {start_time}")
+    logger.info(f"🚀 Starting Main Permit Orchestrator for {SITE.name} at {start_time}")
+    
+    # Stages tag their proxy bandwidth with this run id (common/bandwidth.py)
+    run_id = bandwidth.new_run_id()
+    env = {**os.environ, "PLANSCOPE_RUN_ID": run_id, sites.SITE_ENV: SITE.key}
     
     with BackupManager():
         for script in SCRIPTS:
@@ -117,15 +144,31 @@ def run_pipeline():
             try:
                 # תוקן: שימוש ב-sys.executable מבטיח שמשתמשים באותו אינטרפרטר (חשוב ל-venv ולענן)
                 cmd = [sys.executable, script_path] 
-                result = subprocess.run(cmd, check=True, cwd=PERMITS_DIR, capture_output=False)
+                timeout_minutes = SCRIPT_TIMEOUTS[script]
+                stage_deadline = time.time() + max(1, timeout_minutes - STAGE_DEADLINE_MARGIN) * 60
+                stage_env = {**env, "PLANSCOPE_STAGE_DEADLINE": str(stage_deadline)}
+                result = subprocess.run(cmd, check=True, cwd=WORK_DIR, env=stage_env, capture_output=False,
+                                        timeout=timeout_minutes * 60)
                 
             except subprocess.CalledProcessError as e:
                 logger.error(f"❌ Script failed: {script} (Exit Code: {e.returncode})")
                 raise e # Trigger __exit__ rollback
+            except subprocess.TimeoutExpired as e:
+                logger.error(f"❌ Script timed out: {script} (after {timeout_minutes} minutes)")
+                raise e # Trigger __exit__ rollback
 
     end_time = datetime.now()
     duration = end_time - start_time
     logger.info(f"🏁 Orchestrator finished successfully in {duration}")
+    log_bandwidth(run_id)
+
+def log_bandwidth(run_id: str):
+    """Per-stage and total proxy bandwidth of this run."""
+    stages = bandwidth.run_totals(run_id)
+    for stage, totals in stages.items():
+        logger.info(f"📶 {stage}: {bandwidth.format_bytes(totals['bytes'])} in {totals['requests']} responses")
+    total_bytes = sum(totals['bytes'] for totals in stages.values())
+    logger.info(f"📶 Run {run_id} total proxy bandwidth: {bandwidth.format_bytes(total_bytes)}")
 
 if __name__ == "__main__":
     try:
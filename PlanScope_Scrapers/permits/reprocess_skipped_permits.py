@@ -4,14 +4,11 @@ Based on analyze_permits.py.
 """
 
 import os
+import sys
 import json
-import time
-import random
 import re
 import logging
-import string
 import threading
-import concurrent.futures
 from datetime import datetime
 from typing import Any, Dict, List, Optional, Tuple
 from pathlib import Path
@@ -22,6 +19,13 @@ from openai import OpenAI
 from dotenv import load_dotenv
 import urllib3
 
+# Shared fetch layer lives in PlanScope_Scrapers/common
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from common import deadlines, fetch_client, html_parser, html_sections, sites
+from common.deadlines import DeadlineExceeded
+from common.proxy_pool import ProxyPool
+from common.retry_queue import RetryLater, run_with_retries
+
 # Suppress SSL warnings
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
@@ -45,21 +49,33 @@ PROXY_PORT = os.getenv("PROXY_PORT", "33335")
 PROXY_USER = os.getenv("PROXY_USER")
 PROXY_PASS = os.getenv("PROXY_PASS")
 VERIFY_SSL = False
+PROXY_POOL = ProxyPool(PROXY_HOST, PROXY_PORT, PROXY_USER, PROXY_PASS, enabled=USE_PROXY, verify=VERIFY_SSL)
 
 # API
+SITE = sites.current()
 API_URL_TEMPLATE = (
     "https://handasi.complot.co.il/magicscripts/mgrqispi.dll"
-    "?appname=cixpa&prgname=GetBakashaFile&siteid=81&b={permit_id}&arguments=siteid,b"
+    f"?appname=cixpa&prgname=GetBakashaFile&siteid={SITE.site_id}&b={{permit_id}}&arguments=siteid,b"
 )
 
 HEADERS = {
     'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-    'Referer': 'https://batyam.complot.co.il/',
+    'Referer': SITE.referer,
     'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
     'Accept-Language': 'he-IL,he;q=0.9,en-US;q=0.8,en;q=0.7',
 }
 
+# Page regions the parsers below read; only these subtrees are built (common/html_sections.py)
+PERMIT_SECTION_IDS = (
+    "mahut", "info-main", "navbar-titles-id", "table-baaley-inyan",
+    "table-gushim-helkot", "table-events", "btn-meetings", "table-meetings",
+)
+
 REQUEST_TIMEOUT = 30
+MAX_WORKERS = 5
+TASK_TIMEOUT = 300       # Seconds per permit (fetch + AI), see common/deadlines.py
+MAX_FETCH_ATTEMPTS = 3   # Throttled permits are rescheduled with backoff (common/retry_queue.py)
+OPENAI_TIMEOUT = 60
 
 # Files
 INPUT_FILE = "add_skipped_permits.txt"
@@ -104,20 +120,6 @@ logger = logging.getLogger(__name__)
 # HELPER FUNCTIONS (Copied from analyze_permits.py)
 # ============================================================================
 
-def get_proxy_dict(session_id=None):
-    if not USE_PROXY:
-        return None
-    current_user = PROXY_USER
-    if not current_user or not PROXY_PASS:
-        return None
-    if 'brd-customer' in current_user:
-        if '-country-' not in current_user:
-             current_user = f"{current_user}-country-il"
-        if session_id:
-            current_user = f"{current_user}-session-{session_id}"
-    proxy_url = f"http://{current_user}:{PROXY_PASS}@{PROXY_HOST}:{PROXY_PORT}"
-    return {"http": proxy_url, "https": proxy_url}
-
 def flip_text(text: str) -> str:
     if not text: return text
     if any("\u0590" <= char <= "\u05EA" for char in text):
@@ -163,7 +165,7 @@ def _parse_meetings(soup: BeautifulSoup) -> List[Dict[str, Any]]:
                 meeting_id = _get_text(meeting_link)
                 match = re.search(r'getMeeting\((\d+),(\d+)\)', meeting_link.get('href', ''))
                 if match:
-                    meeting_url = f"https://handasi.complot.co.il/magicscripts/mgrqispi.dll?appname=cixpa&prgname=GetVaadaFile&siteid=81&t={match.group(1)}&v={match.group(2)}&arguments=siteid,t,v"
+                    meeting_url = f"https://handasi.complot.co.il/magicscripts/mgrqispi.dll?appname=cixpa&prgname=GetVaadaFile&siteid={SITE.site_id}&t={match.group(1)}&v={match.group(2)}&arguments=siteid,t,v"
             
             if not meeting_id:
                 for col in cols:
@@ -259,50 +261,57 @@ def _parse_history(soup: BeautifulSoup) -> List[Dict[str, Optional[str]]]:
         })
     return history
 
-def fetch_permit_data(permit_id: str, max_retries: int = 2) -> Tuple[Optional[str], Dict[str, Any]]:
+def fetch_permit_data(permit_id: str) -> Tuple[Optional[str], Dict[str, Any]]:
+    """
+    One request for the permit page. On 429 / CAPTCHA / proxy or server errors /
+    timeouts it raises RetryLater, so run_with_retries reschedules the permit with
+    backoff instead of a worker sleeping; a request cut off by the task's deadline
+    raises DeadlineExceeded.
+    """
     url = API_URL_TEMPLATE.format(permit_id=permit_id)
-    session_id = ''.join(random.choices(string.ascii_lowercase + string.digits, k=8))
-    proxies = get_proxy_dict(session_id=session_id)
-    
-    for attempt in range(max_retries + 1):
-        try:
-            response = requests.get(url, headers=HEADERS, timeout=REQUEST_TIMEOUT, proxies=proxies, verify=VERIFY_SSL)
-            if response.status_code == 429:
-                time.sleep(40 * (attempt + 1))
-                continue
-            response.raise_for_status()
-            response.encoding = response.apparent_encoding or 'utf-8'
-            soup = BeautifulSoup(response.text, 'html.parser')
-            
-            mahut_div = soup.find('div', id='mahut')
-            if mahut_div:
-                text = mahut_div.get_text(separator=' ', strip=True).replace('מהות הבקשה', '', 1).strip()
-                mahut_text = text.replace('\u200f', '').replace('\u200e', '').strip()
-            else:
-                if attempt < max_retries:
-                    time.sleep(40)
-                    continue
-                return None, {}
-            
-            metadata = {
-                "request_type": _parse_request_info(soup).get("request_type"),
-                "main_use": _parse_request_info(soup).get("main_use"),
-                "request_description": _parse_request_info(soup).get("request_description"),
-                "address": _parse_address(soup),
-                "applicants": _parse_applicants(soup),
-                "parcels": _parse_parcels(soup),
-                "history": _parse_history(soup),
-                "meeting_history": _parse_meetings(soup) if _has_meetings(soup) else [],
-            }
-            return mahut_text, metadata
-            
-        except Exception:
-            time.sleep(5)
-            continue
-    return None, {}
+    try:
+        response = fetch_client.get(url, headers=HEADERS, timeout=REQUEST_TIMEOUT, proxy_pool=PROXY_POOL, verify=VERIFY_SSL)
+        if response.status_code == 429:
+            # Already reported to the host's AIMD controller
+            raise RetryLater("429")
+        response.raise_for_status()
+    except requests.exceptions.ProxyError as e:
+        PROXY_POOL.rotate()
+        raise RetryLater("proxy limit" if fetch_client.is_proxy_limit_error(e) else "proxy error")
+    except requests.exceptions.Timeout:
+        if deadlines.current().expired:
+            raise DeadlineExceeded("deadline exceeded during the request")
+        raise RetryLater("timeout")
+    except requests.exceptions.RequestException:
+        raise RetryLater("request failed")
+
+    soup = html_parser.make_soup(response.text, parse_only=html_sections.by_id(PERMIT_SECTION_IDS))
+    try:
+        mahut_div = soup.find('div', id='mahut')
+        if not mahut_div:
+            fetch_client.report_throttle(url, "CAPTCHA", proxy_pool=PROXY_POOL)
+            raise RetryLater("CAPTCHA")
+        text = mahut_div.get_text(separator=' ', strip=True).replace('מהות הבקשה', '', 1).strip()
+        mahut_text = text.replace('\u200f', '').replace('\u200e', '').strip()
+
+        request_info = _parse_request_info(soup)
+        metadata = {
+            "request_type": request_info.get("request_type"),
+            "main_use": request_info.get("main_use"),
+            "request_description": request_info.get("request_description"),
+            "address": _parse_address(soup),
+            "applicants": _parse_applicants(soup),
+            "parcels": _parse_parcels(soup),
+            "history": _parse_history(soup),
+            "meeting_history": _parse_meetings(soup) if _has_meetings(soup) else [],
+        }
+        return mahut_text, metadata
+    finally:
+        html_sections.release(soup)
 
 def analyze_with_ai(mahut_text: str, permit_id: str, client: OpenAI, max_retries: int = 3) -> Optional[dict]:
     for attempt in range(max_retries):
+        deadlines.check()
         try:
             user_content = f"Permit ID: {permit_id}\n\nמהות הבקשה:\n{mahut_text}"
             response = client.chat.completions.create(
@@ -311,11 +320,12 @@ def analyze_with_ai(mahut_text: str, permit_id: str, client: OpenAI, max_retries
                     {"role": "system", "content": SYSTEM_PROMPT},
                     {"role": "user", "content": user_content}
                 ],
-                response_format={"type": "json_object"}
+                response_format={"type": "json_object"},
+                timeout=deadlines.clamp(OPENAI_TIMEOUT),
             )
             response_text = (response.choices[0].message.content or "").strip()
             if not response_text:
-                time.sleep(2)
+                deadlines.sleep(2)
                 continue
                 
             if response_text.startswith('```'):
@@ -326,7 +336,7 @@ def analyze_with_ai(mahut_text: str, permit_id: str, client: OpenAI, max_retries
             result['permit_id'] = permit_id
             return result
         except Exception:
-            time.sleep(2)
+            deadlines.sleep(2)
             continue
     return None
 
@@ -416,6 +426,8 @@ def process_permit(permit_id: str, client: OpenAI, results: Dict[str, int]) -> N
         project_type = result.get('project_type', 'Unknown')
         print(f"✅ [{permit_id}] ADDED: {flip_text(project_type)}")
 
+    except (RetryLater, DeadlineExceeded):
+        raise
     except Exception as e:
         logger.error(f"Error {permit_id}: {e}")
         with results['lock']: results['errors'] += 1
@@ -427,7 +439,7 @@ def main():
     if not api_key:
         print("ERROR: Missing OPENAI_API_KEY")
         return
-    client = OpenAI(api_key=api_key)
+    client = OpenAI(api_key=api_key, timeout=OPENAI_TIMEOUT)
     
     if not os.path.exists(INPUT_FILE):
         print(f"ERROR: {INPUT_FILE} not found")
@@ -442,9 +454,22 @@ def main():
         'processed': 0, 'relevant': 0, 'errors': 0, 'total': len(permit_ids), 'lock': threading.Lock()
     }
     
-    with concurrent.futures.ThreadPoolExecutor(max_workers=5) as executor:
-        futures = [executor.submit(process_permit, pid, client, results) for pid in permit_ids]
-        concurrent.futures.wait(futures)
+    def give_up(permit_id, reason):
+        with results['lock']: results['errors'] += 1
+        print(f"❌ [{permit_id}] Failed to fetch info ({reason})")
+
+    fetch_client.configure(pool_size=MAX_WORKERS)
+    report = run_with_retries(
+        lambda pid: process_permit(pid, client, results),
+        permit_ids,
+        max_workers=MAX_WORKERS,
+        max_attempts=MAX_FETCH_ATTEMPTS,
+        on_give_up=give_up,
+        task_timeout=TASK_TIMEOUT,
+        deadline=deadlines.stage_deadline(),
+    )
+    if report.stragglers:
+        print(f"⏱️  Unfinished at the deadline (still in {INPUT_FILE}'s list): {', '.join(report.stragglers)}")
         
     convert_jsonl_to_json(OUTPUT_FILE_JSONL, OUTPUT_FILE)
     print("DONE.")
@@ -0,0 +1,252 @@
+"""
+Gap-aware permit ID-space scanner.
+
+Permit numbers are sequential per year: <year><4-digit sequence> (e.g. 20250417).
+Instead of waiting for a permit to show up in the search UI, this script probes
+candidate IDs directly against GetBakashaFile:
+
+- a probe is one request under the shared per-host rate budget; with
+  FETCH_STREAMING=on it stops right after div#mahut, and the answer is
+  classified by a byte search (no HTML parsing): permit page, "no such request"
+  page, or block page (retried later);
+- permit_id_space.json keeps, per year, the high-water mark (highest existing
+  sequence), the gaps below it (probed and missing) and the unresolved IDs
+  (probes that failed every attempt);
+- a daily run probes only the frontier: windows of FRONTIER_WINDOW IDs past the
+  high-water mark, until a whole window is empty. Unresolved IDs are probed
+  again; gaps only with --recheck-gaps;
+- --full (or the first run of a year) also probes every unknown ID below the
+  highest permit already known from the search.
+
+New permit numbers are appended to the discovery log and compacted into
+permit_numbers.json, where analyze_permits.py picks them up. Complete permit pages are put in the response cache, so the
+analyzer does not fetch them again.
+
+Usage:
+    python scan_permit_ids.py                      # frontier of last year and this year
+    python scan_permit_ids.py --years 2024 --full
+    python scan_permit_ids.py --recheck-gaps
+"""
+
+import argparse
+import json
+import logging
+import os
+import sys
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Set
+
+import requests
+
+# Shared fetch layer lives in PlanScope_Scrapers/common
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from common import deadlines, fetch_client, response_cache
+from common.retry_queue import RetryLater, run_with_retries
+
+# URL, headers and proxy pool are shared with the analyzer (no AI step here)
+from analyze_permits import API_URL_TEMPLATE, HEADERS, MAX_FETCH_ATTEMPTS, PROXY_POOL, REQUEST_TIMEOUT, VERIFY_SSL
+from get_bakasha_numbers import compact_permits, load_existing_permits, record_new_permits
+
+logger = logging.getLogger("scan_permit_ids")
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+
+STATE_FILE = "permit_id_space.json"
+SEQUENCE_DIGITS = 4
+MAX_SEQUENCE = 10 ** SEQUENCE_DIGITS - 1
+FRONTIER_WINDOW = int(os.getenv("ID_SCAN_WINDOW", "40"))   # IDs probed past the high-water mark per round
+MAX_WORKERS = int(os.getenv("ID_SCAN_WORKERS", "8"))
+PROBE_TIMEOUT = 60       # Seconds per probe attempt
+
+FOUND, MISSING = "found", "missing"
+
+# A permit page always has the request-description block
+PERMIT_MARKER = b'id="mahut"'
+BLOCK_KEYWORDS = (b'captcha', b'recaptcha', b'robot', b'verification', b'challenge')
+MIN_PAGE_BYTES = 500     # Anything shorter is an error / block page, not a complot page
+
+
+def permit_id(year: int, sequence: int) -> str:
+    return f"{year}{sequence:0{SEQUENCE_DIGITS}d}"
+
+
+def sequence_of(permit_number: str, year: int) -> Optional[int]:
+    """Sequence part of an 8-digit permit number of `year`, else None."""
+    prefix = str(year)
+    if len(permit_number) != len(prefix) + SEQUENCE_DIGITS or not permit_number.startswith(prefix):
+        return None
+    tail = permit_number[len(prefix):]
+    return int(tail) if tail.isdigit() else None
+
+
+def classify_page(status_code: int, content: bytes) -> Optional[str]:
+    """FOUND / MISSING for a complot answer, None for a block or error page."""
+    if status_code != 200 or len(content) < MIN_PAGE_BYTES:
+        return None
+    if PERMIT_MARKER in content:
+        return FOUND
+    lowered = content.lower()
+    if any(keyword in lowered for keyword in BLOCK_KEYWORDS):
+        return None
+    return MISSING
+
+
+def probe(candidate: str) -> str:
+    """Probe one permit number; raises RetryLater on throttling, block pages and transient errors."""
+    url = API_URL_TEMPLATE.format(permit_id=candidate)
+    try:
+        response = fetch_client.get(url, headers=HEADERS, timeout=REQUEST_TIMEOUT, proxy_pool=PROXY_POOL,
+                                    stop_after_ids=("mahut",), verify=VERIFY_SSL)
+    except requests.exceptions.ProxyError:
+        PROXY_POOL.rotate()
+        raise RetryLater("proxy error")
+    except requests.exceptions.RequestException as e:
+        raise RetryLater(f"request failed: {e}")
+
+    if response.status_code == 429:
+        raise RetryLater("429")
+    result = classify_page(response.status_code, response.content)
+    if result is None:
+        fetch_client.report_throttle(url, "block page", proxy_pool=PROXY_POOL)
+        raise RetryLater(f"block page ({response.status_code})")
+    if result == FOUND and not response.truncated:
+        response_cache.put(url, response.content, response.headers.get('Content-Type'))
+    return result
+
+
+class IdSpace:
+    """Per-year scan state in permit_id_space.json."""
+
+    def __init__(self, path: str = STATE_FILE):
+        self.path = path
+        self.years: Dict[str, Dict] = {}
+        if os.path.exists(path):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    self.years = json.load(f)
+            except (OSError, ValueError) as e:
+                logger.warning(f"Could not read {path} ({e}), starting a new scan state")
+
+    def year(self, year: int) -> Dict:
+        return self.years.setdefault(str(year), {"high_water": 0, "gaps": [], "unresolved": []})
+
+    def save(self):
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.years, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.path)
+
+
+def probe_all(candidates: List[str], deadline) -> Dict[str, Optional[str]]:
+    """Probe `candidates` concurrently; None for IDs that failed every attempt or hit the deadline."""
+    results: Dict[str, Optional[str]] = {candidate: None for candidate in candidates}
+    lock = threading.Lock()
+
+    def worker(candidate):
+        outcome = probe(candidate)
+        with lock:
+            results[candidate] = outcome
+
+    def give_up(candidate, reason):
+        logger.warning(f"Probe {candidate} gave up: {reason}")
+
+    run_with_retries(worker, candidates, max_workers=MAX_WORKERS, max_attempts=MAX_FETCH_ATTEMPTS,
+                     on_give_up=give_up, task_timeout=PROBE_TIMEOUT, deadline=deadline)
+    return results
+
+
+def scan_year(year: int, state: Dict, known: Set[str], full: bool, recheck_gaps: bool, deadline) -> List[str]:
+    """Scan one year, updating its state in place; returns the newly found permit numbers."""
+    known_sequences = sorted(s for s in (sequence_of(p, year) for p in known) if s is not None)
+    first_run = state["high_water"] == 0 and not state["gaps"]
+    high_water = max([state["high_water"]] + known_sequences[-1:])
+
+    # Below the high-water mark: unresolved probes, and gaps / every unknown ID when asked
+    below = set(state["unresolved"])
+    if recheck_gaps:
+        below.update(state["gaps"])
+    if full or first_run:
+        known_set = set(known_sequences)
+        below.update(seq for seq in range(1, high_water + 1) if seq not in known_set)
+    below = sorted(seq for seq in below if permit_id(year, seq) not in known)
+
+    found: List[int] = []
+    missing: Set[int] = {seq for seq in state["gaps"] if permit_id(year, seq) not in known} - set(below)
+    unresolved: Set[int] = set()
+
+    def record(results: Dict[str, Optional[str]]):
+        for candidate, outcome in results.items():
+            seq = sequence_of(candidate, year)
+            if outcome == FOUND:
+                found.append(seq)
+            elif outcome == MISSING:
+                missing.add(seq)
+            else:
+                unresolved.add(seq)
+
+    if below:
+        print(f"[{year}] Probing {len(below)} IDs below the high-water mark {permit_id(year, high_water)}")
+        record(probe_all([permit_id(year, seq) for seq in below], deadline))
+
+    # Frontier: one window at a time, until a window brings nothing new
+    start = high_water + 1
+    while start <= MAX_SEQUENCE and not deadline.expired:
+        window = [seq for seq in range(start, min(start + FRONTIER_WINDOW, MAX_SEQUENCE + 1))
+                  if permit_id(year, seq) not in known]
+        print(f"[{year}] Probing frontier {permit_id(year, start)}..{permit_id(year, start + FRONTIER_WINDOW - 1)}")
+        before = len(found)
+        record(probe_all([permit_id(year, seq) for seq in window], deadline))
+        window_known = any(permit_id(year, seq) in known for seq in range(start, start + FRONTIER_WINDOW))
+        if len(found) == before and not window_known:
+            break
+        start += FRONTIER_WINDOW
+
+    high_water = max([high_water] + found)
+    # Only IDs under the high-water mark are gaps; missing IDs past it are simply not filed yet
+    state["high_water"] = high_water
+    state["gaps"] = sorted(seq for seq in missing if seq < high_water)
+    state["unresolved"] = sorted(seq for seq in unresolved if seq < high_water)
+    state["updated_at"] = datetime.now().isoformat()
+    return [permit_id(year, seq) for seq in sorted(found)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Probe the permit ID space for permits the search has not shown yet")
+    parser.add_argument("--years", type=int, nargs="+", default=[datetime.now().year - 1, datetime.now().year],
+                        help="Years to scan (default: last year and this year)")
+    parser.add_argument("--full", action="store_true", help="Also probe every unknown ID below the high-water mark")
+    parser.add_argument("--recheck-gaps", action="store_true", help="Probe the recorded gaps again")
+    args = parser.parse_args()
+
+    existing = load_existing_permits()
+    space = IdSpace()
+    deadline = deadlines.stage_deadline()
+    fetch_client.configure(pool_size=MAX_WORKERS)
+
+    new_permits: List[str] = []
+    for year in sorted(args.years, reverse=True):
+        if deadline.expired:
+            print("Stage deadline reached.")
+            break
+        found = scan_year(year, space.year(year), existing, args.full, args.recheck_gaps, deadline)
+        new_found = [p for p in found if p not in existing]
+        for permit_number in new_found:
+            print(f"Found NEW: {permit_number}")
+        new_permits.extend(new_found)
+        existing.update(new_found)
+        record_new_permits(new_found)
+        space.save()
+        state = space.year(year)
+        print(f"[{year}] high-water {permit_id(year, state['high_water'])}, "
+              f"{len(state['gaps'])} gaps, {len(state['unresolved'])} unresolved")
+
+    compact_permits()
+    print(f"\nDone! Found {len(new_permits)} new permits by ID scan.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+Run the daily pipelines for several municipalities.
+
+Every (site, pipeline) pair runs as its own subprocess with PLANSCOPE_SITE set,
+in the site's working directory (common/sites.py). Pairs run concurrently up to
+--max-parallel; they still share one request budget per host, because the token
+bucket in common/rate_limiter.py is shared between processes. A failing pair is
+reported and does not stop the others.
+
+Usage:
+    python run_sites.py                                   # every site, every pipeline
+    python run_sites.py --sites bat_yam,holon --pipelines permits,taba
+    python run_sites.py --max-parallel 4
+"""
+
+import argparse
+import concurrent.futures
+import logging
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import List, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+from common import sites
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s',
+)
+logger = logging.getLogger("SiteScheduler")
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Pipeline -> (directory, scripts run in order). permits and taba have their own
+# orchestrators (backup / rollback / stage deadlines); yeshivot runs its scripts directly.
+PIPELINES = {
+    "permits": ("permits", ["main_permit.py"]),
+    "taba": ("taba", ["main_taba.py"]),
+    "yeshivot": ("yeshivot", ["yeshivot_scraper.py", "downloader.py", "pdf_analyzer.py"]),
+}
+
+DEFAULT_MAX_PARALLEL = 2    # (site, pipeline) pairs running at the same time
+PIPELINE_TIMEOUT = 6 * 60   # Minutes before a pair is killed
+
+
+def run_site_pipeline(site: sites.Site, pipeline: str) -> bool:
+    """Run one pipeline for one site; True on success."""
+    directory, scripts = PIPELINES[pipeline]
+    pipeline_dir = os.path.join(BASE_DIR, directory)
+    work_dir = sites.work_dir(pipeline_dir, site)
+    env = {**os.environ, sites.SITE_ENV: site.key}
+    deadline = time.time() + PIPELINE_TIMEOUT * 60
+
+    for script in scripts:
+        logger.info(f"▶️ [{site.key}] {pipeline}: {script}")
+        try:
+            subprocess.run([sys.executable, os.path.join(pipeline_dir, script)], check=True,
+                           cwd=work_dir, env=env, timeout=max(1, deadline - time.time()))
+        except subprocess.CalledProcessError as e:
+            logger.error(f"❌ [{site.key}] {pipeline}: {script} failed (Exit Code: {e.returncode})")
+            return False
+        except subprocess.TimeoutExpired:
+            logger.error(f"❌ [{site.key}] {pipeline}: {script} timed out (pipeline limit {PIPELINE_TIMEOUT} minutes)")
+            return False
+    logger.info(f"✅ [{site.key}] {pipeline} finished")
+    return True
+
+
+def parse_list(value: str, known: List[str], what: str) -> List[str]:
+    if value == "all":
+        return list(known)
+    names = [name.strip() for name in value.split(",") if name.strip()]
+    unknown = [name for name in names if name not in known]
+    if unknown:
+        raise SystemExit(f"Unknown {what}: {', '.join(unknown)} (known: {', '.join(known)})")
+    return names
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the daily pipelines for several complot sites")
+    parser.add_argument("--sites", default="all", help="Comma-separated site keys (default: all)")
+    parser.add_argument("--pipelines", default="all", help="Comma-separated: permits,taba,yeshivot (default: all)")
+    parser.add_argument("--max-parallel", type=int, default=DEFAULT_MAX_PARALLEL,
+                        help="(site, pipeline) pairs running at the same time")
+    args = parser.parse_args()
+
+    site_keys = parse_list(args.sites, sorted(sites.SITES), "site")
+    pipelines = parse_list(args.pipelines, list(PIPELINES), "pipeline")
+    jobs: List[Tuple[sites.Site, str]] = [(sites.get(key), pipeline) for key in site_keys for pipeline in pipelines]
+
+    start_time = time.time()
+    logger.info(f"🚀 {len(jobs)} jobs ({len(site_keys)} sites x {len(pipelines)} pipelines), "
+                f"{args.max_parallel} in parallel")
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max(1, args.max_parallel)) as executor:
+        results = list(executor.map(lambda job: run_site_pipeline(*job), jobs))
+
+    failed = [f"{site.key}/{pipeline}" for (site, pipeline), ok in zip(jobs, results) if not ok]
+    logger.info(f"🏁 Finished in {time.time() - start_time:.0f}s: {len(jobs) - len(failed)}/{len(jobs)} succeeded")
+    if failed:
+        logger.error(f"Failed: {', '.join(failed)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,16 @@
 import json
 import os
 import re
+import sys
 from datetime import datetime
+from pathlib import Path
 from typing import List, Dict, Any, Tuple
 
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from common import sites
+
+SITE = sites.current()
+
 def load_json(filepath: str) -> List[Dict]:
     """טעינת קובץ JSON בצורה בטוחה"""
     try:
@@ -13,7 +20,7 @@ def load_json(filepath: str) -> List[Dict]:
         print(f"Error loading {filepath}: {e}")
         return []
 
-def get_latest_two_files(directory: str = ".", pattern: str = r"bat_yam_plans_data_(\d{4}_\d{2}_\d{2})\.json") -> Tuple[str, str]:
+def get_latest_two_files(directory: str = ".", pattern: str = re.escape(SITE.key) + r"_plans_data_(\d{4}_\d{2}_\d{2})\.json") -> Tuple[str, str]:
     """
     סורק את התיקייה ומוצא את שני הקבצים הכי עדכניים לפי התאריך בשם הקובץ.
     מחזיר (קובץ_חדש, קובץ_ישן)
@@ -39,6 +46,11 @@ def get_latest_two_files(directory: str = ".", pattern: str = r"bat_yam_plans_da
     
     return latest_file, previous_file
 
+def plan_status(plan: Dict) -> Any:
+    """General-info status, None when empty (files from before plain-text parsing stored 'nan')."""
+    status = plan.get('general_info', {}).get('status')
+    return None if status in (None, '', 'nan') else status
+
 def compare_plans(old_plans: List[Dict], new_plans: List[Dict]) -> Dict[str, Any]:
     """
     השוואה בין שתי רשימות של תוכניות ויצירת דו"ח שינויים.
@@ -83,8 +95,8 @@ def compare_plans(old_plans: List[Dict], new_plans: List[Dict]) -> Dict[str, Any
         }
 
         # השוואת סטטוס
-        new_status = new_plan.get('general_info', {}).get('status')
-        old_status = old_plan.get('general_info', {}).get('status')
+        new_status = plan_status(new_plan)
+        old_status = plan_status(old_plan)
         if new_status != old_status:
             plan_changes['updates'].append({
                 "field": "status",
@@ -144,7 +156,7 @@ def main():
     
     if not latest_file or not previous_file:
         print("❌ Could not find at least two files to compare.")
-        print("Make sure your files follow the name format: bat_yam_plans_data_YYYY_MM_DD.json")
+        print(f"Make sure your files follow the name format: {SITE.key}_plans_data_YYYY_MM_DD.json")
         return
 
     print(f"📅 Comparing NEW: {latest_file} VS OLD: {previous_file}")
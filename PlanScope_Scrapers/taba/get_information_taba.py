@@ -1,23 +1,27 @@
 import csv
 import json
-import requests
-from bs4 import BeautifulSoup
-import pandas as pd
+from bs4 import BeautifulSoup, Comment, NavigableString, Tag
 import time
 import re
 import urllib.parse
-from io import StringIO
 from typing import List, Dict, Any, Optional, Tuple
 from pathlib import Path
 import os
-import random
-import string
 import threading
 import concurrent.futures
 from dotenv import load_dotenv
+import sys
 import urllib3
 from datetime import datetime
 
+# Shared fetch layer lives in PlanScope_Scrapers/common
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from common import deadlines, fetch_client, html_parser, html_sections, response_cache, sites
+from common.async_fetch import AsyncFetchEngine
+from common.proxy_pool import ProxyPool
+from common.deadlines import DeadlineExceeded
+from common.retry_queue import RetryLater, run_with_retries
+
 # Suppress SSL warnings since verify=False is often needed for proxies
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
@@ -58,8 +62,24 @@ PROXY_PASS = os.getenv("PROXY_PASS")
 # SSL Verification setting
 VERIFY_SSL = False
 
+# Warm proxy sessions, scored per request and health-checked lazily in the background
+# (common/proxy_pool.py - PROXY_POOL_SIZE in .env)
+PROXY_POOL = ProxyPool(PROXY_HOST, PROXY_PORT, PROXY_USER, PROXY_PASS, enabled=USE_PROXY, verify=VERIFY_SSL)
+
 # WORKER CONFIGURATION
-MAX_WORKERS = 7
+# Upper bound for the adaptive (AIMD) concurrency, also sizes the pooled HTTP sessions
+MAX_WORKERS = int(os.getenv("MAX_WORKERS", "16"))
+
+# Fetch attempts per plan; blocked plans are rescheduled with backoff (common/retry_queue.py)
+MAX_FETCH_ATTEMPTS = 4
+
+# Deadlines (common/deadlines.py): a plan is abandoned after TASK_TIMEOUT seconds;
+# the stage deadline comes from the orchestrator or STAGE_DEADLINE_MINUTES in .env
+TASK_TIMEOUT = int(os.getenv("TASK_TIMEOUT", "120"))
+
+# Fetch engine: "threads" (requests in the worker pool) or "async" (httpx prefetch, see common/async_fetch.py)
+FETCH_ENGINE = os.getenv("FETCH_ENGINE", "threads")
+ASYNC_CONCURRENCY = int(os.getenv("ASYNC_CONCURRENCY", "100"))
 
 # ============================================================================
 # END OF CONFIGURATION
@@ -74,80 +94,6 @@ output_lock = threading.Lock()
 # HELPER FUNCTIONS
 # ============================================================================
 
-def get_proxy_dict(session_id=None):
-    """
-    Builds the proxy dictionary for requests.
-    """
-    if not USE_PROXY:
-        return None
-    
-    current_user = PROXY_USER
-    
-    # בדיקה שהמשתמש הזין פרטים
-    if not current_user or not PROXY_PASS:
-        print("⚠️  Error: Proxy is enabled but PROXY_USER or PROXY_PASS are missing from .env!")
-        return None
-    
-    # Bright Data Logic: Force Israel targeting and Session rotation
-    if 'brd-customer' in current_user:
-        # Force Israel targeting if not already in username
-        if '-country-' not in current_user:
-             current_user = f"{current_user}-country-il"
-        
-        # IP Rotation Logic
-        if session_id:
-            current_user = f"{current_user}-session-{session_id}"
-
-    # Construct the URL with authentication
-    proxy_url = f"http://{current_user}:{PROXY_PASS}@{PROXY_HOST}:{PROXY_PORT}"
-    
-    return {
-        "http": proxy_url,
-        "https": proxy_url,
-    }
-
-def test_proxy_connection():
-    """Test if proxy is working."""
-    if not USE_PROXY:
-        return True
-    
-    # Use a random session for the test to ensure we get a fresh IP
-    rand_session = ''.join(random.choices(string.ascii_lowercase + string.digits, k=8))
-    proxies = get_proxy_dict(session_id=rand_session)
-    
-    if not proxies:
-        return False
-
-    print(f"   Testing connection to {PROXY_HOST}...")
-    
-    try:
-        # Test with a simple request to check IP
-        test_response = requests.get(
-            "https://httpbin.org/ip",
-            proxies=proxies,
-            timeout=20,
-            verify=VERIFY_SSL
-        )
-        if test_response.status_code == 200:
-            ip_info = test_response.json()
-            origin_ip = ip_info.get('origin')
-            print(f"   ✅ Proxy Connected! External IP: {origin_ip}")
-            return True
-        else:
-            print(f"   ⚠️  Proxy test returned status {test_response.status_code}")
-            return False
-
-    except requests.exceptions.ProxyError as e:
-        print(f"   ❌ Proxy Error: Failed to connect. Check Host/Port/User/Pass.")
-        print(f"      Details: {e}")
-        return False
-    except requests.exceptions.SSLError as e:
-        print(f"   ❌ SSL Error. Try setting VERIFY_SSL = False.")
-        return False
-    except Exception as e:
-        print(f"   ❌ Connection failed: {e}")
-        return False
-
 def clean_text(text):
     if isinstance(text, str):
         return text.strip().replace('\xa0', ' ')
@@ -166,94 +112,188 @@ def extract_mavat_link(onclick_text):
         
     return None
 
+# ----------------------------------------------------------------------------
+# Table extraction: cell texts as shown on the page (empty cells are "")
+# ----------------------------------------------------------------------------
+
+_WHITESPACE_RE = re.compile(r"[\r\n]+|\s{2,}")
+_HIDDEN_STYLE_RE = re.compile(r"display:\s*none")
+
+def _is_hidden(el):
+    return el.name == 'style' or bool(_HIDDEN_STYLE_RE.search(el.get('style') or ''))
+
+def _visible_text(el):
+    """Text of `el` without <style> and display:none elements; <br> becomes a line break."""
+    parts = []
+    for child in el.children:
+        if isinstance(child, Tag):
+            if child.name == 'br':
+                parts.append('\n')
+            elif not _is_hidden(child):
+                parts.append(_visible_text(child))
+        elif isinstance(child, NavigableString) and not isinstance(child, Comment):
+            parts.append(str(child))
+    return ''.join(parts)
+
+def _visible(el, table):
+    """False when `el` or one of its ancestors inside `table` is hidden."""
+    while el is not None and el is not table:
+        if _is_hidden(el):
+            return False
+        el = el.parent
+    return True
+
+def _row_cells(tr):
+    return [td for td in tr.find_all(('td', 'th'), recursive=False) if not _is_hidden(td)]
+
+def _expand_rows(rows, remainder, flush):
+    """Text rows with colspan / rowspan cells repeated (and rowspans carried to the next section)."""
+    all_texts = []
+    for tr in rows:
+        texts, next_remainder, index = [], [], 0
+        for td in _row_cells(tr):
+            while remainder and remainder[0][0] <= index:
+                prev_i, prev_text, prev_rowspan = remainder.pop(0)
+                texts.append(prev_text)
+                if prev_rowspan > 1:
+                    next_remainder.append((prev_i, prev_text, prev_rowspan - 1))
+                index += 1
+            text = _WHITESPACE_RE.sub(" ", _visible_text(td).strip())
+            rowspan = int(td.get('rowspan') or 1)
+            for _ in range(int(td.get('colspan') or 1)):
+                texts.append(text)
+                if rowspan > 1:
+                    next_remainder.append((index, text, rowspan - 1))
+                index += 1
+        for prev_i, prev_text, prev_rowspan in remainder:
+            texts.append(prev_text)
+            if prev_rowspan > 1:
+                next_remainder.append((prev_i, prev_text, prev_rowspan - 1))
+        all_texts.append(texts)
+        remainder = next_remainder
+    while flush and remainder:
+        all_texts.append([text for _, text, _ in remainder])
+        remainder = [(i, text, span - 1) for i, text, span in remainder if span > 1]
+    return all_texts, remainder
+
+def read_table(table):
+    """
+    (all_texts, data_rows) of a <table>: every cell text (header included), and
+    the data rows padded to the table width. Cell texts are the page's text with
+    whitespace collapsed, no number or NA conversion.
+    Raises ValueError on a malformed colspan / rowspan.
+    """
+    rows = lambda selected: [tr for tr in selected if _visible(tr, table)]
+    head_rows = rows(table.select('thead tr'))
+    body_rows = rows(table.select('tbody tr') + table.find_all('tr', recursive=False))
+    foot_rows = rows(table.select('tfoot tr'))
+
+    # Without <thead>, leading rows of <th> cells only are the header
+    if not head_rows:
+        while body_rows and all(td.name == 'th' for td in _row_cells(body_rows[0])):
+            head_rows.append(body_rows.pop(0))
+
+    head, remainder = _expand_rows(head_rows, [], flush=False)
+    body, remainder = _expand_rows(body_rows, remainder, flush=not foot_rows)
+    foot, _ = _expand_rows(foot_rows, remainder, flush=True)
+
+    all_texts = head + body + foot
+    width = max((len(row) for row in all_texts), default=0)
+    data_rows = [row + [''] * (width - len(row)) for row in body + foot]
+    return all_texts, data_rows
+
+def page_tables(soup):
+    """The visible, non-empty <table> elements, in document order."""
+    return [table for table in soup.find_all('table')
+            if not _HIDDEN_STYLE_RE.search(table.get('style') or '') and table.find(string=True) is not None]
+
+SITE = sites.current()
+PLAN_URL_TEMPLATE = f"https://handasi.complot.co.il/magicscripts/mgrqispi.dll?appname=cixpa&prgname=GetTabaFile&siteid={SITE.site_id}&n={{serial_id}}&arguments=siteid,n"
+
+# SENIOR TIP: Optimized headers
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/119.0.0.0 Safari/537.36',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,*/*;q=0.8',
+    'Accept-Language': 'he-IL,he;q=0.9,en-US;q=0.8,en;q=0.7',
+    'Accept-Encoding': 'gzip, deflate, br', 
+    'Connection': 'keep-alive',
+    'Upgrade-Insecure-Requests': '1',
+    'Cache-Control': 'max-age=0'
+}
+
+def is_blocked_page(status_code, content):
+    """CAPTCHA / block-page heuristics on a raw (status, body) pair (threaded and async paths)."""
+    if status_code in [403, 429]:
+        return True
+    if len(content) < 500:
+        return True
+    content_lower = content.lower()
+    return any(keyword in content_lower for keyword in [b'captcha', b'robot', b'verification', b'recaptcha', b'challenge'])
+
 def detect_captcha(response):
     """Detect if the response contains a CAPTCHA challenge."""
     if not response:
         return False
-    
-    if response.status_code in [403, 429]:
-        return True
-    
-    if len(response.content) < 500:
-        return True
-    
-    content_lower = response.text.lower()
-    captcha_keywords = ['captcha', 'robot', 'verification', 'recaptcha', 'challenge']
-    
-    for keyword in captcha_keywords:
-        if keyword in content_lower:
-            return True
-    
-    return False
+    return is_blocked_page(response.status_code, response.content)
 
-def scrape_plan(serial_id, taba_number, max_retries=3, max_captcha_retries=3):
-    url = f"https://handasi.complot.co.il/magicscripts/mgrqispi.dll?appname=cixpa&prgname=GetTabaFile&siteid=81&n={serial_id}&arguments=siteid,n"
-    
-    # Generate a random session ID for proxy rotation
-    session_id = ''.join(random.choices(string.ascii_lowercase + string.digits, k=8))
-    proxies = get_proxy_dict(session_id=session_id)
-    
-    # SENIOR TIP: Optimized headers
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/119.0.0.0 Safari/537.36',
-        'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,*/*;q=0.8',
-        'Accept-Language': 'he-IL,he;q=0.9,en-US;q=0.8,en;q=0.7',
-        'Accept-Encoding': 'gzip, deflate, br', 
-        'Connection': 'keep-alive',
-        'Upgrade-Insecure-Requests': '1',
-        'Cache-Control': 'max-age=0'
-    }
+def scrape_plan(serial_id, taba_number, page=None):
+    """
+    Fetch and parse a single plan page.
+    `page` is the raw body already fetched by the async engine; it is used instead
+    of a request when it is not a block page.
+    Makes a single request: 502 / CAPTCHA / connection errors raise RetryLater so
+    the scheduler retries the plan later instead of the worker sleeping.
+    """
+    url = PLAN_URL_TEMPLATE.format(serial_id=serial_id)
+
+    if page is not None and not is_blocked_page(200, page):
+        response_cache.put(url, page)
+        return parse_plan_page(page, taba_number)
+
+    cached = response_cache.get(url)
+    if cached:
+        return parse_plan_page(cached.content, taba_number)
     
-    response = None
-    captcha_retry_count = 0
+    headers = HEADERS
     
     # print(f"  📡 Requesting ID {serial_id}...")
     
-    for attempt in range(1, max_retries + 1):
-        try:
-            response = requests.get(
-                url, 
-                headers=headers,
-                timeout=20,
-                proxies=proxies,
-                verify=VERIFY_SSL
-            )
-            
-            # Handle 502 Bad Gateway (common with proxies)
-            if response.status_code == 502:
-                # print(f"     ⚠️  502 Proxy Gateway Error - Retrying...")
-                time.sleep(2)
-                continue
-            
-            response.raise_for_status()
-            
-            # Check for CAPTCHA
-            if detect_captcha(response):
-                captcha_retry_count += 1
-                if captcha_retry_count <= max_captcha_retries:
-                    wait_time = random.randint(30, 40)
-                    print(f"     ⚠️  CAPTCHA detected for {taba_number}! Waiting {wait_time}s...")
-                    time.sleep(wait_time)
-                    continue
-                else:
-                    print(f"     ❌ CAPTCHA block persistent for {taba_number}. Skipping.")
-                    return None
-            
-            # Success
-            break
-            
-        except Exception as e:
-            # print(f"     ❌ Error for {taba_number} (Attempt {attempt}): {str(e)[:100]}")
-            if attempt < max_retries:
-                time.sleep(3)
-            else:
-                return None
-
-    if not response:
+    try:
+        response = fetch_client.get(
+            url, 
+            headers=headers,
+            timeout=20,
+            proxy_pool=PROXY_POOL,
+            verify=VERIFY_SSL
+        )
+    except (RetryLater, DeadlineExceeded):
+        # Circuit breaker open / task out of time: the scheduler handles it
+        raise
+    except Exception as e:
+        # print(f"     ❌ Error for {taba_number}: {str(e)[:100]}")
+        PROXY_POOL.rotate()
+        raise RetryLater(f"request failed: {str(e)[:100]}")
+    
+    # Handle 502 Bad Gateway (common with proxies) and other server errors
+    if response.status_code >= 500:
+        raise RetryLater(str(response.status_code))
+    
+    # Check for CAPTCHA
+    if detect_captcha(response):
+        # Shrinks the host's AIMD concurrency and pauses every worker, not just this one
+        fetch_client.report_throttle(url, "CAPTCHA", proxy_pool=PROXY_POOL)
+        print(f"     ⚠️  CAPTCHA detected for {taba_number}! Rescheduling...")
+        raise RetryLater("CAPTCHA")
+
+    if not response.ok:
         return None
     
-    # Parsing logic starts here
-    soup = BeautifulSoup(response.content, 'html.parser')
+    response_cache.put(url, response.content, response.headers.get('Content-Type'))
+    return parse_plan_page(response.content, taba_number)
+
+def parse_plan_page(content, taba_number):
+    """Build the plan record from a raw GetTabaFile page (head / scripts are not built into the tree)."""
+    soup = html_parser.make_soup(content, parse_only=html_sections.without_boilerplate())
     
     plan_data = {
         "plan_number": taba_number,
@@ -279,7 +319,6 @@ def scrape_plan(serial_id, taba_number, max_retries=3, max_captcha_retries=3):
 
     # --- 2. חילוץ מידע כללי ---
     try:
-        dfs = pd.read_html(StringIO(str(soup)))
         field_mapping = {
             "סטטוס תוכנית": "status",
             "תאריך הסטטוס": "status_date",
@@ -289,14 +328,13 @@ def scrape_plan(serial_id, taba_number, max_retries=3, max_captcha_retries=3):
             "יזם": "developer",
             'קישור למבא"ת': "mavat_link"
         }
-        for df in dfs:
-            table_str = df.to_string()
-            if "סטטוס תוכנית" in table_str or "תאריך הסטטוס" in table_str:
-                df = df.dropna(how='all')
-                for index, row in df.iterrows():
-                    if len(row) < 2: continue
-                    key = clean_text(str(row.iloc[0]))
-                    value = clean_text(str(row.iloc[1]))
+        for table in page_tables(soup):
+            all_texts, data_rows = read_table(table)
+            if any("סטטוס תוכנית" in text or "תאריך הסטטוס" in text for row in all_texts for text in row):
+                for row in data_rows:
+                    if len(row) < 2 or not any(row): continue
+                    key = clean_text(row[0])
+                    value = clean_text(row[1])
                     for hebrew_key, english_key in field_mapping.items():
                         if hebrew_key in key:
                             plan_data["general_info"][english_key] = value
@@ -317,18 +355,15 @@ def scrape_plan(serial_id, taba_number, max_retries=3, max_captcha_retries=3):
     history_div = soup.find(id="table-shlavim")
     if history_div:
         try:
-            hist_dfs = pd.read_html(StringIO(str(history_div)))
-            if hist_dfs:
-                hist_df = hist_dfs[0]
-                if len(hist_df.columns) >= 2:
-                    hist_df = hist_df.iloc[:, [0, 1]] 
-                    hist_df.columns = ["date", "stage"]
-                    records = hist_df.to_dict('records')
-                    for rec in records:
-                        d = clean_text(str(rec['date']))
-                        s = clean_text(str(rec['stage']))
-                        if d and s and "תאריך" not in d: 
-                             plan_data["history"].append([d, s])
+            hist_tables = page_tables(history_div)
+            if hist_tables:
+                _, data_rows = read_table(hist_tables[0])
+                for row in data_rows:
+                    if len(row) < 2: break
+                    d = clean_text(row[0])
+                    s = clean_text(row[1])
+                    if d and s and "תאריך" not in d: 
+                         plan_data["history"].append([d, s])
         except ValueError:
             pass
 
@@ -345,6 +380,7 @@ def scrape_plan(serial_id, taba_number, max_retries=3, max_captcha_retries=3):
     # meet_count = len(plan_data['meeting_history'])
     # print(f"     ✓ Extracted: Info({info_count}), History({hist_count}), Meetings({meet_count})")
     
+    html_sections.release(soup)
     return plan_data
 
 def _get_text(el) -> Optional[str]:
@@ -398,7 +434,7 @@ def _parse_plan_meetings(soup: BeautifulSoup) -> List[Dict[str, Any]]:
                     match = re.search(r"getMeeting\s*\(\s*(\d+)\s*,\s*(\d+)\s*\)", href_val)
                     if match:
                         arg1, arg2 = match.groups()
-                        m_link = f"https://batyam.complot.co.il/binyan/#meeting/{arg1}/{arg2}"
+                        m_link = f"{SITE.portal}/binyan/#meeting/{arg1}/{arg2}"
                     else:
                         m_link = href_val
             
@@ -517,7 +553,28 @@ def convert_jsonl_to_json(input_jsonl: str, output_json: str, existing_data: lis
     except Exception as e:
         print(f"Error saving final JSON: {e}")
 
-def process_plan(row, output_jsonl):
+def prefetch_plan_pages(rows):
+    """
+    Fetch all plan pages up front with the async engine (FETCH_ENGINE=async).
+    Plans that fail here are fetched again by the regular worker path.
+    """
+    engine = AsyncFetchEngine(
+        headers=HEADERS,
+        proxy_pool=PROXY_POOL,
+        is_blocked=is_blocked_page,
+        concurrency=ASYNC_CONCURRENCY,
+        timeout=20,
+        verify=VERIFY_SSL,
+    )
+    urls = {str(row['Taba_Number']): PLAN_URL_TEMPLATE.format(serial_id=row['Serial_ID']) for row in rows}
+    # Pages still fresh in the response cache are served from there by scrape_plan
+    urls = {taba: url for taba, url in urls.items() if not response_cache.get(url)}
+    print(f"Prefetching {len(urls)} plan pages (async, {ASYNC_CONCURRENCY} in flight)...")
+    pages = engine.fetch_pages(urls)
+    print(f"Prefetched {sum(1 for body in pages.values() if body)}/{len(urls)} pages")
+    return pages
+
+def process_plan(row, output_jsonl, page=None):
     """
     Worker function to process a single plan.
     """
@@ -525,7 +582,8 @@ def process_plan(row, output_jsonl):
     serial_id = row['Serial_ID']
     
     # print(f"Scraping {taba_number}...")
-    data = scrape_plan(serial_id, taba_number)
+    # RetryLater propagates to the scheduler, which retries the plan after a backoff
+    data = scrape_plan(serial_id, taba_number, page=page)
     
     if data:
         # Add success status if not present
@@ -535,22 +593,25 @@ def process_plan(row, output_jsonl):
         print(f"✅ Saved {taba_number}")
         return True
     else:
-        print(f"❌ Failed to scrape {taba_number}. Saving failure record.")
-        failed_record = {
-            "plan_number": taba_number,
-            "status": "failed",
-            "last_attempt": datetime.now().isoformat()
-        }
-        save_plan_incremental_jsonl(failed_record, output_jsonl)
+        save_plan_failure(taba_number, output_jsonl)
         return False
 
+def save_plan_failure(taba_number, output_jsonl):
+    print(f"❌ Failed to scrape {taba_number}. Saving failure record.")
+    failed_record = {
+        "plan_number": taba_number,
+        "status": "failed",
+        "last_attempt": datetime.now().isoformat()
+    }
+    save_plan_incremental_jsonl(failed_record, output_jsonl)
+
 def main():
-    input_csv = 'bat_yam_taba_list.csv'
+    input_csv = f'{SITE.key}_taba_list.csv'
     
     # <--- שינוי 2: שם קובץ דינמי לפי התאריך של היום
     today_str = datetime.now().strftime('%Y_%m_%d')
-    output_json = f'bat_yam_plans_data_{today_str}.json'
-    output_jsonl = f'bat_yam_plans_data_{today_str}.jsonl'
+    output_json = f'{SITE.key}_plans_data_{today_str}.json'
+    output_jsonl = f'{SITE.key}_plans_data_{today_str}.jsonl'
     
     print("=" * 60)
     print("🚀 Starting Bat Yam TABA Scraper (Parallel Version)")
@@ -559,16 +620,13 @@ def main():
     print("=" * 60)
     print(f"Proxy Configured: {USE_PROXY}")
     
-    if USE_PROXY:
-        if not test_proxy_connection():
-            print("\n❌ Proxy Connection FAILED.")
-            print("   Please check your .env file credentials.")
-            print("   Continuing without proxy might result in blocking...\n")
-            # uncomment next line to stop on error
-            # return 
+    # Proxy sessions are health-checked lazily in the background, no startup probe
+    if PROXY_POOL.enabled:
+        print(f"OK: Proxy pool ready ({PROXY_POOL.size} sessions via {PROXY_HOST})")
     
     try:
-        df = pd.read_csv(input_csv)
+        with open(input_csv, 'r', encoding='utf-8-sig', newline='') as f:
+            rows = list(csv.DictReader(f))
     except FileNotFoundError:
         print(f"Error: CSV file '{input_csv}' not found.")
         return
@@ -590,9 +648,9 @@ def main():
             print(f"Found additional plans in JSONL. Total unique processed: {len(scraped_plans)}")
         except: pass
 
-    df_to_scrape = df[~df['Taba_Number'].astype(str).isin(scraped_plans)].copy()
+    rows_to_process = [row for row in rows if str(row['Taba_Number']) not in scraped_plans]
     
-    remaining = len(df_to_scrape)
+    remaining = len(rows_to_process)
     if remaining == 0:
         print("✅ All plans already scraped.")
         # Ensure JSON is up to date with JSONL content if any
@@ -601,22 +659,33 @@ def main():
     
     print(f"Plans to scrape: {remaining}")
     
-    # Convert DataFrame rows to list of dicts for safe iteration
-    rows_to_process = [row for _, row in df_to_scrape.iterrows()]
-    
     start_time = time.time()
+    fetch_client.configure(pool_size=MAX_WORKERS)
     
     try:
+        pages = prefetch_plan_pages(rows_to_process) if FETCH_ENGINE == "async" else {}
+        
         # Parallel Execution
-        with concurrent.futures.ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
-            futures = [
-                executor.submit(process_plan, row, output_jsonl)
-                for row in rows_to_process
-            ]
-            concurrent.futures.wait(futures)
+        # Blocked plans are rescheduled with backoff instead of sleeping in a worker
+        report = run_with_retries(
+            lambda row: process_plan(row, output_jsonl, pages.pop(str(row['Taba_Number']), None)),
+            rows_to_process,
+            max_workers=MAX_WORKERS,
+            max_attempts=MAX_FETCH_ATTEMPTS,
+            on_give_up=lambda row, reason: save_plan_failure(row['Taba_Number'], output_jsonl),
+            task_timeout=TASK_TIMEOUT,
+            deadline=deadlines.stage_deadline(),
+        )
+        if report.stragglers:
+            # No record is written for them, so the next run retries them
+            stragglers = [str(row['Taba_Number']) for row in report.stragglers]
+            print(f"⏱️  {len(stragglers)} plans unfinished at the deadline: {', '.join(stragglers[:20])}")
             
         duration = time.time() - start_time
         print(f"\nProcessing completed in {duration:.2f} seconds.")
+        if fetch_client.HEDGING:
+            stats = fetch_client.hedge_stats()
+            print(f"Hedged requests: {stats['hedges']}/{stats['requests']}")
         
     except KeyboardInterrupt:
         print("\n🛑 Interrupted by user. Saving progress...")
@@ -635,5 +704,65 @@ def main():
         
         print("\n✅ Done!")
 
+def _reparse_cached_plan(row):
+    """Parse one plan from its cached page (runs in a worker process). Returns None if not cached."""
+    cached = response_cache.get(PLAN_URL_TEMPLATE.format(serial_id=row['Serial_ID']), ttl=None)
+    if not cached:
+        return None
+    data = parse_plan_page(cached.content, row['Taba_Number'])
+    if 'status' not in data:
+        data['status'] = 'success'
+    return data
+
+def reparse_from_cache():
+    """
+    Rebuild today's <site>_plans_data_*.json from cached GetTabaFile pages after a parser change.
+    Offline: no proxy. Plans without a cached page keep their record from the latest data file.
+    """
+    input_csv = f'{SITE.key}_taba_list.csv'
+    today_str = datetime.now().strftime('%Y_%m_%d')
+    output_json = f'{SITE.key}_plans_data_{today_str}.json'
+
+    print("=" * 60)
+    print("🔁 Re-parsing plans from the response cache (offline)")
+    print("=" * 60)
+
+    try:
+        with open(input_csv, 'r', encoding='utf-8-sig', newline='') as f:
+            rows = list(csv.DictReader(f))
+    except FileNotFoundError:
+        print(f"Error: CSV file '{input_csv}' not found.")
+        return
+
+    # Baseline: the most recent data file, for plans that are not in the cache
+    existing_files = sorted(f for f in os.listdir('.') if re.match(re.escape(SITE.key) + r'_plans_data_\d{4}_\d{2}_\d{2}\.json$', f))
+    existing_data = []
+    if existing_files:
+        _, existing_data = load_existing_plans(existing_files[-1])
+
+    start_time = time.time()
+    with concurrent.futures.ProcessPoolExecutor() as executor:
+        reparsed = [plan for plan in executor.map(_reparse_cached_plan, rows, chunksize=16) if plan]
+
+    # convert_jsonl_to_json keeps the last record per plan_number, so re-parsed plans win
+    tmp_jsonl = f'{SITE.key}_plans_data_{today_str}.reparse.jsonl'
+    for plan in reparsed:
+        save_plan_incremental_jsonl(plan, tmp_jsonl)
+    convert_jsonl_to_json(tmp_jsonl, output_json, existing_data)
+    if os.path.exists(tmp_jsonl):
+        os.remove(tmp_jsonl)
+
+    print(f"✅ Re-parsed {len(reparsed)}/{len(rows)} plans from cache in {time.time() - start_time:.2f} seconds.")
+
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Bat Yam TABA plan scraper")
+    parser.add_argument("--reparse-from-cache", action="store_true",
+                        help="Rebuild today's plans JSON from cached pages without touching the network")
+    args = parser.parse_args()
+
+    if args.reparse_from_cache:
+        reparse_from_cache()
+    else:
+        main()
\ No newline at end of file
@@ -1,46 +1,104 @@
 import csv
+import os
 import re
-import time
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.chrome.options import Options
+import sys
+from pathlib import Path
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import Select, WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 
-# Try to import ChromeDriverManager, fallback if it fails
-try:
-    from webdriver_manager.chrome import ChromeDriverManager
-    USE_WEBDRIVER_MANAGER = True
-except Exception as e:
-    print(f"Warning: Could not initialize ChromeDriverManager due to environment encoding issues: {e}")
-    print("Trying to proceed with default system chrome driver...")
-    USE_WEBDRIVER_MANAGER = False
+# Shared fetch layer lives in PlanScope_Scrapers/common
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from common import browser_pool, complot_search, deadlines, selenium_helpers, sites
 
-def scrape_bat_yam_taba():
-    # הגדרות Selenium Headless
-    chrome_options = Options()
-    chrome_options.add_argument("--headless")  # Headless mode enabled
-    chrome_options.add_argument("--no-sandbox")
-    chrome_options.add_argument("--disable-dev-shm-usage")
-    chrome_options.add_argument("--disable-gpu")
-    chrome_options.add_argument("--remote-debugging-port=9222") # Fix for some chromedriver crashes
-    chrome_options.add_argument("--window-size=1920,1080")
-
-    # אתחול הדרייבר
+SITE = sites.current()
+
+# "http": call the GetTabaByNumber endpoint directly (no browser, falls back to Selenium on failure)
+# "selenium": page through the search UI in headless Chrome
+DISCOVERY_MODE = os.getenv("TABA_DISCOVERY_MODE", "http")
+
+# Plan number prefix searched (502 = Bat Yam)
+TABA_PREFIX = SITE.taba_prefix
+
+TABA_LIST_CSV = f'{SITE.key}_taba_list.csv'
+
+def parse_serial_id(href):
+    """Serial ID from a link such as javascript:getTaba(2037)."""
+    match = re.search(r'\((\d+)\)', href or "")
+    return match.group(1) if match else "N/A"
+
+def serial_key(row):
+    """Sort key: higher Serial_ID = newer plan."""
+    return int(row['Serial_ID']) if row['Serial_ID'].isdigit() else -1
+
+def load_existing_list():
+    """Rows of the existing <site>_taba_list.csv (empty if there is none)."""
+    if not os.path.exists(TABA_LIST_CSV):
+        return []
     try:
-        if USE_WEBDRIVER_MANAGER:
-            driver = webdriver.Chrome(service=Service(ChromeDriverManager().install()), options=chrome_options)
+        with open(TABA_LIST_CSV, 'r', newline='', encoding='utf-8-sig') as f:
+            return [{'Taba_Number': row['Taba_Number'], 'Serial_ID': row['Serial_ID']} for row in csv.DictReader(f)]
+    except Exception as e:
+        print(f"Warning: Could not read existing list {TABA_LIST_CSV}: {e}")
+        return []
+
+def merge_taba_list(results_data, existing):
+    """
+    Incremental merge: walk the scraped plans newest-first (by Serial_ID), stop after
+    STOP_AFTER_KNOWN consecutive known ones, and put the new plans ahead of the existing list.
+    """
+    known = {row['Serial_ID'] for row in existing}
+    newest_first = sorted(results_data, key=serial_key, reverse=True)
+    fresh, stopped = complot_search.new_items(newest_first, known, key=lambda row: row['Serial_ID'])
+    print(f"{len(fresh)} תוכניות חדשות" + (" (נעצר אחרי תוכניות מוכרות)" if stopped else ""))
+    return fresh + existing
+
+def fetch_taba_list_http():
+    """Serial_ID/Taba_Number rows from the GetTabaByNumber endpoint (the full list in one search)."""
+    soup = complot_search.search("GetTabaByNumber", {"siteid": SITE.site_id, "n": TABA_PREFIX, "l": "true"})
+    results_data = []
+    for cells in complot_search.result_rows(soup):
+        if len(cells) < 2:
+            continue
+        serial_link = cells[0].find("a")
+        taba_link = cells[1].find("a")
+        if serial_link is None or taba_link is None:
+            continue
+        results_data.append({
+            'Taba_Number': taba_link.get_text(strip=True),
+            'Serial_ID': parse_serial_id(serial_link.get('href'))
+        })
+    return results_data
+
+def scrape_bat_yam_taba():
+    existing = load_existing_list()
+    print(f"Loaded {len(existing)} known plans from {TABA_LIST_CSV}")
+
+    if DISCOVERY_MODE == "http":
+        try:
+            results_data = fetch_taba_list_http()
+        except Exception as e:
+            print(f"HTTP discovery failed: {e}")
+            print("Falling back to Selenium discovery...")
         else:
-            # Fallback to system Chrome driver
-            driver = webdriver.Chrome(options=chrome_options)
+            if results_data:
+                save_to_csv(merge_taba_list(results_data, existing))
+                return
+            # Never overwrite the list with an empty one
+            print("HTTP discovery returned no plans, falling back to Selenium discovery...")
+    scrape_bat_yam_taba_selenium(existing)
+
+def scrape_bat_yam_taba_selenium(existing):
+    # דפדפן Headless חם מהמאגר המשותף (common/browser_pool.py)
+    try:
+        driver = browser_pool.acquire()
     except Exception as e:
         print(f"Error initializing Chrome driver: {e}")
         print("Make sure Chrome is installed and chromedriver is in your PATH")
         return
     
     # תיקון כתובת האתר - הוספת הדומיין המלא
-    base_url = "https://batyam.complot.co.il/binyan/#search/GetTabaByNumber&siteid=81&n=502&l=true&arguments=siteid,n,l"
+    base_url = f"{SITE.portal}/binyan/#search/GetTabaByNumber&siteid={SITE.site_id}&n={TABA_PREFIX}&l=true&arguments=siteid,n,l"
     
     results_data = []
 
@@ -58,9 +116,10 @@ def scrape_bat_yam_taba():
         try:
             select_element = wait.until(EC.presence_of_element_located((By.XPATH, '//*[@id="results-table_length"]/label/select')))
             select = Select(select_element)
+            marker = selenium_helpers.table_marker(driver)
             select.select_by_value("100")
-            # המתנה קלה לטעינה מחדש של הטבלה
-            time.sleep(3)
+            # המתנה לציור מחדש של הטבלה
+            selenium_helpers.wait_for_redraw(driver, marker)
         except Exception as e:
              print(f"לא נמצאה אפשרות לשינוי מספר השורות (אולי הטבלה כבר טעונה או ריקה?): {e}")
 
@@ -68,14 +127,24 @@ def scrape_bat_yam_taba():
         try:
             print("לוחץ על כפתור לחיפוש ללא הגבלה...")
             unlimited_link = wait.until(EC.element_to_be_clickable((By.XPATH, "//a[contains(@href, 'getUnlimitedSearch')]")))
+            marker = selenium_helpers.table_marker(driver)
             driver.execute_script("arguments[0].click();", unlimited_link)
             print("   נלחץ בהצלחה. ממתין לטעינה...")
-            time.sleep(5) # המתנה לטעינה מחדש של הטבלה
+            selenium_helpers.wait_for_redraw(driver, marker) # המתנה לטעינה מחדש של הטבלה
         except Exception as e:
             print(f"⚠️ הערה: לא נמצא או לא ניתן ללחוץ על קישור החיפוש ללא הגבלה: {e}")
 
+        # מהחדש לישן, כדי לעצור כשמגיעים לתוכניות מוכרות (בלי DataTables הסדר לא ידוע, נסרקים כל העמודים)
+        newest_first = selenium_helpers.sort_table(driver, column=1, direction="desc")
+        known = {row['Serial_ID'] for row in existing}
+
         page_num = 1
         while True:
+            # עצירה לפני ההריגה של ה-orchestrator; התוכניות שנאספו עד כה נשמרות למטה
+            if deadlines.current().expired:
+                print(f"הגענו לדדליין של השלב לפני עמוד {page_num}, שומר את מה שנאסף עד כה.")
+                break
+
             print(f"סורק עמוד מספר {page_num}...")
             
             # המתנה שהטבלה תהיה נוכחת
@@ -85,33 +154,28 @@ def scrape_bat_yam_taba():
                 print("הטבלה לא נמצאה. ייתכן והאתר לא נטען כראוי או שאין תוצאות.")
                 break
             
-            # שליפת כל השורות בגוף הטבלה
-            rows = driver.find_elements(By.XPATH, '//*[@id="results-table"]/tbody/tr')
+            # שליפת כל השורות בקריאת סקריפט אחת (כל העמודים, אם DataTables זמין)
+            snapshot = selenium_helpers.extract_table(driver)
             
-            if not rows:
+            if not snapshot.rows:
                 print("לא נמצאו שורות בטבלה.")
                 break
 
-            for index, row in enumerate(rows, start=1):
-                try:
-                    # חילוץ המספר הסידורי מה-href (עמודה 1)
-                    link_element = row.find_element(By.XPATH, './td[1]/a')
-                    href_content = link_element.get_attribute('href') # דוגמה: javascript:getTaba(2037)
-                    
-                    # שימוש ב-Regex לחילוץ המספר בתוך הסוגריים
-                    match = re.search(r'\((\d+)\)', href_content)
-                    serial_number = match.group(1) if match else "N/A"
-                    
-                    # חילוץ מספר התב"ע (עמודה 2)
-                    taba_number = row.find_element(By.XPATH, './td[2]/a').text.strip()
-                    
-                    results_data.append({
-                        'Taba_Number': taba_number,
-                        'Serial_ID': serial_number
-                    })
-                except Exception as e:
-                    # התעלמות משגיאות נקודתיות כדי לא לעצור את הריצה
-                    pass
+            for cells in snapshot.rows:
+                if len(cells) < 2 or cells[0]["href"] is None or cells[1]["link_text"] is None:
+                    continue
+                results_data.append({
+                    'Taba_Number': cells[1]["link_text"],   # מספר התב"ע (עמודה 2)
+                    'Serial_ID': parse_serial_id(cells[0]["href"])   # דוגמה: javascript:getTaba(2037)
+                })
+
+            if snapshot.complete:
+                print(f"נקראו כל {len(snapshot.rows)} השורות דרך DataTables.")
+                break
+
+            if newest_first and complot_search.new_items(results_data, known, key=lambda row: row['Serial_ID'])[1]:
+                print(f"הגענו לתוכניות מוכרות (עמוד {page_num}).")
+                break
 
             # שלב 3: בדיקה אם יש כפתור "הבא" ולחיצה עליו
             try:
@@ -128,37 +192,42 @@ def scrape_bat_yam_taba():
                 # בדיקה נוספת: אם זה תג li וה-a בתוכו מושבת (מבנה נפוץ ב-DataTables)
                 # אבל אם ה-ID הוא על הכפתור, הבדיקה הראשונה תספיק.
                 
-                # גלילה לכפתור (ללא smooth)
-                driver.execute_script("arguments[0].scrollIntoView({block: 'center', inline: 'nearest'});", next_button)
-                time.sleep(1)
-                
-                # לחיצה באמצעות JavaScript (הכי אמין ב-Headless)
+                # לחיצה באמצעות JavaScript (הכי אמין ב-Headless, לא דורש גלילה לכפתור)
+                marker = selenium_helpers.table_marker(driver)
                 driver.execute_script("arguments[0].click();", next_button)
                 
-                # המתנה שהטבלה תיטען מחדש (זיהוי שינוי או סתם המתנה)
-                time.sleep(4)
+                # המתנה שהטבלה תצויר מחדש (השורה הראשונה הקודמת הוסרה / מונה הציור של DataTables התקדם)
+                if not selenium_helpers.wait_for_redraw(driver, marker):
+                    print(f"הטבלה לא התעדכנה אחרי המעבר מעמוד {page_num}.")
+                    break
                 page_num += 1
 
             except Exception as e:
                 print(f"סיום הסריקה (לא נמצא כפתור 'הבא' או שגיאה במעבר): {e}")
                 break
 
-        # שמירה לקובץ CSV
-        save_to_csv(results_data)
+        # מיזוג לרשימה הקיימת ושמירה לקובץ CSV (רשימה ריקה לא דורסת את הקיימת)
+        if results_data:
+            save_to_csv(merge_taba_list(results_data, existing))
 
     finally:
-        driver.quit()
+        browser_pool.release(driver)
 
 def save_to_csv(data):
-    filename = 'bat_yam_taba_list.csv'
+    filename = TABA_LIST_CSV
     keys = ['Taba_Number', 'Serial_ID']
     
-    with open(filename, 'w', newline='', encoding='utf-8-sig') as output_file:
+    # Written through a temporary file, so a killed run never leaves a half-written list
+    tmp_filename = f"{filename}.tmp"
+    with open(tmp_filename, 'w', newline='', encoding='utf-8-sig') as output_file:
         dict_writer = csv.DictWriter(output_file, fieldnames=keys)
         dict_writer.writeheader()
         dict_writer.writerows(data)
+    os.replace(tmp_filename, filename)
     
     print(f"הסריקה הושלמה! {len(data)} רשומות נשמרו לקובץ {filename}")
 
 if __name__ == "__main__":
-    scrape_bat_yam_taba()
\ No newline at end of file
+    # Deadline set by the orchestrator (PLANSCOPE_STAGE_DEADLINE, see common/deadlines.py)
+    with deadlines.scope(deadlines.stage_deadline()):
+        scrape_bat_yam_taba()
\ No newline at end of file
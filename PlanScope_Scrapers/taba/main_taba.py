@@ -1,11 +1,17 @@
 import os
 import shutil
 import subprocess
+import time
 import logging
 import sys
 from datetime import datetime
 import glob
 from typing import List
+from pathlib import Path
+
+# Shared fetch layer lives in PlanScope_Scrapers/common
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from common import bandwidth, sites
 
 # Setup Logging
 logging.basicConfig(
@@ -19,12 +25,17 @@ logging.basicConfig(
 logger = logging.getLogger("OrchestratorTaba")
 
 TABA_DIR = os.path.dirname(os.path.abspath(__file__))
-BACKUP_DIR = os.path.join(TABA_DIR, ".backup")
+
+# Site of this run (PLANSCOPE_SITE, see common/sites.py) and the directory holding its files
+SITE = sites.current()
+WORK_DIR = sites.work_dir(TABA_DIR, SITE)
+BACKUP_DIR = os.path.join(WORK_DIR, ".backup")
 
 # Critical Status Files to Backup/Restore
-CRITICAL_FILES = [
-    "bat_yam_taba_list.csv"
-]
+# The plan list ({site}_taba_list.csv) is only merged into and replaced atomically, so it stays
+# valid when a stage stops midway and is never rolled back: a failed or timed-out day keeps the
+# plans it found.
+CRITICAL_FILES = []
 
 # Scripts to Run Sequence
 SCRIPTS = [
@@ -33,6 +44,15 @@ SCRIPTS = [
     "daily_report_generator_taba.py"
 ]
 
+# Hard timeout per script (minutes). The script itself is told to wrap up
+# STAGE_DEADLINE_MARGIN earlier (PLANSCOPE_STAGE_DEADLINE, see common/deadlines.py)
+SCRIPT_TIMEOUTS = {
+    "get_taba_id.py": 30,
+    "get_information_taba.py": 120,
+    "daily_report_generator_taba.py": 10,
+}
+STAGE_DEADLINE_MARGIN = 5   # Minutes between the stage deadline and the hard kill
+
 class BackupManager:
     """Handles backup and restoration of critical files."""
     
@@ -57,7 +77,7 @@ class BackupManager:
             os.makedirs(BACKUP_DIR)
         
         for filename in CRITICAL_FILES:
-            src = os.path.join(TABA_DIR, filename)
+            src = os.path.join(WORK_DIR, filename)
             if os.path.exists(src):
                 dst = os.path.join(BACKUP_DIR, filename)
                 shutil.copy2(src, dst)
@@ -71,26 +91,24 @@ class BackupManager:
         logger.warning("⚠️ Restoring system state from backup...")
         for filename in self.backed_up_files:
             src = os.path.join(BACKUP_DIR, filename)
-            dst = os.path.join(TABA_DIR, filename)
+            dst = os.path.join(WORK_DIR, filename)
             shutil.copy2(src, dst)
             logger.info(f"Restored: {filename}")
         
         self.cleanup_new_files()
 
     def cleanup_new_files(self):
-        """Deletes files created during the failed run to keep directory clean."""
+        """Deletes the report of the failed run; the scraped data is kept for the next run to resume from."""
         now = datetime.now()
-        today_date = now.strftime("%Y_%m_%d")
         compact_date = now.strftime("%Y%m%d")
         
+        # {site}_plans_data_<date>.json / .jsonl are appended per plan (get_information_taba resumes from them)
         patterns = [
-            f"bat_yam_plans_data_{today_date}.json",
-            f"bat_yam_plans_data_{today_date}.jsonl",
             f"daily_report_{compact_date}.json"
         ]
         
         for pattern in patterns:
-            file_path = os.path.join(TABA_DIR, pattern)
+            file_path = os.path.join(WORK_DIR, pattern)
             if os.path.exists(file_path):
                 os.remove(file_path)
                 logger.info(f"🗑️ Deleted partial/failed output: {pattern}")
@@ -104,7 +122,11 @@ class BackupManager:
 
 def run_pipeline():
     start_time = datetime.now()
-    logger.info(f"🚀 Starting Main Taba Orchestrator at {start_time}")
+    logger.info(f"🚀 Starting Main Taba Orchestrator for {SITE.name} at {start_time}")
+    
+    # Stages tag their proxy bandwidth with this run id (common/bandwidth.py)
+    run_id = bandwidth.new_run_id()
+    env = {**os.environ, "PLANSCOPE_RUN_ID": run_id, sites.SITE_ENV: SITE.key}
     
     with BackupManager():
         for script in SCRIPTS:
@@ -114,15 +136,31 @@ def run_pipeline():
             try:
                 # Use sys.executable to ensure we use the same python interpreter (important for venv)
                 cmd = [sys.executable, script_path] 
-                result = subprocess.run(cmd, check=True, cwd=TABA_DIR, capture_output=False)
+                timeout_minutes = SCRIPT_TIMEOUTS[script]
+                stage_deadline = time.time() + max(1, timeout_minutes - STAGE_DEADLINE_MARGIN) * 60
+                stage_env = {**env, "PLANSCOPE_STAGE_DEADLINE": str(stage_deadline)}
+                result = subprocess.run(cmd, check=True, cwd=WORK_DIR, env=stage_env, capture_output=False,
+                                        timeout=timeout_minutes * 60)
                 
             except subprocess.CalledProcessError as e:
                 logger.error(f"❌ Script failed: {script} (Exit Code: {e.returncode})")
                 raise e # Trigger __exit__ rollback
+            except subprocess.TimeoutExpired as e:
+                logger.error(f"❌ Script timed out: {script} (after {timeout_minutes} minutes)")
+                raise e # Trigger __exit__ rollback
 
     end_time = datetime.now()
     duration = end_time - start_time
     logger.info(f"🏁 Orchestrator finished successfully in {duration}")
+    log_bandwidth(run_id)
+
+def log_bandwidth(run_id: str):
+    """Per-stage and total proxy bandwidth of this run."""
+    stages = bandwidth.run_totals(run_id)
+    for stage, totals in stages.items():
+        logger.info(f"📶 {stage}: {bandwidth.format_bytes(totals['bytes'])} in {totals['requests']} responses")
+    total_bytes = sum(totals['bytes'] for totals in stages.values())
+    logger.info(f"📶 Run {run_id} total proxy bandwidth: {bandwidth.format_bytes(total_bytes)}")
 
 if __name__ == "__main__":
     try:
@@ -0,0 +1,6 @@
+import sys
+from pathlib import Path
+
+# Tests import the shared modules the way the scripts do
+SCRAPERS_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(SCRAPERS_DIR))
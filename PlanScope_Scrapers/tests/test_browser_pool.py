@@ -0,0 +1,84 @@
+"""A warm browser from the pool carries nothing over from its previous borrower."""
+
+from urllib.parse import urlparse
+
+import pytest
+
+from common import browser_pool
+
+PORTAL = "https://handasi.complot.co.il/batyam/"
+
+
+class FakeChrome:
+    """Per-domain cookie jar and web storage, with Chrome's delete_all_cookies() scope."""
+
+    def __init__(self):
+        self.current_url = "about:blank"
+        self.cookies = {}          # domain -> {name: value}
+        self.storage = {}          # domain -> {key: value}
+        self.quit_called = False
+
+    @property
+    def domain(self):
+        return urlparse(self.current_url).hostname
+
+    def get(self, url):
+        self.current_url = url
+
+    def add_cookie(self, cookie):
+        self.cookies.setdefault(self.domain, {})[cookie["name"]] = cookie["value"]
+
+    def delete_all_cookies(self):
+        self.cookies.pop(self.domain, None)
+
+    def execute_script(self, script, *args):
+        if "localStorage.clear()" in script and self.domain is not None:
+            self.storage.pop(self.domain, None)
+
+    def execute_cdp_cmd(self, cmd, params):
+        if cmd == "Network.clearBrowserCookies":
+            self.cookies.clear()
+        return {}
+
+    def quit(self):
+        self.quit_called = True
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    monkeypatch.setattr(browser_pool, "_idle", [])
+    monkeypatch.setattr(browser_pool, "_all", [])
+    monkeypatch.setattr(browser_pool, "POOL_SIZE", 1)
+    monkeypatch.setattr(browser_pool, "_launch", FakeChrome)
+    return browser_pool
+
+
+def test_cookies_do_not_leak_to_the_next_borrower(pool):
+    driver = pool.acquire()
+    driver.get(PORTAL)
+    driver.add_cookie({"name": "ASP.NET_SessionId", "value": "first-borrower"})
+    pool.release(driver)
+
+    again = pool.acquire()
+    assert again is driver   # The same warm browser
+    assert again.current_url == "about:blank"
+    assert not any(again.cookies.values())
+
+
+def test_web_storage_does_not_leak_to_the_next_borrower(pool):
+    driver = pool.acquire()
+    driver.get(PORTAL)
+    driver.storage[driver.domain] = {"search": "502"}
+    pool.release(driver)
+
+    again = pool.acquire()
+    assert again is driver
+    assert not any(again.storage.values())
+
+
+def test_browser_beyond_pool_size_is_quit(pool):
+    first, second = pool.acquire(), pool.acquire()
+    pool.release(first)
+    pool.release(second)
+    assert not first.quit_called
+    assert second.quit_called
@@ -0,0 +1,51 @@
+"""Half-open probes of the circuit breaker always end, whatever the request raises."""
+
+import sqlite3
+
+import pytest
+
+from common import circuit_breaker, fetch_client
+from common.circuit_breaker import CLOSED, HALF_OPEN, CircuitOpenError, get_breaker
+
+
+class LockedLimiter:
+    def acquire(self, key, tokens=1.0):
+        raise sqlite3.OperationalError("database is locked")
+
+
+def open_breaker(host):
+    breaker = get_breaker(host)
+    for _ in range(breaker.failure_threshold):
+        breaker.on_failure()
+    breaker.reset_timeout = 0.0   # The next request is the half-open probe
+    return breaker
+
+
+def test_local_error_in_half_open_probe_releases_the_probe(monkeypatch):
+    breaker = open_breaker("probe-local-error.invalid")
+    monkeypatch.setattr(fetch_client, "get_limiter", lambda: LockedLimiter())
+
+    with pytest.raises(sqlite3.OperationalError):
+        fetch_client.get("https://probe-local-error.invalid/page", timeout=1)
+
+    # Still half-open, and the next request may probe instead of being short-circuited
+    assert breaker.state == HALF_OPEN
+    assert breaker.before_request() is True
+
+
+def test_second_request_waits_while_probe_is_in_flight():
+    breaker = open_breaker("probe-in-flight.invalid")
+    assert breaker.before_request() is True
+    with pytest.raises(CircuitOpenError):
+        breaker.before_request()
+    breaker.on_success()
+    assert breaker.state == CLOSED
+    assert breaker.before_request() is False
+
+
+def test_release_probe_lets_the_next_request_probe():
+    breaker = circuit_breaker.CircuitBreaker("release.invalid", failure_threshold=1, reset_timeout=0.0)
+    breaker.on_failure()
+    assert breaker.before_request() is True
+    breaker.release_probe()
+    assert breaker.before_request() is True
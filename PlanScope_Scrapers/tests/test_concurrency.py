@@ -0,0 +1,14 @@
+"""Callers sharing a host's AIMD controller get the largest cap any of them asked for."""
+
+from common.concurrency import get_controller
+
+
+def test_async_engine_cap_applies_after_threaded_path_created_the_controller():
+    get_controller("sync-first.invalid", max_limit=16)
+    assert get_controller("sync-first.invalid", max_limit=100).max_limit == 100
+
+
+def test_threaded_path_does_not_lower_the_async_engine_cap():
+    get_controller("async-first.invalid", max_limit=100)
+    assert get_controller("async-first.invalid", max_limit=16).max_limit == 100
+    assert get_controller("async-first.invalid").max_limit == 100
@@ -0,0 +1,88 @@
+"""Settings put in the .env file reach the common modules, whatever the import order."""
+
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+SCRAPERS_DIR = Path(__file__).resolve().parent.parent
+
+
+def settings_from_env_file(tmp_path, values, expressions):
+    """Import common in a fresh interpreter with `values` only in a .env file; evaluate `expressions`."""
+    env_file = tmp_path / ".env"
+    env_file.write_text("".join(f"{key}={value}\n" for key, value in values.items()), encoding="utf-8")
+    environ = {key: value for key, value in os.environ.items() if key not in values}
+    environ["PLANSCOPE_ENV_FILE"] = str(env_file)
+    code = (
+        "import json, sys\n"
+        f"sys.path.insert(0, {str(SCRAPERS_DIR)!r})\n"
+        "from common import bandwidth, concurrency, fetch_client, proxy_pool, rate_limiter, response_cache\n"
+        f"print(json.dumps({{name: str(eval(name)) for name in {list(expressions)!r}}}))\n"
+    )
+    result = subprocess.run([sys.executable, "-c", code], cwd=tmp_path, env=environ,
+                            capture_output=True, text=True, check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def test_pool_aimd_and_rate_settings_come_from_env_file(tmp_path):
+    settings = settings_from_env_file(tmp_path, {
+        "PROXY_POOL_SIZE": "7",
+        "AIMD_INITIAL_LIMIT": "3",
+        "AIMD_MAX_LIMIT": "9",
+        "RATE_LIMIT_PER_SEC": "0.5",
+        "RATE_LIMIT_BURST": "2",
+        "RATE_LIMIT_DB": str(tmp_path / "limits.sqlite"),
+    }, [
+        "proxy_pool.DEFAULT_POOL_SIZE", "concurrency.INITIAL_LIMIT", "concurrency.DEFAULT_MAX_LIMIT",
+        "rate_limiter.DEFAULT_RATE", "rate_limiter.DEFAULT_BURST", "rate_limiter.DB_PATH",
+    ])
+    assert settings == {
+        "proxy_pool.DEFAULT_POOL_SIZE": "7",
+        "concurrency.INITIAL_LIMIT": "3",
+        "concurrency.DEFAULT_MAX_LIMIT": "9",
+        "rate_limiter.DEFAULT_RATE": "0.5",
+        "rate_limiter.DEFAULT_BURST": "2.0",
+        "rate_limiter.DB_PATH": str(tmp_path / "limits.sqlite"),
+    }
+
+
+def test_process_environment_wins_over_env_file(tmp_path, monkeypatch):
+    monkeypatch.setenv("PROXY_POOL_SIZE", "3")
+    env_file = tmp_path / ".env"
+    env_file.write_text("PROXY_POOL_SIZE=7\n", encoding="utf-8")
+    environ = dict(os.environ, PLANSCOPE_ENV_FILE=str(env_file))
+    code = (
+        f"import sys; sys.path.insert(0, {str(SCRAPERS_DIR)!r})\n"
+        "from common import proxy_pool; print(proxy_pool.DEFAULT_POOL_SIZE)\n"
+    )
+    result = subprocess.run([sys.executable, "-c", code], cwd=tmp_path, env=environ,
+                            capture_output=True, text=True, check=True)
+    assert result.stdout.strip() == "3"
+
+
+def test_hedging_settings_come_from_env_file(tmp_path):
+    settings = settings_from_env_file(tmp_path, {"FETCH_HEDGING": "on", "HEDGE_BUDGET": "0.2"},
+                                      ["fetch_client.HEDGING", "fetch_client.HEDGE_BUDGET"])
+    assert settings == {"fetch_client.HEDGING": "True", "fetch_client.HEDGE_BUDGET": "0.2"}
+
+
+def test_streaming_cache_and_bandwidth_settings_come_from_env_file(tmp_path):
+    settings = settings_from_env_file(tmp_path, {
+        "FETCH_STREAMING": "on",
+        "RESPONSE_CACHE": "off",
+        "RESPONSE_CACHE_DIR": str(tmp_path / "responses"),
+        "RESPONSE_CACHE_TTL_HOURS": "2",
+        "BANDWIDTH_LOG": str(tmp_path / "bandwidth.jsonl"),
+    }, [
+        "fetch_client.STREAMING", "response_cache.ENABLED", "response_cache.CACHE_DIR",
+        "response_cache.DEFAULT_TTL", "bandwidth.LOG_PATH",
+    ])
+    assert settings == {
+        "fetch_client.STREAMING": "True",
+        "response_cache.ENABLED": "False",
+        "response_cache.CACHE_DIR": str(tmp_path / "responses"),
+        "response_cache.DEFAULT_TTL": "7200.0",
+        "bandwidth.LOG_PATH": str(tmp_path / "bandwidth.jsonl"),
+    }
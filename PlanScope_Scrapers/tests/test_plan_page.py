@@ -0,0 +1,60 @@
+"""The plan record parse_plan_page builds from a GetTabaFile page (what get_information_taba stores)."""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "taba"))
+from get_information_taba import parse_plan_page  # noqa: E402
+
+PLAN_PAGE = """
+<html><head><title>x</title><script>var a = 1;</script></head><body>
+<div class="top-navbar-info"><div>סוג התוכנית:</div><div class="top-navbar-info-desc">תוכנית מפורטת</div></div>
+<div class="top-navbar-info"><div>שם התוכנית:</div><div class="top-navbar-info-desc"> מתחם&nbsp;הים </div></div>
+<table>
+  <tr><td>סטטוס תוכנית</td><td>מאושרת<span style="display:none">hidden</span></td></tr>
+  <tr><td>תאריך הסטטוס</td><td>05/03/2024</td></tr>
+  <tr><td>שטח</td><td>1,234</td></tr>
+  <tr><td>שכונה</td><td>רמת<br>הנשיא</td></tr>
+  <tr><td>יזם</td><td></td></tr>
+  <tr><td></td><td></td></tr>
+  <tr><td>בסמכות</td><td>ועדה מקומית</td></tr>
+</table>
+<div id="table-shlavim"><table>
+  <thead><tr><th>תאריך</th><th>שלב</th></tr></thead>
+  <tbody>
+    <tr><td>05/03/2024</td><td>אישור<br/>התוכנית</td></tr>
+    <tr><td>01/01/2023</td><td>הפקדה</td></tr>
+    <tr><td>12/12/2022</td><td></td></tr>
+  </tbody>
+</table></div>
+</body></html>
+"""
+
+
+def test_plan_record_is_plain_page_text():
+    record = parse_plan_page(PLAN_PAGE.encode("utf-8"), "502-0001234")
+    assert record == {
+        "plan_number": "502-0001234",
+        "plan_type": "תוכנית מפורטת",
+        "plan_name": "מתחם הים",
+        "general_info": {
+            "status": "מאושרת",
+            "status_date": "05/03/2024",
+            "area": "1,234",
+            "neighborhood": "רמת הנשיא",
+            "developer": "",
+            "authority": "ועדה מקומית",
+        },
+        "history": [
+            ["05/03/2024", "אישור התוכנית"],
+            ["01/01/2023", "הפקדה"],
+        ],
+        "meeting_history": [],
+    }
+
+
+def test_numeric_looking_cells_are_not_converted():
+    page = ("<table><tr><td>סטטוס תוכנית</td><td>007</td></tr>"
+            "<tr><td>שטח</td><td>12.50</td></tr></table>")
+    record = parse_plan_page(page.encode("utf-8"), "502-1")
+    assert record["general_info"] == {"status": "007", "area": "12.50"}
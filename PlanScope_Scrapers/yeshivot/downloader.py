@@ -3,18 +3,17 @@ import os
 import json
 import glob
 import csv
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.chrome.options import Options
+import sys
+from pathlib import Path
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 
-try:
-    from webdriver_manager.chrome import ChromeDriverManager
-    HAS_MANAGER = True
-except Exception:
-    HAS_MANAGER = False
+# Shared browser pool lives in PlanScope_Scrapers/common
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from common import browser_pool, sites
+
+SITE = sites.current()
 
 def setup_downloader():
     # יצירת תיקיית היעד אם היא לא קיימת
@@ -23,24 +22,8 @@ def setup_downloader():
         os.makedirs(download_dir)
         print(f"Created directory: {download_dir}")
     
-    chrome_options = Options()
-    chrome_options.add_argument("--headless=new") 
-    chrome_options.add_argument("--no-sandbox")
-    chrome_options.add_argument("--disable-dev-shm-usage")
-    
-    prefs = {
-        "download.default_directory": download_dir,
-        "download.prompt_for_download": False,
-        "download.directory_upgrade": True,
-        "plugins.always_open_pdf_externally": True
-    }
-    chrome_options.add_experimental_option("prefs", prefs)
-    
-    if HAS_MANAGER:
-        service = Service(ChromeDriverManager().install())
-        driver = webdriver.Chrome(service=service, options=chrome_options)
-    else:
-        driver = webdriver.Chrome(options=chrome_options)
+    # דפדפן חם מהמאגר המשותף: PDF נפתחים כהורדה, קבצי PDF לעולם לא נחסמים
+    driver = browser_pool.acquire()
 
     driver.execute_cdp_cmd("Page.setDownloadBehavior", {
         "behavior": "allow",
@@ -110,7 +93,7 @@ def run_downloader():
             # לולאה להורדת קבצים
             while found_files < expected_count and consecutive_failures < 3:
                 
-                api_url = f"https://handasi.complot.co.il/magicscripts/mgrqispi.dll?appname=cixpa&prgname=GetMeetingDocs&siteid=81&v={current_v}&m={m_number}&arguments=siteid,v,m"
+                api_url = f"https://handasi.complot.co.il/magicscripts/mgrqispi.dll?appname=cixpa&prgname=GetMeetingDocs&siteid={SITE.site_id}&v={current_v}&m={m_number}&arguments=siteid,v,m"
                 driver.get(api_url)
                 
                 try:
@@ -185,7 +168,7 @@ def run_downloader():
         print(f"Finished processing. Data map saved to {json_output_file} and {csv_file}")
         
     finally:
-        driver.quit()
+        browser_pool.release(driver)
 
 if __name__ == "__main__":
     run_downloader()
\ No newline at end of file
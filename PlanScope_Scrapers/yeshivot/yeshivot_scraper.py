@@ -1,46 +1,140 @@
-import time
 import os
 import sys
 import json
+import threading
 from collections import Counter
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.chrome.options import Options
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+import requests
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 
-# ניסיון לעקוף שגיאות קידוד של קבצי .env שקיימים בתיקייה
-try:
-    from webdriver_manager.chrome import ChromeDriverManager
-    HAS_MANAGER = True
-except Exception as e:
-    print(f"Warning: Could not initialize ChromeDriverManager due to environment encoding issues: {e}")
-    print("Trying to proceed with default system chrome driver...")
-    HAS_MANAGER = False
-
-def run_scraper():
-    # הגדרות עבור Selenium במצב Headless (מתאים לשרת)
-    chrome_options = Options()
-    chrome_options.add_argument("--headless")
-    chrome_options.add_argument("--no-sandbox")
-    chrome_options.add_argument("--disable-dev-shm-usage")
-    chrome_options.add_argument("--window-size=1920,1080")
-    # מניעת זיהוי כבוט
-    chrome_options.add_argument("--disable-blink-features=AutomationControlled")
-    
+# Shared fetch layer lives in PlanScope_Scrapers/common
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from common import browser_pool, complot_search, fetch_client, selenium_helpers, sites
+from common.retry_queue import RetryLater, run_with_retries
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+
+SITE = sites.current()
+DATE_FORMAT = "%d/%m/%Y"         # fd / td format of GetMeetingByDate
+DEFAULT_FROM_DATE = "01/01/2025"
+WINDOW_DAYS = 90                 # Date range covered by one search request
+MAX_WORKERS = 4                  # Windows fetched in parallel
+
+OUTPUT_TXT = "meeting_numbers.txt"
+OUTPUT_JSON = "meeting_counts.json"
+
+def is_meeting_number(number):
+    # רק אם המחרוזת באורך 8 ומכילה ספרות בלבד
+    return bool(number) and len(number) == 8 and number.isdigit()
+
+def date_windows(from_date, to_date, window_days=WINDOW_DAYS):
+    """Consecutive, non-overlapping (fd, td) ranges covering from_date..to_date (both inclusive)."""
+    windows = []
+    start = from_date
+    while start <= to_date:
+        end = min(start + timedelta(days=window_days - 1), to_date)
+        windows.append((start, end))
+        start = end + timedelta(days=1)
+    return windows
+
+def fetch_meeting_window(window):
+    """Meeting numbers of one date window, in table order (one row per meeting)."""
+    fd, td = (d.strftime(DATE_FORMAT) for d in window)
+    try:
+        soup = complot_search.search(
+            "GetMeetingByDate", {"siteid": SITE.site_id, "v": 0, "fd": fd, "td": td, "l": "true"}
+        )
+    except (complot_search.SearchError, requests.exceptions.RequestException) as e:
+        raise RetryLater(f"{fd}-{td}: {e}")
+
+    numbers = []
+    for cells in complot_search.result_rows(soup):
+        link = cells[1].find("a") if len(cells) > 1 else None
+        if link is not None and is_meeting_number(link.get_text(strip=True)):
+            numbers.append(link.get_text(strip=True))
+    return numbers
+
+def discover_meetings_http(from_date, to_date, window_days=WINDOW_DAYS, max_workers=MAX_WORKERS):
+    """
+    All meeting numbers between the two dates, searched in date windows fetched in
+    parallel (a window that fails is retried with backoff). Returns None if a window
+    could not be fetched, so a partial list never replaces the existing files.
+    """
+    windows = date_windows(from_date, to_date, window_days)
+    print(f"Searching {len(windows)} windows of {window_days} days "
+          f"({from_date.strftime(DATE_FORMAT)} - {to_date.strftime(DATE_FORMAT)})...")
+
+    fetch_client.configure(pool_size=max_workers)
+    results = {}
+    failed = []
+    lock = threading.Lock()
+
+    def worker(window):
+        numbers = fetch_meeting_window(window)
+        with lock:
+            results[window] = numbers
+        print(f"  {window[0].strftime(DATE_FORMAT)} - {window[1].strftime(DATE_FORMAT)}: {len(numbers)} meetings")
+
+    def give_up(window, reason):
+        failed.append(window)
+        print(f"  Failed window {window[0].strftime(DATE_FORMAT)} - {window[1].strftime(DATE_FORMAT)}: {reason}")
+
+    run_with_retries(worker, windows, max_workers=max_workers, on_give_up=give_up)
+    if failed or len(results) != len(windows):
+        return None
+
+    meeting_numbers = []
+    for window in windows:
+        meeting_numbers.extend(results[window])
+    return meeting_numbers
+
+def save_meeting_numbers(meeting_numbers):
+    # א. שמירת רשימה מלאה לקובץ טקסט (לשימוש הסורק השני)
+    with open(OUTPUT_TXT, "w", encoding="utf-8") as f:
+        for num in meeting_numbers:
+            f.write(num + "\n")
+
+    # ב. יצירת JSON עם ספירת מופעים לכל ישיבה
+    meeting_counts = Counter(meeting_numbers)
+    with open(OUTPUT_JSON, "w", encoding="utf-8") as f:
+        json.dump(meeting_counts, f, indent=4, ensure_ascii=False)
+
+    print(f"Success! Collected {len(meeting_numbers)} numbers.")
+    print(f"Raw list saved to: {OUTPUT_TXT}")
+    print(f"Counts JSON saved to: {OUTPUT_JSON}")
+
+def run_scraper(from_date=None, to_date=None, window_days=WINDOW_DAYS, max_workers=MAX_WORKERS):
+    from_date = from_date or datetime.strptime(DEFAULT_FROM_DATE, DATE_FORMAT).date()
+    to_date = to_date or date.today()
+
+    meeting_numbers = discover_meetings_http(from_date, to_date, window_days, max_workers)
+    if meeting_numbers is None:
+        print("Error: not every date window could be fetched; existing files were left unchanged.")
+        return
+    save_meeting_numbers(meeting_numbers)
+
+def run_scraper_selenium(from_date=None, to_date=None):
+    """Browser fallback: one search, all rows when DataTables is available (else the first 100)."""
+    from_date = from_date or datetime.strptime(DEFAULT_FROM_DATE, DATE_FORMAT).date()
+    to_date = to_date or date.today()
+
     driver = None
     try:
-        if HAS_MANAGER:
-            # אתחול הדרייבר באמצעות DriverManager
-            service = Service(ChromeDriverManager().install())
-            driver = webdriver.Chrome(service=service, options=chrome_options)
-        else:
-            # ניסיון הרצה ללא Manager
-            driver = webdriver.Chrome(options=chrome_options)
+        # דפדפן Headless חם מהמאגר המשותף (common/browser_pool.py)
+        driver = browser_pool.acquire()
         
         # הכתובת המבוקשת עם הפרמטרים של התאריכים
-        target_url = "https://batyam.complot.co.il/yeshivot/#search/GetMeetingByDate&siteid=81&v=0&fd=01/01/2025&td=30/01/2026&l=true&arguments=siteid,v,fd,td,l"
+        target_url = (
+            f"{SITE.portal}/yeshivot/#search/GetMeetingByDate&siteid={SITE.site_id}&v=0"
+            f"&fd={from_date.strftime(DATE_FORMAT)}&td={to_date.strftime(DATE_FORMAT)}"
+            "&l=true&arguments=siteid,v,fd,td,l"
+        )
         
         print(f"Connecting to: {target_url}...")
         driver.get(target_url)
@@ -55,59 +149,58 @@ def run_scraper():
             wait.until(EC.presence_of_element_located((By.XPATH, dropdown_xpath)))
             
             option_100 = wait.until(EC.element_to_be_clickable((By.XPATH, '//*[@id="results-table_length"]/label/select/option[4]')))
+            marker = selenium_helpers.table_marker(driver)
             option_100.click()
             
-            # המתנה קלה לעדכון הטבלה לאחר לחיצה
-            time.sleep(4)
+            # המתנה לציור מחדש של הטבלה לאחר לחיצה
+            selenium_helpers.wait_for_redraw(driver, marker)
         except Exception as e:
             print(f"Notice: Could not set view to 100. Proceeding with current view. Error: {e}")
         
         # שלב 2: איסוף הנתונים
         wait.until(EC.presence_of_element_located((By.XPATH, '//*[@id="results-table"]/tbody/tr')))
         
-        rows = driver.find_elements(By.XPATH, '//*[@id="results-table"]/tbody/tr')
+        # כל הטבלה בקריאת סקריפט אחת
+        snapshot = selenium_helpers.extract_table(driver)
         meeting_numbers = []
         
-        print(f"Detected {len(rows)} rows. Extracting 8-digit committee numbers...")
+        print(f"Detected {len(snapshot.rows)} rows. Extracting 8-digit committee numbers...")
         
-        for i in range(1, len(rows) + 1):
-            try:
-                # ה-XPATH שסיפקת לחילוץ המספר (עמודה שנייה)
-                xpath_link = f'//*[@id="results-table"]/tbody/tr[{i}]/td[2]/a'
-                element = driver.find_element(By.XPATH, xpath_link)
-                number = element.text.strip()
-                
-                # סינון: רק אם המחרוזת באורך 8 ומכילה ספרות בלבד
-                if number and len(number) == 8 and number.isdigit():
-                    meeting_numbers.append(number)
-            except Exception:
-                continue
+        for cells in snapshot.rows:
+            # מספר הישיבה בעמודה השנייה
+            number = (cells[1]["link_text"] or "") if len(cells) > 1 else ""
+            if is_meeting_number(number):
+                meeting_numbers.append(number)
         
         # שלב 3: עיבוד נתונים ושמירה
-        
-        # א. שמירת רשימה מלאה לקובץ טקסט (לשימוש הסורק השני)
-        output_txt = "meeting_numbers.txt"
-        with open(output_txt, "w", encoding="utf-8") as f:
-            for num in meeting_numbers:
-                f.write(num + "\n")
-        
-        # ב. יצירת JSON עם ספירת מופעים לכל ישיבה
-        meeting_counts = Counter(meeting_numbers)
-        output_json = "meeting_counts.json"
-        
-        with open(output_json, "w", encoding="utf-8") as f:
-            json.dump(meeting_counts, f, indent=4, ensure_ascii=False)
-            
-        print(f"Success! Collected {len(meeting_numbers)} numbers.")
-        print(f"Raw list saved to: {output_txt}")
-        print(f"Counts JSON saved to: {output_json}")
+        save_meeting_numbers(meeting_numbers)
         
     except Exception as e:
         print(f"An error occurred during execution: {e}")
         
     finally:
-        if driver:
-            driver.quit()
+        browser_pool.release(driver)
 
 if __name__ == "__main__":
-    run_scraper()
\ No newline at end of file
+    import argparse
+
+    def parse_date(value):
+        return datetime.strptime(value, DATE_FORMAT).date()
+
+    parser = argparse.ArgumentParser(description="Bat Yam committee meeting discovery")
+    parser.add_argument("--from-date", type=parse_date, default=None,
+                        help=f"First meeting date, DD/MM/YYYY (default {DEFAULT_FROM_DATE})")
+    parser.add_argument("--to-date", type=parse_date, default=None,
+                        help="Last meeting date, DD/MM/YYYY (default today)")
+    parser.add_argument("--window-days", type=int, default=WINDOW_DAYS,
+                        help="Days covered by one search request")
+    parser.add_argument("--workers", type=int, default=MAX_WORKERS,
+                        help="Date windows fetched in parallel")
+    parser.add_argument("--selenium", action="store_true",
+                        help="Use the headless Chrome scraper (one search over the whole range)")
+    args = parser.parse_args()
+
+    if args.selenium:
+        run_scraper_selenium(args.from_date, args.to_date)
+    else:
+        run_scraper(args.from_date, args.to_date, args.window_days, args.workers)
\ No newline at end of file